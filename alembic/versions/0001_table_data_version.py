@@ -0,0 +1,73 @@
+"""table data versions for metric cache invalidation
+
+Revision ID: 0001_table_data_version
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_table_data_version'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables read by the dashboard metrics
+TRACKED_TABLES = [
+    "inventory_balance",
+    "item",
+    "warehouse",
+    "sales_order",
+    "customer",
+    "production_plan",
+    "production_order",
+    "machine",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "table_data_version",
+        sa.Column("table_name", sa.Text(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_table_data_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_data_version (table_name, version, updated_at)
+            VALUES (TG_TABLE_NAME, 1, now())
+            ON CONFLICT (table_name) DO UPDATE
+            SET version = table_data_version.version + 1,
+                updated_at = now();
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    for table in TRACKED_TABLES:
+        op.execute(
+            f"INSERT INTO table_data_version (table_name) VALUES ('{table}')"
+        )
+        # Statement-level: one bump per write statement, not per row
+        op.execute(f"""
+            CREATE TRIGGER {table}_data_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_data_version();
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_data_version ON {table}")
+
+    op.execute("DROP FUNCTION IF EXISTS bump_table_data_version()")
+    op.drop_table("table_data_version")
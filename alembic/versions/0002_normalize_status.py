@@ -0,0 +1,56 @@
+"""normalize order status values at write time
+
+Revision ID: 0002_normalize_status
+Revises: 0001_table_data_version
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_normalize_status'
+down_revision: Union[str, Sequence[str], None] = '0001_table_data_version'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose status is compared against upper-case constants
+STATUS_TABLES = [
+    "sales_order",
+    "production_order",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION normalize_status() RETURNS trigger AS $$
+        BEGIN
+            NEW.status := upper(btrim(NEW.status));
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    for table in STATUS_TABLES:
+        op.execute(f"""
+            UPDATE {table}
+            SET status = upper(btrim(status))
+            WHERE status IS DISTINCT FROM upper(btrim(status))
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_normalize_status
+            BEFORE INSERT OR UPDATE OF status ON {table}
+            FOR EACH ROW EXECUTE FUNCTION normalize_status();
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The normalized values are kept; only the trigger goes away
+    for table in STATUS_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_normalize_status ON {table}")
+
+    op.execute("DROP FUNCTION IF EXISTS normalize_status()")
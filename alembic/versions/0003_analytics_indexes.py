@@ -0,0 +1,61 @@
+"""indexes for the registered metric queries
+
+Revision ID: 0003_analytics_indexes
+Revises: 0002_normalize_status
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_analytics_indexes'
+down_revision: Union[str, Sequence[str], None] = '0002_normalize_status'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name -> (table, columns, INCLUDE columns)
+INDEXES = {
+    # open/partial/shipped counts, optionally within an order_date window
+    "ix_sales_order_status_order_date": ("sales_order", ["status", "order_date"], []),
+    # sales_by_customer join, per-customer lookups
+    "ix_sales_order_customer_id": ("sales_order", ["customer_id"], []),
+    # every planning metric: date window plus the summed quantity and item
+    "ix_production_plan_planned_date": ("production_plan", ["planned_date"], ["planned_qty", "item_id"]),
+    # in_progress/delayed counts and status filters within a start_date window
+    "ix_production_order_status_start_date": ("production_order", ["status", "start_date"], []),
+    # machine_utilization join
+    "ix_production_order_machine_id": ("production_order", ["machine_id"], []),
+    # stock_by_warehouse and warehouse/plant filters; item_id lookups are
+    # already served by the (item_id, warehouse_id) unique constraint
+    "ix_inventory_balance_warehouse_id": ("inventory_balance", ["warehouse_id"], ["quantity_on_hand"]),
+    # stock movement history per item and warehouse
+    "ix_inventory_transaction_item_warehouse_created": (
+        "inventory_transaction", ["item_id", "warehouse_id", "created_at"], []
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction, but keeps the tables
+    # writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, (table, columns, include) in INDEXES.items():
+            op.create_index(
+                name, table, columns,
+                postgresql_include=include,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+        for table in {table for table, _, _ in INDEXES.values()}:
+            op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, (table, _, _) in INDEXES.items():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,120 @@
+"""trigger-maintained status counters
+
+Revision ID: 0004_status_counter
+Revises: 0003_analytics_indexes
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_status_counter'
+down_revision: Union[str, Sequence[str], None] = '0003_analytics_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables whose rows are counted per status
+COUNTED_TABLES = [
+    "sales_order",
+    "production_order",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "status_counter",
+        sa.Column("table_name", sa.Text(), primary_key=True),
+        sa.Column("status", sa.Text(), primary_key=True),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+    # One delta per status and write statement, computed from the
+    # statement's transition tables. Rows are applied in status order so
+    # concurrent writers lock counter rows in the same order. NULL status
+    # is counted as ''.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION apply_status_counter_delta() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                UPDATE status_counter SET count = 0 WHERE table_name = TG_TABLE_NAME;
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO status_counter (table_name, status, count)
+                SELECT TG_TABLE_NAME, coalesce(status, ''), count(*)
+                FROM new_rows GROUP BY 2 ORDER BY 2
+                ON CONFLICT (table_name, status)
+                DO UPDATE SET count = status_counter.count + excluded.count;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO status_counter (table_name, status, count)
+                SELECT TG_TABLE_NAME, coalesce(status, ''), -count(*)
+                FROM old_rows GROUP BY 2 ORDER BY 2
+                ON CONFLICT (table_name, status)
+                DO UPDATE SET count = status_counter.count + excluded.count;
+            ELSE
+                INSERT INTO status_counter (table_name, status, count)
+                SELECT TG_TABLE_NAME, s, sum(d)
+                FROM (
+                    SELECT coalesce(status, '') AS s, 1 AS d FROM new_rows
+                    UNION ALL
+                    SELECT coalesce(status, ''), -1 FROM old_rows
+                ) delta
+                GROUP BY s HAVING sum(d) <> 0 ORDER BY s
+                ON CONFLICT (table_name, status)
+                DO UPDATE SET count = status_counter.count + excluded.count;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    for table in COUNTED_TABLES:
+        # Keep writers out while the initial counts are taken
+        op.execute(f"LOCK TABLE {table} IN SHARE MODE")
+        op.execute(f"""
+            INSERT INTO status_counter (table_name, status, count)
+            SELECT '{table}', coalesce(status, ''), count(*)
+            FROM {table} GROUP BY 2
+        """)
+
+        # Transition tables need one trigger per event
+        op.execute(f"""
+            CREATE TRIGGER {table}_status_counter_insert
+            AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_status_counter_delta();
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_status_counter_update
+            AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_status_counter_delta();
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_status_counter_delete
+            AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_status_counter_delta();
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_status_counter_truncate
+            AFTER TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION apply_status_counter_delta();
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in COUNTED_TABLES:
+        for event in ("insert", "update", "delete", "truncate"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_status_counter_{event} ON {table}")
+
+    op.execute("DROP FUNCTION IF EXISTS apply_status_counter_delta()")
+    op.drop_table("status_counter")
@@ -0,0 +1,89 @@
+"""materialized rollups for chart metrics
+
+Revision ID: 0005_metric_rollups
+Revises: 0004_status_counter
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_metric_rollups'
+down_revision: Union[str, Sequence[str], None] = '0004_status_counter'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# view -> (query, unique key for REFRESH ... CONCURRENTLY, source tables)
+ROLLUPS = {
+    "rollup_production_plan_trend": (
+        """
+        SELECT planned_date AS date, sum(planned_qty) AS qty
+        FROM production_plan
+        GROUP BY planned_date
+        """,
+        ["date"],
+        ["production_plan"],
+    ),
+    "rollup_planned_by_item": (
+        """
+        SELECT item.sku, sum(production_plan.planned_qty) AS qty
+        FROM production_plan JOIN item ON item.id = production_plan.item_id
+        GROUP BY item.sku
+        """,
+        ["sku"],
+        ["production_plan", "item"],
+    ),
+    "rollup_planned_by_type": (
+        """
+        SELECT item.item_type, sum(production_plan.planned_qty) AS qty
+        FROM production_plan JOIN item ON item.id = production_plan.item_id
+        GROUP BY item.item_type
+        """,
+        ["item_type"],
+        ["production_plan", "item"],
+    ),
+    "rollup_sales_by_customer": (
+        """
+        SELECT customer.name AS customer, CAST(count(sales_order.id) AS INTEGER) AS total_orders
+        FROM sales_order JOIN customer ON customer.id = sales_order.customer_id
+        GROUP BY customer.name
+        """,
+        ["customer"],
+        ["sales_order", "customer"],
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "rollup_state",
+        sa.Column("view_name", sa.Text(), primary_key=True),
+        # table_data_version of every source table when the refresh started
+        sa.Column("source_versions", postgresql.JSONB(), nullable=False),
+        sa.Column("refreshed_at", sa.TIMESTAMP(timezone=True), nullable=False),
+    )
+
+    for view, (query, key, sources) in ROLLUPS.items():
+        tables = ", ".join(f"'{t}'" for t in sources)
+
+        op.execute(f"""
+            INSERT INTO rollup_state (view_name, source_versions, refreshed_at)
+            SELECT '{view}', coalesce(jsonb_object_agg(table_name, version), '{{}}'), now()
+            FROM table_data_version WHERE table_name IN ({tables})
+        """)
+        op.execute(f"CREATE MATERIALIZED VIEW {view} AS {query}")
+        op.execute(f"CREATE UNIQUE INDEX {view}_key ON {view} ({', '.join(key)})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for view in ROLLUPS:
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view}")
+
+    op.drop_table("rollup_state")
@@ -0,0 +1,237 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, literal_column
+from app.analytics.metric_registry import MetricRegistry
+from app.analytics.parallel_executor import ParallelMetricExecutor
+from app.analytics.metric_cache import MetricResultCache
+from app.analytics.prepared_statements import PreparedStatementExecutor
+from app.analytics.status_counters import StatusCounterService
+from app.analytics.rollups import RollupService
+from app.core.replica import ReplicaRouter
+from typing import Dict, List, Tuple
+import threading
+
+
+class BatchMetricExecutor:
+    """
+    Runs a dashboard's metrics in two statements instead of one round trip
+    (plus two permission lookups) per metric:
+
+    - every KPI as a scalar subquery of a single SELECT
+    - every chart/table metric as a json_agg() subquery of a second SELECT
+
+    Both run in the caller's transaction. If a bundle fails (e.g. a KPI that
+    returns more than one column), its metrics fall back to their executors
+    one by one. Bundles are built from the registry's Core statements and,
+    like single metrics, run as prepared statements.
+
+    With ParallelMetricExecutor enabled, the KPI bundle and each chart/table
+    metric instead run concurrently on their own connections, so the
+    dashboard waits for the slowest query rather than the sum of them.
+
+    Metrics still valid in MetricResultCache are not executed at all,
+    status KPIs read status_counter rather than counting rows, and chart
+    metrics read their rollup while it is fresh enough.
+
+    Everything here is read-only, so it runs on the read replica whenever
+    ReplicaRouter finds it fresh enough.
+    """
+
+    # (scalar, metrics) -> bundle statement, reused so it is compiled and
+    # prepared once
+    _bundles: Dict[Tuple[bool, Tuple[str, ...]], object] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def run(
+        db: Session,
+        context,
+        kpi_metrics: List[str],
+        row_metrics: List[str],
+        shapes: Dict[str, Tuple[str, dict]] = None
+    ) -> Tuple[Dict[str, list], Dict[str, str]]:
+        """
+        Execute the metrics of one context, validated once against
+        context.allowed_metrics. Returns ({metric: rows}, {metric: error})
+        where errors only occur for timed out or failed parallel tasks.
+
+        shapes maps row metrics to a MetricRegistry.statement shape and its
+        parameters, e.g. {"sales_by_customer": ("top", {"top_n": 10})}.
+        """
+        shapes = shapes or {}
+
+        for metric in kpi_metrics + row_metrics:
+            if metric not in context.allowed_metrics:
+                raise PermissionError("Metric not allowed in this context")
+
+        # Versions, rollups and data are all read from the same server, so
+        # a lagging replica never caches old rows under newer versions
+        with ReplicaRouter.reading(db) as read_db:
+            # One probe decides which cached results are still valid
+            versions = MetricResultCache.probe(read_db)
+            cached = {}
+
+            for metric in kpi_metrics + row_metrics:
+                rows = MetricResultCache.get(metric, shapes.get(metric, (None, None))[1], versions)
+                if rows is not None:
+                    cached[metric] = rows
+
+            kpi_metrics = [m for m in kpi_metrics if m not in cached]
+            row_metrics = [m for m in row_metrics if m not in cached]
+
+            rollups = RollupService.usable(read_db) if row_metrics else frozenset()
+
+            if ParallelMetricExecutor.enabled():
+                results, errors = BatchMetricExecutor._run_parallel(
+                    kpi_metrics, row_metrics, rollups, shapes, replica=read_db is not db
+                )
+            else:
+                results, errors = {}, {}
+                results.update(BatchMetricExecutor._run_bundle(
+                    read_db, kpi_metrics, scalar=True
+                ))
+                results.update(BatchMetricExecutor._run_bundle(
+                    read_db, row_metrics, scalar=False, rollups=rollups, shapes=shapes
+                ))
+
+        for metric, rows in results.items():
+            # A rollup may lag the versions probed above
+            if metric in rollups:
+                continue
+            MetricResultCache.put(
+                metric, shapes.get(metric, (None, None))[1],
+                BatchMetricExecutor._metric_sql(metric), versions, rows
+            )
+
+        results.update(cached)
+        return results, errors
+
+    @staticmethod
+    def kpi_bundle(metrics: List[str], counters: bool = False):
+        """One row, one column per KPI"""
+        return BatchMetricExecutor._bundle(metrics, scalar=True, counters=counters)
+
+    @staticmethod
+    def row_bundle(metrics: List[str], counters: bool = False, shapes: Dict[str, Tuple[str, dict]] = None):
+        """One row, one JSON array of result rows per metric"""
+        return BatchMetricExecutor._bundle(metrics, scalar=False, counters=counters, shapes=shapes)
+
+    @staticmethod
+    def _bundle(
+        metrics: List[str],
+        scalar: bool,
+        counters: bool = False,
+        rollups: frozenset = frozenset(),
+        shapes: Dict[str, Tuple[str, dict]] = None
+    ):
+        rollups = frozenset(rollups) & set(metrics)
+        shape_of = {m: shape for m, (shape, _) in (shapes or {}).items() if m in metrics}
+        key = (scalar, tuple(metrics), counters, rollups, tuple(sorted(shape_of.items())))
+        stmt = BatchMetricExecutor._bundles.get(key)
+
+        if stmt is None:
+            columns = []
+            for m in metrics:
+                metric_stmt = MetricRegistry.statement(
+                    m, counters=counters, rollup=m in rollups, shape=shape_of.get(m)
+                )
+
+                if scalar:
+                    columns.append(metric_stmt.scalar_subquery().label(m))
+                else:
+                    rows = metric_stmt.subquery(f"r_{m}")
+                    columns.append(
+                        select(func.coalesce(
+                            func.json_agg(literal_column(rows.name)),
+                            literal_column("'[]'::json")
+                        )).select_from(rows).scalar_subquery().label(m)
+                    )
+
+            with BatchMetricExecutor._lock:
+                stmt = BatchMetricExecutor._bundles.setdefault(key, select(*columns))
+
+        return stmt
+
+    @staticmethod
+    def _run_bundle(
+        db: Session,
+        metrics: List[str],
+        scalar: bool,
+        rollups: frozenset = frozenset(),
+        shapes: Dict[str, Tuple[str, dict]] = None
+    ) -> Dict[str, list]:
+        if not metrics:
+            return {}
+
+        shapes = {m: shapes[m] for m in metrics if m in (shapes or {})}
+        # Shapes of the same kind share their parameters (top_n, page_limit)
+        shape_params = {k: v for _, params in shapes.values() for k, v in params.items()}
+
+        try:
+            # A savepoint, not a rollback, undoes the failure: the
+            # transaction's SET LOCAL statement_timeout (parallel tasks)
+            # must still bound the one-by-one retries
+            with db.begin_nested():
+                counters = StatusCounterService.available(db)
+                row = PreparedStatementExecutor.execute(
+                    db, BatchMetricExecutor._bundle(metrics, scalar, counters, rollups, shapes),
+                    shape_params
+                )[0]
+        except Exception as e:
+            print(f"⚠️  Batched metrics failed, running one by one: {e}")
+            return BatchMetricExecutor._run_each(db, metrics, rollups, shapes)
+
+        if scalar:
+            return {m: [{m: row[m]}] for m in metrics}
+
+        return {m: row[m] for m in metrics}
+
+    @staticmethod
+    def _run_parallel(
+        kpi_metrics: List[str],
+        row_metrics: List[str],
+        rollups: frozenset = frozenset(),
+        shapes: Dict[str, Tuple[str, dict]] = None,
+        replica: bool = False
+    ) -> Tuple[Dict[str, list], Dict[str, str]]:
+        tasks = {
+            metric: (lambda db, metric=metric: BatchMetricExecutor._run_each(db, [metric], rollups, shapes))
+            for metric in row_metrics
+        }
+
+        if kpi_metrics:
+            tasks["kpis"] = lambda db: BatchMetricExecutor._run_bundle(
+                db, kpi_metrics, scalar=True
+            )
+
+        done, failed = ParallelMetricExecutor.run(tasks, replica=replica)
+
+        results = {}
+        for task_results in done.values():
+            results.update(task_results)
+
+        errors = {m: failed[m] for m in row_metrics if m in failed}
+        if "kpis" in failed:
+            errors.update({m: failed["kpis"] for m in kpi_metrics})
+
+        return results, errors
+
+    @staticmethod
+    def _run_each(
+        db: Session,
+        metrics: List[str],
+        rollups: frozenset = frozenset(),
+        shapes: Dict[str, Tuple[str, dict]] = None
+    ) -> Dict[str, list]:
+        shapes = shapes or {}
+        return {
+            metric: MetricRegistry.run(
+                db, metric, rollups=rollups,
+                shape=shapes.get(metric, (None, None))[0],
+                shape_params=shapes.get(metric, (None, None))[1]
+            )
+            for metric in metrics
+        }
+
+    @staticmethod
+    def _metric_sql(metric: str) -> str:
+        return MetricRegistry.metric_sql(metric)
@@ -0,0 +1,101 @@
+"""
+EXPLAIN ANALYZE every registered metric against the current database.
+
+    python -m app.analytics.explain_report                      # print
+    python -m app.analytics.explain_report after.json           # print + save
+    python -m app.analytics.explain_report after.json before.json   # + compare
+
+Run it before and after a migration to see which plans changed.
+"""
+from datetime import date, timedelta
+from app.core.database import SessionLocal
+from app.analytics.metric_registry import MetricRegistry
+import json
+import sys
+import uuid
+
+# Representative filters, applied to every metric that accepts them
+SAMPLE_PARAMS = {
+    "date_from": (date.today() - timedelta(days=30)).isoformat(),
+    "date_to": date.today().isoformat(),
+    "status": "OPEN",
+}
+
+
+def _plan_nodes(plan, nodes=None):
+    nodes = nodes if nodes is not None else []
+    label = plan["Node Type"]
+    if plan.get("Index Name"):
+        label += f" ({plan['Index Name']})"
+    elif plan.get("Relation Name"):
+        label += f" ({plan['Relation Name']})"
+
+    if "Scan" in plan["Node Type"]:
+        nodes.append(label)
+
+    for child in plan.get("Plans", []):
+        _plan_nodes(child, nodes)
+
+    return nodes
+
+
+def explain(db, metric: str, params: dict) -> dict:
+    params = MetricRegistry.parse_params(metric, params)
+    compiled = MetricRegistry.statement(metric, params.keys()).compile(dialect=db.bind.dialect)
+    values = {
+        k: str(v) if isinstance(v, uuid.UUID) else v
+        for k, v in {**compiled.params, **params}.items()
+    }
+
+    result = db.connection().exec_driver_sql(
+        "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + compiled.string, values
+    ).scalar()
+    plan = result[0]
+
+    return {
+        "scans": _plan_nodes(plan["Plan"]),
+        "cost": plan["Plan"]["Total Cost"],
+        "ms": round(plan["Execution Time"], 3),
+        "buffers": plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0),
+    }
+
+
+def report() -> dict:
+    db = SessionLocal()
+    try:
+        results = {}
+        for metric in MetricRegistry.names():
+            results[metric] = explain(db, metric, {})
+
+            filters = {
+                k: v for k, v in SAMPLE_PARAMS.items()
+                if k in MetricRegistry.filters(metric)
+            }
+            if filters:
+                results[f"{metric} [{', '.join(filters)}]"] = explain(db, metric, filters)
+        return results
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main():
+    results = report()
+    before = json.load(open(sys.argv[2])) if len(sys.argv) > 2 else {}
+
+    for name, r in results.items():
+        line = f"{name:55} cost={r['cost']:>9.2f} time={r['ms']:>8.3f}ms buffers={r['buffers']:>5}"
+        if name in before:
+            b = before[name]
+            line += f"   (before: cost={b['cost']:.2f} time={b['ms']:.3f}ms buffers={b['buffers']})"
+        print(line)
+        print(f"    {'; '.join(r['scans']) or '-'}")
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Saved to {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.core.config import get_settings
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set
+import json
+import re
+import threading
+import time
+
+TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([a-z_][a-z0-9_]*)", re.IGNORECASE)
+
+# How long to wait before looking for table_data_version again when the
+# migration has not been applied
+AVAILABILITY_RECHECK_SECONDS = 60
+
+
+class MetricResultCache:
+    """
+    Metric results kept in memory, keyed by metric and parameters.
+
+    Every entry remembers the table_data_version of the tables its SQL
+    reads. Statement-level triggers bump those versions on every write, so
+    one probe query per request tells which entries are still valid. Metrics
+    reading a table without a version row are never cached, and caching is
+    off entirely while the table_data_version table does not exist.
+    """
+
+    _entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+    _lock = threading.Lock()
+    _available = None
+    _checked_at = 0.0
+    _stats = {"hits": 0, "misses": 0, "uncacheable": 0}
+
+    @staticmethod
+    def probe(db: Session) -> Optional[Dict[str, int]]:
+        """Current data version of every tracked table, or None if caching is off"""
+        if not get_settings().METRIC_CACHE_ENABLED:
+            return None
+
+        now = time.monotonic()
+        if (
+            MetricResultCache._available is False
+            and now - MetricResultCache._checked_at < AVAILABILITY_RECHECK_SECONDS
+        ):
+            return None
+
+        if not MetricResultCache._available:
+            MetricResultCache._checked_at = now
+            MetricResultCache._available = db.execute(
+                text("SELECT to_regclass('table_data_version') IS NOT NULL")
+            ).scalar()
+
+            if not MetricResultCache._available:
+                print("⚠️  table_data_version missing, metric cache disabled")
+                return None
+
+        rows = db.execute(text("SELECT table_name, version FROM table_data_version")).all()
+        return {name: version for name, version in rows}
+
+    @staticmethod
+    def get(metric: str, params: Optional[dict], versions: Optional[Dict[str, int]]):
+        """Cached rows for the metric, or None when missing or stale"""
+        if versions is None:
+            return None
+
+        key = MetricResultCache._key(metric, params)
+
+        with MetricResultCache._lock:
+            entry = MetricResultCache._entries.get(key)
+
+            if entry and all(versions.get(t) == v for t, v in entry["versions"].items()):
+                MetricResultCache._entries.move_to_end(key)
+                MetricResultCache._stats["hits"] += 1
+                return entry["rows"]
+
+            MetricResultCache._stats["misses"] += 1
+            return None
+
+    @staticmethod
+    def put(metric: str, params: Optional[dict], sql: str, versions: Optional[Dict[str, int]], rows):
+        """
+        Store rows computed after `versions` was probed. A write that lands
+        in between only makes the entry look older than it is.
+        """
+        if versions is None:
+            return
+
+        tables = MetricResultCache.tables_for(sql)
+        if not tables or not tables.issubset(versions):
+            with MetricResultCache._lock:
+                MetricResultCache._stats["uncacheable"] += 1
+            return
+
+        key = MetricResultCache._key(metric, params)
+
+        with MetricResultCache._lock:
+            MetricResultCache._entries[key] = {
+                "rows": rows,
+                "versions": {t: versions[t] for t in tables}
+            }
+            MetricResultCache._entries.move_to_end(key)
+
+            while len(MetricResultCache._entries) > get_settings().METRIC_CACHE_MAX_ENTRIES:
+                MetricResultCache._entries.popitem(last=False)
+
+    @staticmethod
+    def get_or_run(db: Session, metric: str, sql: str, run, params: Optional[dict] = None):
+        """Cached rows for the metric, or run(db) and cache the result"""
+        versions = MetricResultCache.probe(db)
+
+        rows = MetricResultCache.get(metric, params, versions)
+        if rows is not None:
+            return rows
+
+        rows = run(db)
+        MetricResultCache.put(metric, params, sql, versions, rows)
+        return rows
+
+    @staticmethod
+    def tables_for(sql: str) -> Set[str]:
+        return {t.lower() for t in TABLE_PATTERN.findall(sql)}
+
+    @staticmethod
+    def clear():
+        with MetricResultCache._lock:
+            MetricResultCache._entries.clear()
+        MetricResultCache._available = None
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        with MetricResultCache._lock:
+            stats = dict(MetricResultCache._stats)
+            stats["entries"] = len(MetricResultCache._entries)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["available"] = MetricResultCache._available
+        return stats
+
+    @staticmethod
+    def _key(metric: str, params: Optional[dict]) -> tuple:
+        return (metric, json.dumps(params or {}, sort_keys=True, default=str))
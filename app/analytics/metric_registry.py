@@ -1,45 +1,521 @@
-from app.services.inventory_analytics_service import InventoryAnalyticsService
-from app.services.sales_analytics_service import SalesAnalyticsService
-from app.analytics.production_planning import (
-    TotalProductionPlansExecutor,
-    TodayPlannedQtyExecutor,
-    TotalPlannedQtyExecutor,
-    AvgDailyPlannedQtyExecutor,
-    ProductionTrendExecutor,
-    PlannedByItemExecutor,
-    PlannedByTypeExecutor
+from sqlalchemy import (
+    select, func, cast, bindparam, desc, asc, case, literal, literal_column,
+    table, column, and_, or_, Integer, Date, Text
 )
-from app.analytics.production_execution import *
-
-# Metric → Executor mapping
-METRIC_EXECUTORS = {
-    # Inventory metrics
-    "total_stock": InventoryAnalyticsService,
-    "below_reorder_level": InventoryAnalyticsService,
-    "stock_by_warehouse": InventoryAnalyticsService,
-
-    # Sales metrics
-   "total_sales_orders": SalesAnalyticsService,
-    "open_sales_orders": SalesAnalyticsService,
-    "partial_sales_orders": SalesAnalyticsService,
-    "shipped_sales_orders": SalesAnalyticsService,
-    "sales_by_customer": SalesAnalyticsService,
-    
-    # 🔹 KPIs
-    "total_production_plans": TotalProductionPlansExecutor(),
-    "today_planned_qty": TodayPlannedQtyExecutor(),
-    "total_planned_qty": TotalPlannedQtyExecutor(),
-    "avg_daily_planned_qty": AvgDailyPlannedQtyExecutor(),
-
-    # 🔹 Charts
-    "production_plan_trend": ProductionTrendExecutor(),
-    "planned_by_item": PlannedByItemExecutor(),
-    "planned_by_type": PlannedByTypeExecutor(),
-    
-    
-     "total_production_orders": TotalProductionOrdersExec(),
-  "in_progress_orders": InProgressOrdersExec(),
-  "delayed_orders": DelayedOrdersExec(),
-  "machine_utilization": MachineUtilizationExec(),
-  "production_status_distribution": ProductionStatusDistributionExec()
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+from app.analytics.prepared_statements import PreparedStatementExecutor
+from app.analytics.status_counters import StatusCounterService
+from app.analytics.rollups import RollupService
+from app.models import (
+    StatusCounter,
+    InventoryBalance,
+    Item,
+    Warehouse,
+    SalesOrder,
+    Customer,
+    ProductionPlan,
+    ProductionOrder,
+    Machine
+)
+from datetime import date, timedelta
+from typing import Dict, Any, List, Tuple
+import threading
+import uuid
+
+ib = InventoryBalance.__table__
+item = Item.__table__
+wh = Warehouse.__table__
+so = SalesOrder.__table__
+cust = Customer.__table__
+pp = ProductionPlan.__table__
+po = ProductionOrder.__table__
+machine = Machine.__table__
+counter = StatusCounter.__table__
+
+# Typed metric parameters: name -> (SQL type, parser)
+PARAMETERS = {
+    "date_from": (Date, date.fromisoformat),
+    "date_to": (Date, date.fromisoformat),
+    "plant_id": (UUID(as_uuid=True), uuid.UUID),
+    "warehouse_id": (UUID(as_uuid=True), uuid.UUID),
+    "status": (Text, lambda v: str(v).strip().upper()),
 }
+
+
+def date_window(column):
+    """Inclusive date_from / date_to filters on a date or timestamp column"""
+    return {
+        "date_from": lambda p: column >= p,
+        # date_to is bound as the following day (see MetricRegistry.parse_params)
+        "date_to": lambda p: column < p,
+    }
+
+
+def location(warehouse_column):
+    """warehouse_id / plant_id filters for rows that carry a warehouse"""
+    return {
+        "warehouse_id": lambda p: warehouse_column == p,
+        "plant_id": lambda p: warehouse_column.in_(select(wh.c.id).where(wh.c.plant_id == p)),
+    }
+
+
+def status_filter(column):
+    return {"status": lambda p: column == p}
+
+
+def _daily_planned(where):
+    daily = (
+        select(pp.c.planned_date, func.sum(pp.c.planned_qty).label("daily_qty"))
+        .where(*where)
+        .group_by(pp.c.planned_date)
+        .subquery("t")
+    )
+    return select(func.avg(daily.c.daily_qty).label("value"))
+
+
+def rollup(view: str, max_staleness: int, order_by=()):
+    """A materialized view holding the metric's unfiltered result"""
+    return {"view": view, "max_staleness": max_staleness, "order_by": order_by}
+
+
+def _rollup_query(metric_name: str):
+    """Read an unfiltered chart metric from its materialized view"""
+    spec = METRICS[metric_name]["rollup"]
+    columns = METRICS[metric_name]["query"]([]).selected_columns
+    view = table(spec["view"], *[column(c.name, c.type) for c in columns])
+
+    return select(*view.c).order_by(*spec["order_by"])
+
+
+def _top_n(stmt, label: str, value: str):
+    """
+    The top_n rows by value, plus one "Others" row summing the rest.
+    top_n is a bound parameter.
+    """
+    rows = stmt.subquery("m")
+    ranked = select(
+        *rows.c,
+        func.row_number().over(order_by=[desc(rows.c[value]), rows.c[label]]).label("rank")
+    ).subquery("ranked")
+
+    bucket = case(
+        (ranked.c.rank <= bindparam("top_n", type_=Integer), cast(ranked.c[label], Text)),
+        else_=literal("Others")
+    )
+
+    return (
+        select(bucket.label(label), cast(func.sum(ranked.c[value]), rows.c[value].type).label(value))
+        .group_by(literal_column("1"))
+        .order_by(func.min(ranked.c.rank))
+    )
+
+
+def _page(stmt, keyset, after: bool):
+    """
+    One page in keyset order: page_limit rows, starting after the key
+    after_0, after_1, ... when after is set.
+    """
+    rows = stmt.subquery("m")
+    page = select(*rows.c)
+
+    if after:
+        # (a, b) after (x, y) == a > x OR (a = x AND b > y), per direction
+        condition = None
+        for i in reversed(range(len(keyset))):
+            name, direction = keyset[i]
+            key = bindparam(f"after_{i}")
+            beyond = rows.c[name] < key if direction == "desc" else rows.c[name] > key
+            condition = beyond if condition is None else or_(
+                beyond, and_(rows.c[name] == key, condition)
+            )
+        page = page.where(condition)
+
+    return page.order_by(*[
+        desc(rows.c[name]) if direction == "desc" else asc(rows.c[name])
+        for name, direction in keyset
+    ]).limit(bindparam("page_limit", type_=Integer))
+
+
+def _counter_query(metric_name: str):
+    """Read an unfiltered status KPI from status_counter"""
+    table, status = METRICS[metric_name]["counter"]
+    label = METRICS[metric_name]["query"]([]).selected_columns[0].name
+
+    where = [counter.c.table_name == table]
+    if status is not None:
+        where.append(counter.c.status == status)
+
+    return select(
+        cast(func.coalesce(func.sum(counter.c.count), 0), Integer).label(label)
+    ).where(*where)
+
+
+# Every metric in one place. "query" receives the WHERE clauses built from
+# the parameters the caller supplied; "filters" lists the parameters the
+# metric accepts. "counter" (table, status or None for all) lets the
+# unfiltered metric read status_counter instead of counting rows;
+# "rollup" lets it read a materialized view no older than max_staleness
+# seconds (see RollupService). "top_n" (label, value) lets charts be cut
+# to their largest rows plus "Others"; "keyset" (column, direction) is the
+# unique sort order used for pagination.
+METRICS = {
+    # 🔹 Inventory
+    "total_stock": {
+        "domain": "inventory",
+        "description": "Total stock across all warehouses",
+        "filters": {**location(ib.c.warehouse_id)},
+        "query": lambda where: select(
+            func.sum(ib.c.quantity_on_hand).label("total_stock")
+        ).where(*where),
+    },
+    "stock_by_warehouse": {
+        "domain": "inventory",
+        "description": "Stock grouped by warehouse",
+        "filters": {**location(ib.c.warehouse_id)},
+        "top_n": ("warehouse_id", "total_stock"),
+        "keyset": [("warehouse_id", "asc")],
+        "query": lambda where: select(
+            ib.c.warehouse_id,
+            func.sum(ib.c.quantity_on_hand).label("total_stock")
+        ).where(*where).group_by(ib.c.warehouse_id),
+    },
+    "below_reorder_level": {
+        "domain": "inventory",
+        "description": "Items below reorder level",
+        "filters": {**location(ib.c.warehouse_id)},
+        "keyset": [("sku", "asc"), ("warehouse_id", "asc")],
+        "query": lambda where: select(
+            item.c.sku, item.c.name, ib.c.warehouse_id, ib.c.quantity_on_hand, item.c.reorder_level
+        ).select_from(
+            ib.join(item, item.c.id == ib.c.item_id)
+        ).where(ib.c.quantity_on_hand < item.c.reorder_level, *where),
+    },
+
+    # 🔹 Sales
+    "total_sales_orders": {
+        "domain": "sales",
+        "description": "Total number of sales orders",
+        "filters": {**date_window(so.c.order_date), **status_filter(so.c.status)},
+        "counter": ("sales_order", None),
+        "query": lambda where: select(
+            cast(func.count(), Integer).label("total_sales_orders")
+        ).select_from(so).where(*where),
+    },
+    "open_sales_orders": {
+        "domain": "sales",
+        "description": "Sales orders that are strictly open",
+        "filters": {**date_window(so.c.order_date)},
+        "counter": ("sales_order", "OPEN"),
+        "query": lambda where: select(
+            cast(func.count(), Integer).label("open_sales_orders")
+        ).select_from(so).where(so.c.status == "OPEN", *where),
+    },
+    "partial_sales_orders": {
+        "domain": "sales",
+        "description": "Sales orders partially fulfilled",
+        "filters": {**date_window(so.c.order_date)},
+        "counter": ("sales_order", "PARTIAL"),
+        "query": lambda where: select(
+            cast(func.count(), Integer).label("partial_sales_orders")
+        ).select_from(so).where(so.c.status == "PARTIAL", *where),
+    },
+    "shipped_sales_orders": {
+        "domain": "sales",
+        "description": "Sales orders fully shipped",
+        "filters": {**date_window(so.c.order_date)},
+        "counter": ("sales_order", "SHIPPED"),
+        "query": lambda where: select(
+            cast(func.count(), Integer).label("shipped_sales_orders")
+        ).select_from(so).where(so.c.status == "SHIPPED", *where),
+    },
+    "sales_by_customer": {
+        "domain": "sales",
+        "description": "Sales orders grouped by customer",
+        "filters": {**date_window(so.c.order_date), **status_filter(so.c.status)},
+        "rollup": rollup("rollup_sales_by_customer", 300, order_by=[desc("total_orders")]),
+        "top_n": ("customer", "total_orders"),
+        "keyset": [("total_orders", "desc"), ("customer", "asc")],
+        "query": lambda where: select(
+            cust.c.name.label("customer"),
+            cast(func.count(so.c.id), Integer).label("total_orders")
+        ).select_from(
+            so.join(cust, cust.c.id == so.c.customer_id)
+        ).where(*where).group_by(cust.c.name).order_by(desc("total_orders")),
+    },
+
+    # 🔹 Production planning
+    "total_production_plans": {
+        "domain": "production_planning",
+        "description": "Number of production plans",
+        "filters": {**date_window(pp.c.planned_date)},
+        "query": lambda where: select(
+            func.count().label("value")
+        ).select_from(pp).where(*where),
+    },
+    "today_planned_qty": {
+        "domain": "production_planning",
+        "description": "Quantity planned for today",
+        "filters": {},
+        "query": lambda where: select(
+            func.coalesce(func.sum(pp.c.planned_qty), 0).label("value")
+        ).where(pp.c.planned_date == func.current_date()),
+    },
+    "total_planned_qty": {
+        "domain": "production_planning",
+        "description": "Total planned quantity",
+        "filters": {**date_window(pp.c.planned_date)},
+        "query": lambda where: select(
+            func.coalesce(func.sum(pp.c.planned_qty), 0).label("value")
+        ).where(*where),
+    },
+    "avg_daily_planned_qty": {
+        "domain": "production_planning",
+        "description": "Average planned quantity per planned day",
+        "filters": {**date_window(pp.c.planned_date)},
+        "query": _daily_planned,
+    },
+    "production_plan_trend": {
+        "domain": "production_planning",
+        "description": "Planned quantity per day",
+        "filters": {**date_window(pp.c.planned_date)},
+        "rollup": rollup("rollup_production_plan_trend", 300, order_by=[asc("date")]),
+        "query": lambda where: select(
+            pp.c.planned_date.label("date"),
+            func.sum(pp.c.planned_qty).label("qty")
+        ).where(*where).group_by(pp.c.planned_date).order_by(pp.c.planned_date),
+    },
+    "planned_by_item": {
+        "domain": "production_planning",
+        "description": "Planned quantity per item",
+        "filters": {**date_window(pp.c.planned_date)},
+        "rollup": rollup("rollup_planned_by_item", 900, order_by=[desc("qty")]),
+        "top_n": ("sku", "qty"),
+        "keyset": [("qty", "desc"), ("sku", "asc")],
+        "query": lambda where: select(
+            item.c.sku,
+            func.sum(pp.c.planned_qty).label("qty")
+        ).select_from(
+            pp.join(item, item.c.id == pp.c.item_id)
+        ).where(*where).group_by(item.c.sku).order_by(desc("qty")),
+    },
+    "planned_by_type": {
+        "domain": "production_planning",
+        "description": "Planned quantity per item type",
+        "filters": {**date_window(pp.c.planned_date)},
+        "rollup": rollup("rollup_planned_by_type", 900),
+        "top_n": ("item_type", "qty"),
+        "query": lambda where: select(
+            item.c.item_type,
+            func.sum(pp.c.planned_qty).label("qty")
+        ).select_from(
+            pp.join(item, item.c.id == pp.c.item_id)
+        ).where(*where).group_by(item.c.item_type),
+    },
+
+    # 🔹 Production execution
+    "total_production_orders": {
+        "domain": "production_execution",
+        "description": "Number of production orders",
+        "filters": {**date_window(po.c.start_date), **status_filter(po.c.status)},
+        "counter": ("production_order", None),
+        "query": lambda where: select(
+            func.count().label("value")
+        ).select_from(po).where(*where),
+    },
+    "in_progress_orders": {
+        "domain": "production_execution",
+        "description": "Production orders in progress",
+        "filters": {**date_window(po.c.start_date)},
+        "counter": ("production_order", "IN_PROGRESS"),
+        "query": lambda where: select(
+            func.count().label("value")
+        ).select_from(po).where(po.c.status == "IN_PROGRESS", *where),
+    },
+    "delayed_orders": {
+        "domain": "production_execution",
+        "description": "Delayed production orders",
+        "filters": {**date_window(po.c.start_date)},
+        "counter": ("production_order", "DELAYED"),
+        "query": lambda where: select(
+            func.count().label("value")
+        ).select_from(po).where(po.c.status == "DELAYED", *where),
+    },
+    "machine_utilization": {
+        "domain": "production_execution",
+        "description": "Production orders per machine",
+        "filters": {**date_window(po.c.start_date), **status_filter(po.c.status)},
+        "top_n": ("machine_code", "orders"),
+        "query": lambda where: select(
+            machine.c.machine_code,
+            func.count(po.c.id).label("orders")
+        ).select_from(
+            po.join(machine, machine.c.id == po.c.machine_id)
+        ).where(*where).group_by(machine.c.machine_code),
+    },
+    "production_status_distribution": {
+        "domain": "production_execution",
+        "description": "Production orders per status",
+        "filters": {**date_window(po.c.start_date)},
+        "top_n": ("status", "count"),
+        "query": lambda where: select(
+            po.c.status,
+            func.count().label("count")
+        ).select_from(po).where(*where).group_by(po.c.status),
+    },
+}
+
+
+class MetricRegistry:
+    """
+    Compiles METRICS to SQLAlchemy Core statements, once per metric and set
+    of supplied parameters, and runs them as prepared statements.
+    """
+
+    _statements: Dict[Tuple[str, Tuple[str, ...], bool, bool, Any], Any] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def exists(metric_name: str) -> bool:
+        return metric_name in METRICS
+
+    @staticmethod
+    def domain(metric_name: str) -> str:
+        return METRICS[metric_name]["domain"]
+
+    @staticmethod
+    def filters(metric_name: str) -> List[str]:
+        return list(METRICS[metric_name]["filters"])
+
+    @staticmethod
+    def names(domain: str = None) -> List[str]:
+        return [name for name, metric in METRICS.items()
+                if domain is None or metric["domain"] == domain]
+
+    @staticmethod
+    def parse_params(metric_name: str, raw: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Validate and type the parameters for a metric. Unset values are
+        dropped; unknown or unsupported ones raise ValueError.
+        """
+        if metric_name not in METRICS:
+            raise ValueError("Metric not implemented")
+
+        supported = METRICS[metric_name]["filters"]
+        params = {}
+
+        for name, value in (raw or {}).items():
+            if value is None or value == "":
+                continue
+
+            if name not in supported:
+                raise ValueError(f"Metric {metric_name} does not accept '{name}'")
+
+            try:
+                parsed = value if not isinstance(value, str) else PARAMETERS[name][1](value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {name}: {value}")
+
+            # Inclusive window: compare against the start of the next day
+            if name == "date_to":
+                parsed = parsed + timedelta(days=1)
+
+            params[name] = parsed
+
+        return params
+
+    @staticmethod
+    def statement(
+        metric_name: str,
+        param_names=(),
+        counters: bool = False,
+        rollup: bool = False,
+        shape: str = None
+    ):
+        """
+        Core statement for a metric with the given (already parsed)
+        parameters. With counters, unfiltered status KPIs read
+        status_counter; with rollup, unfiltered chart metrics read their
+        materialized view. Use resolve() to decide both from the database.
+
+        shape "top" keeps the top_n rows plus "Others"; "page" and
+        "page_after" return one keyset page (see _top_n and _page for
+        their bound parameters).
+        """
+        param_names = tuple(sorted(param_names))
+        counters = counters and not param_names and "counter" in METRICS[metric_name]
+        rollup = rollup and not param_names and "rollup" in METRICS[metric_name]
+        key = (metric_name, param_names, counters, rollup, shape)
+        stmt = MetricRegistry._statements.get(key)
+
+        if stmt is None:
+            metric = METRICS[metric_name]
+
+            if shape == "top":
+                stmt = _top_n(
+                    MetricRegistry.statement(metric_name, param_names, counters, rollup),
+                    *metric["top_n"]
+                )
+            elif shape in ("page", "page_after"):
+                stmt = _page(
+                    MetricRegistry.statement(metric_name, param_names, counters, rollup),
+                    metric["keyset"],
+                    after=shape == "page_after"
+                )
+            elif counters:
+                stmt = _counter_query(metric_name)
+            elif rollup:
+                stmt = _rollup_query(metric_name)
+            else:
+                where = [
+                    metric["filters"][name](bindparam(name, type_=PARAMETERS[name][0]))
+                    for name in param_names
+                ]
+                stmt = metric["query"](where)
+
+            with MetricRegistry._lock:
+                stmt = MetricRegistry._statements.setdefault(key, stmt)
+
+        return stmt
+
+    @staticmethod
+    def metric_sql(metric_name: str, param_names=()) -> str:
+        return PreparedStatementExecutor.sql(MetricRegistry.statement(metric_name, param_names))
+
+    @staticmethod
+    def resolve(
+        db: Session,
+        metric_name: str,
+        param_names=(),
+        rollups: frozenset = None,
+        shape: str = None
+    ):
+        """
+        The statement to run for a metric: counters and rollups when they
+        are available (and, for rollups, fresh enough), base tables
+        otherwise. Pass rollups (RollupService.usable) when resolving many
+        metrics at once.
+        """
+        if rollups is None:
+            rollups = RollupService.usable(db) if "rollup" in METRICS[metric_name] else frozenset()
+
+        return MetricRegistry.statement(
+            metric_name, param_names,
+            counters=StatusCounterService.available(db),
+            rollup=metric_name in rollups,
+            shape=shape
+        )
+
+    @staticmethod
+    def run(
+        db: Session,
+        metric_name: str,
+        params: Dict[str, Any] = None,
+        rollups: frozenset = None,
+        shape: str = None,
+        shape_params: Dict[str, Any] = None
+    ):
+        """Execute a metric with parsed parameters"""
+        params = params or {}
+        stmt = MetricRegistry.resolve(db, metric_name, params.keys(), rollups, shape)
+        return PreparedStatementExecutor.execute(db, stmt, {**params, **(shape_params or {})})
@@ -0,0 +1,140 @@
+from sqlalchemy.orm import Session
+from app.analytics.metric_registry import MetricRegistry, METRICS
+from app.analytics.prepared_statements import PreparedStatementExecutor
+from app.core.config import get_settings
+from typing import Dict, Any, List, Optional
+import base64
+import json
+
+
+class MetricPaginator:
+    """
+    Bounded reads of row metrics.
+
+    - Pages follow the metric's "keyset" sort order. The cursor carries
+      the last row's key values, so each page is an index-friendly
+      "after this key" read rather than an OFFSET.
+    - Totals come from the planner's row estimate, not a COUNT(*). They are
+      only estimated when more than one page exists.
+    - Charts can be cut to their top_n rows plus an "Others" row.
+    """
+
+    @staticmethod
+    def supports_paging(metric_name: str) -> bool:
+        return "keyset" in METRICS[metric_name]
+
+    @staticmethod
+    def supports_top(metric_name: str) -> bool:
+        return "top_n" in METRICS[metric_name]
+
+    @staticmethod
+    def page(
+        db: Session,
+        metric_name: str,
+        params: Dict[str, Any],
+        limit: int,
+        cursor: Optional[str] = None,
+        rollups: frozenset = None
+    ) -> Dict[str, Any]:
+        """{"rows", "next_cursor", "estimated_total"} for one page"""
+        if not MetricPaginator.supports_paging(metric_name):
+            raise ValueError(f"Metric {metric_name} does not support pagination")
+
+        limit = MetricPaginator.page_size(limit)
+        shape_params = {"page_limit": limit + 1}
+        shape = "page"
+
+        if cursor:
+            shape_params.update(MetricPaginator.decode_cursor(metric_name, cursor))
+            shape = "page_after"
+
+        rows = MetricRegistry.run(db, metric_name, params, rollups, shape, shape_params)
+
+        return MetricPaginator.finish_page(
+            db, metric_name, rows, limit, params, rollups, first=not cursor
+        )
+
+    @staticmethod
+    def finish_page(
+        db: Session,
+        metric_name: str,
+        rows: List[Any],
+        limit: int,
+        params: Dict[str, Any] = None,
+        rollups: frozenset = None,
+        first: bool = True
+    ) -> Dict[str, Any]:
+        """Turn limit + 1 fetched rows into a page"""
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        if has_more:
+            total = MetricPaginator.estimate(db, metric_name, params, rollups)
+            # Never below what the first page already proved to exist
+            if first:
+                total = max(total, limit + 1)
+        elif first:
+            total = len(rows)
+        else:
+            total = None
+
+        return {
+            "rows": rows,
+            "next_cursor": MetricPaginator.encode_cursor(metric_name, rows[-1]) if has_more else None,
+            "estimated_total": total
+        }
+
+    @staticmethod
+    def top(
+        db: Session,
+        metric_name: str,
+        params: Dict[str, Any],
+        n: int,
+        rollups: frozenset = None
+    ):
+        if not MetricPaginator.supports_top(metric_name):
+            raise ValueError(f"Metric {metric_name} does not support top")
+        if n < 1:
+            raise ValueError("top must be at least 1")
+
+        return MetricRegistry.run(db, metric_name, params, rollups, "top", {"top_n": n})
+
+    @staticmethod
+    def estimate(db: Session, metric_name: str, params: Dict[str, Any] = None, rollups: frozenset = None) -> int:
+        params = params or {}
+        stmt = MetricRegistry.resolve(db, metric_name, params.keys(), rollups)
+        return PreparedStatementExecutor.estimate_rows(db, stmt, params)
+
+    @staticmethod
+    def page_size(limit: Optional[int]) -> int:
+        maximum = get_settings().ANALYTICS_MAX_PAGE_SIZE
+        if limit is None:
+            return maximum
+        if limit < 1 or limit > maximum:
+            raise ValueError(f"limit must be between 1 and {maximum}")
+        return limit
+
+    @staticmethod
+    def encode_cursor(metric_name: str, row) -> str:
+        values = [row[name] for name, _ in METRICS[metric_name]["keyset"]]
+        raw = json.dumps(values, default=str).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(metric_name: str, cursor: str) -> Dict[str, Any]:
+        keyset = METRICS[metric_name]["keyset"]
+
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            values = json.loads(raw)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+
+        if not isinstance(values, list) or len(values) != len(keyset):
+            raise ValueError("Invalid cursor")
+
+        # Bound as text; the server casts them to the key columns' types
+        return {
+            f"after_{i}": None if value is None else str(value)
+            for i, value in enumerate(values)
+        }
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from sqlalchemy import text
+from app.core.config import get_settings
+from app.core.database import MetricSessionLocal, ReplicaSessionLocal
+from typing import Callable, Dict, Tuple
+import threading
+
+
+class ParallelMetricExecutor:
+    """
+    Fans metric queries out over a bounded thread pool. Each task runs on
+    its own session from the metric connection pool (or the replica's),
+    under a server-side statement_timeout, so a slow widget is cancelled instead of holding up
+    the rest of the dashboard.
+    """
+
+    _pool = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        return get_settings().METRIC_EXECUTOR_WORKERS > 1
+
+    @staticmethod
+    def run(tasks: Dict[str, Callable], replica: bool = False) -> Tuple[Dict[str, object], Dict[str, str]]:
+        """
+        Run {name: fn(db)} concurrently, on replica sessions when replica is
+        set. Returns (results, errors); a task that failed or did not finish
+        within METRIC_TIMEOUT_SECONDS is reported in errors and left out of
+        results.
+        """
+        timeout = get_settings().METRIC_TIMEOUT_SECONDS
+        pool = ParallelMetricExecutor._get_pool()
+
+        futures = {
+            pool.submit(ParallelMetricExecutor._run_task, fn, timeout, replica): name
+            for name, fn in tasks.items()
+        }
+
+        done, not_done = wait(futures, timeout=timeout)
+
+        results = {}
+        errors = {}
+
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"⚠️  Metric task {name} failed: {e}")
+                errors[name] = "timeout" if "statement timeout" in str(e) else "failed"
+
+        for future in not_done:
+            # Still queued: never start it. Running: the statement_timeout
+            # ends it on the server.
+            future.cancel()
+            errors[futures[future]] = "timeout"
+
+        return results, errors
+
+    @staticmethod
+    def _run_task(fn: Callable, timeout: float, replica: bool = False):
+        db = ReplicaSessionLocal() if replica else MetricSessionLocal()
+        try:
+            db.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+            return fn(db)
+        finally:
+            db.rollback()
+            db.close()
+
+    @staticmethod
+    def _get_pool() -> ThreadPoolExecutor:
+        if ParallelMetricExecutor._pool is None:
+            with ParallelMetricExecutor._lock:
+                if ParallelMetricExecutor._pool is None:
+                    ParallelMetricExecutor._pool = ThreadPoolExecutor(
+                        max_workers=get_settings().METRIC_EXECUTOR_WORKERS,
+                        thread_name_prefix="metric"
+                    )
+        return ParallelMetricExecutor._pool
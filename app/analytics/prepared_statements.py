@@ -0,0 +1,110 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.sql import Select
+from app.core.config import get_settings
+from typing import Dict, Any, Tuple, List
+import hashlib
+import threading
+import uuid
+
+# Compiles Core statements to PostgreSQL's native $1, $2 ... placeholders,
+# which is what PREPARE expects
+_dialect = psycopg2.dialect(paramstyle="numeric_dollar")
+
+
+class PreparedStatementExecutor:
+    """
+    Executes SQLAlchemy Core statements as server-side prepared statements.
+
+    Each distinct statement is compiled once per process and PREPAREd once
+    per database connection; the names already prepared on a connection are
+    tracked in its connection.info, which lives as long as the pooled DBAPI
+    connection does. Disable with METRIC_PREPARED_STATEMENTS=false (e.g.
+    behind a transaction-pooling PgBouncer).
+    """
+
+    # id(statement) -> (statement, name, sql, positional param names,
+    # bound constants). Callers must reuse statement objects (MetricRegistry
+    # caches them).
+    _compiled: Dict[int, Tuple[Select, str, str, List[str], Dict[str, Any]]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def execute(db: Session, stmt: Select, params: Dict[str, Any] = None):
+        params = params or {}
+
+        if not get_settings().METRIC_PREPARED_STATEMENTS:
+            return db.execute(stmt, params).mappings().all()
+
+        return PreparedStatementExecutor._execute_prepared(db, "EXECUTE", stmt, params).mappings().all()
+
+    @staticmethod
+    def estimate_rows(db: Session, stmt: Select, params: Dict[str, Any] = None) -> int:
+        """The planner's row estimate for a statement, without running it"""
+        params = params or {}
+
+        if get_settings().METRIC_PREPARED_STATEMENTS:
+            result = PreparedStatementExecutor._execute_prepared(
+                db, "EXPLAIN (FORMAT JSON) EXECUTE", stmt, params
+            )
+        else:
+            compiled = stmt.compile(dialect=db.bind.dialect)
+            values = {
+                k: PreparedStatementExecutor._literal(v)
+                for k, v in {**compiled.params, **params}.items()
+            }
+            result = db.connection().exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + compiled.string, values
+            )
+
+        return int(result.scalar()[0]["Plan"]["Plan Rows"])
+
+    @staticmethod
+    def _execute_prepared(db: Session, command: str, stmt: Select, params: Dict[str, Any]):
+        _, name, sql, positions, constants = PreparedStatementExecutor._compile(stmt)
+        connection = db.connection()
+        prepared = connection.info.setdefault("prepared_statements", set())
+
+        if name not in prepared:
+            connection.exec_driver_sql(f"PREPARE {name} AS {sql}")
+            prepared.add(name)
+
+        # Literals in the statement ('OPEN', 0, ...) are bound parameters too
+        values = tuple(
+            PreparedStatementExecutor._literal(params[p] if p in params else constants.get(p))
+            for p in positions
+        )
+
+        if values:
+            placeholders = ", ".join(["%s"] * len(values))
+            return connection.exec_driver_sql(f"{command} {name} ({placeholders})", values)
+
+        return connection.exec_driver_sql(f"{command} {name}")
+
+    @staticmethod
+    def sql(stmt: Select) -> str:
+        """The compiled SQL of a statement (with $n placeholders)"""
+        return PreparedStatementExecutor._compile(stmt)[2]
+
+    @staticmethod
+    def _compile(stmt: Select) -> Tuple[Select, str, str, List[str], Dict[str, Any]]:
+        compiled = PreparedStatementExecutor._compiled.get(id(stmt))
+
+        # Keep a reference to the statement so its id() is never reused
+        if compiled is None or compiled[0] is not stmt:
+            result = stmt.compile(dialect=_dialect)
+            sql = result.string
+            name = "stmt_" + hashlib.md5(sql.encode("utf-8")).hexdigest()[:16]
+            compiled = (stmt, name, sql, list(result.positiontup or []), result.params)
+
+            with PreparedStatementExecutor._lock:
+                PreparedStatementExecutor._compiled[id(stmt)] = compiled
+
+        return compiled
+
+    @staticmethod
+    def _literal(value):
+        # psycopg2 cannot adapt uuid.UUID without extras.register_uuid()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
@@ -0,0 +1,158 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.core.config import get_settings
+from typing import Dict, Any, List
+import json
+import threading
+import time
+
+# How long to wait before looking for rollup_state again when the
+# migration has not been applied
+AVAILABILITY_RECHECK_SECONDS = 60
+
+
+class RollupService:
+    """
+    Materialized views holding the unfiltered result of chart metrics
+    (see the "rollup" entries in METRICS).
+
+    rollup_state records the table_data_version of each view's source
+    tables at its last refresh. A view whose sources have not changed since
+    is current; otherwise it is as stale as its last refresh is old, and
+    the registry only reads it while that is within the metric's
+    max_staleness. refresh() rebuilds (CONCURRENTLY, so readers are never
+    blocked) only the views whose sources changed; run it periodically
+    through app.workers.rollup_worker.
+    """
+
+    _available = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+    _stats = {"refreshes": 0, "skipped": 0, "last_refreshed_at": None}
+
+    @staticmethod
+    def available(db: Session) -> bool:
+        if not get_settings().ROLLUPS_ENABLED:
+            return False
+
+        if RollupService._available:
+            return True
+
+        now = time.monotonic()
+        if (
+            RollupService._available is False
+            and now - RollupService._checked_at < AVAILABILITY_RECHECK_SECONDS
+        ):
+            return False
+
+        RollupService._checked_at = now
+        RollupService._available = db.execute(
+            text("SELECT to_regclass('rollup_state') IS NOT NULL")
+        ).scalar()
+
+        if not RollupService._available:
+            print("⚠️  rollup_state missing, chart metrics will aggregate base tables")
+
+        return RollupService._available
+
+    @staticmethod
+    def staleness(db: Session) -> Dict[str, float]:
+        """Seconds each view may lag its source tables (0 when current)"""
+        if not RollupService.available(db):
+            return {}
+
+        rows = db.execute(text("""
+            SELECT
+                s.view_name,
+                extract(epoch FROM now() - s.refreshed_at) AS age,
+                NOT EXISTS (
+                    SELECT 1
+                    FROM jsonb_each_text(s.source_versions) v
+                    LEFT JOIN table_data_version t ON t.table_name = v.key
+                    WHERE t.version IS DISTINCT FROM v.value::bigint
+                ) AS current
+            FROM rollup_state s
+        """)).mappings().all()
+
+        return {
+            row["view_name"]: 0.0 if row["current"] else float(row["age"])
+            for row in rows
+        }
+
+    @staticmethod
+    def usable(db: Session) -> frozenset:
+        """Metrics whose rollup may be read instead of the base tables"""
+        from app.analytics.metric_registry import METRICS
+
+        staleness = RollupService.staleness(db)
+
+        return frozenset(
+            name for name, metric in METRICS.items()
+            if "rollup" in metric
+            and metric["rollup"]["view"] in staleness
+            and staleness[metric["rollup"]["view"]] <= metric["rollup"]["max_staleness"]
+        )
+
+    @staticmethod
+    def refresh(db: Session, force: bool = False) -> List[str]:
+        """Refresh the views whose source tables changed; returns their names"""
+        from app.analytics.metric_registry import METRICS, MetricRegistry
+        from app.analytics.metric_cache import MetricResultCache
+
+        if not RollupService.available(db):
+            return []
+
+        versions = dict(db.execute(
+            text("SELECT table_name, version FROM table_data_version")
+        ).all())
+        state = dict(db.execute(
+            text("SELECT view_name, source_versions FROM rollup_state")
+        ).all())
+        db.commit()
+
+        refreshed = []
+
+        for name, metric in METRICS.items():
+            if "rollup" not in metric:
+                continue
+
+            view = metric["rollup"]["view"]
+            sources = MetricResultCache.tables_for(MetricRegistry.metric_sql(name))
+            current = {t: versions.get(t) for t in sorted(sources)}
+
+            if not force and state.get(view) == current:
+                with RollupService._lock:
+                    RollupService._stats["skipped"] += 1
+                continue
+
+            # Versions are read before the refresh, so a write racing with
+            # it only makes the view look older than it is
+            db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+            db.execute(text("""
+                INSERT INTO rollup_state (view_name, source_versions, refreshed_at)
+                VALUES (:view, CAST(:versions AS jsonb), now())
+                ON CONFLICT (view_name) DO UPDATE
+                SET source_versions = excluded.source_versions,
+                    refreshed_at = excluded.refreshed_at
+            """), {"view": view, "versions": json.dumps(current)})
+            db.commit()
+
+            refreshed.append(view)
+
+        with RollupService._lock:
+            RollupService._stats["refreshes"] += len(refreshed)
+            RollupService._stats["last_refreshed_at"] = time.time()
+
+        if refreshed:
+            print(f"✅ Refreshed rollups: {', '.join(refreshed)}")
+
+        return refreshed
+
+    @staticmethod
+    def get_stats(db: Session) -> Dict[str, Any]:
+        with RollupService._lock:
+            stats = dict(RollupService._stats)
+        stats["available"] = RollupService.available(db)
+        stats["staleness_seconds"] = RollupService.staleness(db)
+        stats["usable"] = sorted(RollupService.usable(db))
+        return stats
@@ -0,0 +1,127 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.core.config import get_settings
+from typing import Dict, Any, List
+import threading
+import time
+
+# Tables counted per status by the status_counter triggers
+COUNTED_TABLES = [
+    "sales_order",
+    "production_order",
+]
+
+# How long to wait before looking for status_counter again when the
+# migration has not been applied
+AVAILABILITY_RECHECK_SECONDS = 60
+
+
+class StatusCounterService:
+    """
+    Row counts per (table, status), kept current by statement-level
+    triggers, so status KPIs read one row instead of counting the table.
+
+    reconcile() recounts the base tables and corrects any drift (e.g. rows
+    written with the triggers disabled); run it periodically through
+    app.workers.status_counter_worker.
+    """
+
+    _available = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+    _stats = {"reconciles": 0, "drifted_rows": 0, "last_reconciled_at": None, "last_drift": []}
+
+    @staticmethod
+    def available(db: Session) -> bool:
+        """Whether status KPIs may read status_counter"""
+        if not get_settings().STATUS_COUNTERS_ENABLED:
+            return False
+
+        if StatusCounterService._available:
+            return True
+
+        now = time.monotonic()
+        if (
+            StatusCounterService._available is False
+            and now - StatusCounterService._checked_at < AVAILABILITY_RECHECK_SECONDS
+        ):
+            return False
+
+        StatusCounterService._checked_at = now
+        StatusCounterService._available = db.execute(
+            text("SELECT to_regclass('status_counter') IS NOT NULL")
+        ).scalar()
+
+        if not StatusCounterService._available:
+            print("⚠️  status_counter missing, status KPIs will count rows")
+
+        return StatusCounterService._available
+
+    @staticmethod
+    def reconcile(db: Session) -> List[Dict[str, Any]]:
+        """
+        Compare the counters with the base tables and apply the difference.
+
+        Counters change in the same transaction as the rows they count, so
+        both sides are read from one REPEATABLE READ snapshot; the drift is
+        then applied as a delta, which stays correct while other writers
+        keep moving the counters.
+        """
+        db.rollback()
+        db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+
+        actual = " UNION ALL ".join(
+            f"SELECT '{table}' AS table_name, coalesce(status, '') AS status, count(*) AS count "
+            f"FROM {table} GROUP BY 2"
+            for table in COUNTED_TABLES
+        )
+
+        drift = db.execute(text(f"""
+            SELECT
+                coalesce(a.table_name, c.table_name) AS table_name,
+                coalesce(a.status, c.status) AS status,
+                coalesce(a.count, 0) - coalesce(c.count, 0) AS drift
+            FROM ({actual}) a
+            FULL JOIN status_counter c
+                ON c.table_name = a.table_name AND c.status = a.status
+            WHERE coalesce(a.count, 0) <> coalesce(c.count, 0)
+            ORDER BY 1, 2
+        """)).mappings().all()
+        db.commit()
+
+        drift = [dict(row) for row in drift]
+
+        for row in drift:
+            db.execute(text("""
+                INSERT INTO status_counter (table_name, status, count)
+                VALUES (:table_name, :status, :drift)
+                ON CONFLICT (table_name, status)
+                DO UPDATE SET count = status_counter.count + excluded.count
+            """), row)
+        db.commit()
+
+        if drift:
+            print(f"⚠️  Status counters drifted, corrected {len(drift)} row(s): {drift}")
+
+        with StatusCounterService._lock:
+            StatusCounterService._stats["reconciles"] += 1
+            StatusCounterService._stats["drifted_rows"] += len(drift)
+            StatusCounterService._stats["last_reconciled_at"] = time.time()
+            StatusCounterService._stats["last_drift"] = drift
+
+        return drift
+
+    @staticmethod
+    def counters(db: Session) -> List[Dict[str, Any]]:
+        return [
+            dict(row) for row in db.execute(
+                text("SELECT table_name, status, count FROM status_counter ORDER BY 1, 2")
+            ).mappings().all()
+        ]
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        with StatusCounterService._lock:
+            stats = dict(StatusCounterService._stats)
+        stats["available"] = StatusCounterService._available
+        return stats
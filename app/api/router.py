@@ -9,6 +9,8 @@ from app.api.routes import (
 from app.api.routes import dashboard
 from app.api.routes import dashboard_insights
 from app.api.routes import production_planning
+from app.api.routes import diagnostics
+from app.api.routes import export
 api_router = APIRouter()
 
 api_router.include_router(data_context.router)
@@ -18,4 +20,6 @@ api_router.include_router(chat.router)
 api_router.include_router(automation.router)  # 👈 THIS LINE
 api_router.include_router(dashboard_insights.router)
 api_router.include_router(dashboard.router)
-api_router.include_router(production_planning.router)
\ No newline at end of file
+api_router.include_router(production_planning.router)
+api_router.include_router(diagnostics.router)
+api_router.include_router(export.router)
\ No newline at end of file
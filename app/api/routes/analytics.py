@@ -1,34 +1,51 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import get_db
 from app.core.context_guard import require_context_session
 from app.services.inventory_analytics_service import InventoryAnalyticsService
 from app.services.sales_analytics_service import SalesAnalyticsService
+from app.core.singleflight import SingleFlight
 from app.core.context_guard import require_context_session
+from typing import Optional
 
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.get("/inventory")
 def inventory_analytics(
     metric: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    plant_id: Optional[str] = None,
+    warehouse_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    top: Optional[int] = None,
     context_session=Depends(require_context_session),
     db: Session = Depends(get_db)
 ):
+    params = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "plant_id": plant_id,
+        "warehouse_id": warehouse_id,
+        "status": status
+    }
+
     try:
-        return InventoryAnalyticsService.run_metric(
+        return SingleFlight.do(
+            ("metric", str(context_session.data_context_id), metric,
+             tuple(sorted((k, v) for k, v in params.items() if v)), limit, cursor, top),
+            InventoryAnalyticsService.run_metric,
             db=db,
             context_session_id=context_session.id,
-            metric_name=metric
+            metric_name=metric,
+            params=params,
+            limit=limit,
+            cursor=cursor,
+            top=top
         )
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
@@ -39,14 +56,37 @@ def inventory_analytics(
 @router.get("/sales")
 def sales_analytics(
     metric: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    plant_id: Optional[str] = None,
+    warehouse_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    top: Optional[int] = None,
     context_session = Depends(require_context_session),
     db: Session = Depends(get_db)
 ):
+    params = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "plant_id": plant_id,
+        "warehouse_id": warehouse_id,
+        "status": status
+    }
+
     try:
-        return SalesAnalyticsService.run_metric(
+        return SingleFlight.do(
+            ("metric", str(context_session.data_context_id), metric,
+             tuple(sorted((k, v) for k, v in params.items() if v)), limit, cursor, top),
+            SalesAnalyticsService.run_metric,
             db=db,
             context_session_id=context_session.id,
-            metric_name=metric
+            metric_name=metric,
+            params=params,
+            limit=limit,
+            cursor=cursor,
+            top=top
         )
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
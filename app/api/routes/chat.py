@@ -1,21 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import get_db
 from app.core.context_guard import require_context_session
 from app.services.advanced_chat_service import AdvancedChatService
 from app.schemas.chat import ChatRequest
+from app.utils.json_safe import make_json_safe
+import json
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("")
-def chat(
+async def chat(
     payload: ChatRequest,
     context_session = Depends(require_context_session),
     db: Session = Depends(get_db)
@@ -29,7 +25,7 @@ def chat(
     - Intelligent response formatting
     - Safety validation
     """
-    response = AdvancedChatService.handle_message(
+    response = await AdvancedChatService.handle_message(
         db=db,
         context_session_id=context_session.id,
         message=payload.message
@@ -38,4 +34,32 @@ def chat(
     if response.get("type") == "error" and "Invalid session" in response.get("message", ""):
         raise HTTPException(status_code=400, detail=response.get("message"))
 
-    return response
\ No newline at end of file
+    return response
+
+@router.post("/stream")
+async def chat_stream(
+    payload: ChatRequest,
+    context_session = Depends(require_context_session),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-sent-events variant of the chat endpoint.
+
+    Events arrive in order: `intent`, `table` (as soon as the SQL returns),
+    `summary_token` (repeated, as the model streams), then `done` with the
+    full response, or `error`.
+    """
+    async def event_stream():
+        async for event, data in AdvancedChatService.stream_message(
+            db=db,
+            context_session_id=context_session.id,
+            message=payload.message
+        ):
+            body = json.dumps(make_json_safe(data), default=str)
+            yield f"event: {event}\ndata: {body}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from uuid import UUID
-from app.core.database import SessionLocal
+from app.core.database import get_db
 from app.models import ContextSession
 from uuid import UUID
 router = APIRouter(prefix="/context-sessions", tags=["Context Sessions"])
@@ -11,13 +11,6 @@ router = APIRouter(prefix="/context-sessions", tags=["Context Sessions"])
 
 DUMMY_USER_ID = UUID("22222222-2222-2222-2222-222222222222")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/{context_id}/open")
 def open_context(context_id: UUID, db: Session = Depends(get_db)):
     session = ContextSession(
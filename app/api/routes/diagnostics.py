@@ -0,0 +1,106 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.core.database import get_db, get_pool_stats
+from app.core.context_guard import require_context_session
+from app.core.openai_client import OpenAIClientManager
+from app.core.llm_cache import LLMResponseCache
+from app.core.singleflight import SingleFlight
+from app.analytics.metric_cache import MetricResultCache
+from app.analytics.status_counters import StatusCounterService
+from app.analytics.rollups import RollupService
+from app.chat.local_intent_classifier import get_local_intent_stats
+from app.services.sql_cache_service import SqlCacheService
+from app.core.sql_validator import SqlValidator
+from app.core.sql_rewriter import SqlRewriter
+from app.core.sql_guard import SqlCostGuard
+from app.core.replica import ReplicaRouter
+
+router = APIRouter(prefix="/diagnostics", tags=["Diagnostics"])
+
+
+@router.get("/openai-pool")
+def openai_pool_stats():
+    return OpenAIClientManager.get_pool_stats()
+
+
+@router.get("/intent")
+def intent_stats():
+    return get_local_intent_stats()
+
+
+@router.get("/sql-cache")
+def sql_cache_stats():
+    return SqlCacheService.get_stats()
+
+
+@router.get("/sql-validator")
+def sql_validator_stats():
+    return SqlValidator.get_stats()
+
+
+@router.get("/sql-rewriter")
+def sql_rewriter_stats():
+    return SqlRewriter.get_stats()
+
+
+@router.get("/sql-guard")
+def sql_guard_stats():
+    return SqlCostGuard.get_stats()
+
+
+@router.get("/db-pool")
+def db_pool_stats():
+    return get_pool_stats()
+
+
+@router.get("/replica")
+def replica_stats():
+    return ReplicaRouter.get_stats()
+
+
+@router.get("/llm-cache")
+def llm_cache_stats():
+    return LLMResponseCache.get_stats()
+
+
+@router.get("/singleflight")
+def singleflight_stats():
+    return SingleFlight.get_stats()
+
+
+@router.get("/metric-cache")
+def metric_cache_stats():
+    return MetricResultCache.get_stats()
+
+
+@router.get("/status-counters")
+def status_counter_stats(db: Session = Depends(get_db)):
+    available = StatusCounterService.available(db)
+    stats = StatusCounterService.get_stats()
+    if available:
+        stats["counters"] = StatusCounterService.counters(db)
+    return stats
+
+
+@router.post("/status-counters/reconcile")
+def reconcile_status_counters(
+    context_session=Depends(require_context_session),
+    db: Session = Depends(get_db)
+):
+    if not StatusCounterService.available(db):
+        return {"available": False, "drift": []}
+    return {"available": True, "drift": StatusCounterService.reconcile(db)}
+
+
+@router.get("/rollups")
+def rollup_stats(db: Session = Depends(get_db)):
+    return RollupService.get_stats(db)
+
+
+@router.post("/rollups/refresh")
+def refresh_rollups(
+    force: bool = False,
+    context_session=Depends(require_context_session),
+    db: Session = Depends(get_db)
+):
+    return {"refreshed": RollupService.refresh(db, force=force)}
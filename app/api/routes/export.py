@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.database import get_db
+from app.core.context_guard import require_context_session
+from app.services.export_service import ExportService, FORMATS
+from app.schemas.export import SqlExportRequest
+from typing import Optional
+
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+
+def _response(stmt, params, fmt: str, name: str, guarded: bool = False) -> StreamingResponse:
+    try:
+        chunks = ExportService.stream(stmt, params, fmt, guarded)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=400, detail=str(getattr(e, "orig", e)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Also runs when the client disconnects, even before the first chunk,
+    # releasing the session and its cursor
+    return StreamingResponse(
+        chunks,
+        media_type=FORMATS[fmt],
+        background=BackgroundTask(chunks.close),
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{fmt}"',
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.get("/metric")
+def export_metric(
+    metric: str,
+    format: str = "ndjson",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    plant_id: Optional[str] = None,
+    warehouse_id: Optional[str] = None,
+    status: Optional[str] = None,
+    context_session=Depends(require_context_session),
+    db: Session = Depends(get_db)
+):
+    """Stream every row of an allowed metric as NDJSON or CSV"""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+
+    params = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "plant_id": plant_id,
+        "warehouse_id": warehouse_id,
+        "status": status
+    }
+
+    try:
+        stmt, params = ExportService.metric_statement(db, context_session.id, metric, params)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _response(stmt, params, format, metric)
+
+
+@router.post("/sql")
+def export_sql(
+    payload: SqlExportRequest,
+    context_session=Depends(require_context_session),
+    db: Session = Depends(get_db)
+):
+    """Stream the rows of generated SQL (e.g. the "sql" of a chat answer)"""
+    if payload.format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+
+    try:
+        stmt, params = ExportService.sql_statement(db, context_session.id, payload.sql)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _response(stmt, params, payload.format, "query", guarded=True)
@@ -1,26 +1,27 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import get_db
 from app.core.context_guard import require_context_session
 from app.services.production_planning_analytics_service import (
     ProductionPlanningAnalyticsService
 )
+from typing import Optional
 
 router = APIRouter(
     prefix="/analytics/production-planning",
     tags=["Production Planning Analytics"]
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("")
 def production_planning_dashboard(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
     context_session = Depends(require_context_session),
     db: Session = Depends(get_db)
 ):
-    return ProductionPlanningAnalyticsService.get_dashboard_data(db)
+    try:
+        return ProductionPlanningAnalyticsService.get_dashboard_data(
+            db, {"date_from": date_from, "date_to": date_to}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
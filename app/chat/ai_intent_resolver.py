@@ -1,14 +1,5 @@
 import json
-import os
-from openai import OpenAI
-
-def get_openai_client():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set")
-    return OpenAI(api_key=api_key)
-
-
+from app.core.openai_client import get_openai_client
 
 
 SYSTEM_PROMPT = """
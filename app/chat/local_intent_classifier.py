@@ -0,0 +1,141 @@
+import re
+import threading
+from app.chat.metric_aliases import METRIC_ALIASES
+from app.chat.metric_resolver import resolve_metric
+
+GREETING_PATTERN = re.compile(
+    r"^\s*(hi|hii+|hello|hey|hey there|hi there|hello there|greetings|"
+    r"good (morning|afternoon|evening)|namaste)\s*[!.,]*\s*$",
+    re.IGNORECASE
+)
+
+HELP_PATTERN = re.compile(
+    r"^\s*(help|help me|what can you do|what can you help( me)? with|"
+    r"what do you do|how does this work|how can you help( me)?|"
+    r"what (data|metrics|information) (do you have|is available|are available))"
+    r"\s*[?!.]*\s*$",
+    re.IGNORECASE
+)
+
+UNSAFE_KEYWORDS = [
+    "delete", "drop", "truncate", "remove", "clear",
+    "update", "insert", "modify", "change", "alter"
+]
+
+# Words that may surround a metric alias without changing its meaning
+FILLER_WORDS = {
+    "show", "me", "the", "what", "whats", "s", "is", "are", "our", "my",
+    "current", "currently", "please", "give", "get", "list", "display",
+    "tell", "about", "do", "we", "have", "i", "can", "see", "a", "an",
+    "all", "us", "now", "today", "right", "items"
+}
+
+_stats_lock = threading.Lock()
+_stats = {
+    "local_hits": {},
+    "llm_fallbacks": 0
+}
+
+
+def is_safe_query(message: str) -> bool:
+    """Check if the query is safe (read-only)"""
+    message_lower = message.lower()
+    return not any(keyword in message_lower for keyword in UNSAFE_KEYWORDS)
+
+
+def classify_locally(user_message: str, context) -> dict | None:
+    """
+    Answer the intent without an LLM round trip when the message is an exact
+    greeting, a help request, an unsafe request, or a known metric alias.
+
+    Returns the same shape as IntentService.analyze_query, or None when the
+    message is not confidently recognised and the model should decide.
+    """
+    result = _classify(user_message, context)
+
+    with _stats_lock:
+        if result:
+            hits = _stats["local_hits"]
+            key = result.pop("_rule")
+            hits[key] = hits.get(key, 0) + 1
+        else:
+            _stats["llm_fallbacks"] += 1
+
+    return result
+
+
+def get_local_intent_stats() -> dict:
+    with _stats_lock:
+        hits = dict(_stats["local_hits"])
+        fallbacks = _stats["llm_fallbacks"]
+
+    total_hits = sum(hits.values())
+    total = total_hits + fallbacks
+
+    return {
+        "local_hits": hits,
+        "llm_calls_saved": total_hits,
+        "llm_fallbacks": fallbacks,
+        "hit_rate": round(total_hits / total, 4) if total else 0.0
+    }
+
+
+def _classify(user_message: str, context) -> dict | None:
+    if GREETING_PATTERN.match(user_message):
+        return _intent(
+            "greeting", 1.0,
+            f"Hello! I can help you explore {context.name}. What would you like to know?",
+            rule="greeting"
+        )
+
+    if HELP_PATTERN.match(user_message):
+        return _intent(
+            "help", 1.0,
+            f"I can help you with {context.name}",
+            rule="help"
+        )
+
+    if not is_safe_query(user_message):
+        return _intent(
+            "unknown", 1.0,
+            "I can only retrieve information, not modify or delete data.",
+            rule="unsafe"
+        )
+
+    domain_key = (context.context_type or "").lower()
+    metric = resolve_metric(domain_key, user_message)
+
+    if not metric or metric not in context.allowed_metrics:
+        return None
+
+    # Only answer when nothing but filler surrounds the alias, so that
+    # "total stock by warehouse" still goes to the model
+    query = user_message.lower()
+    for phrase in METRIC_ALIASES[domain_key][metric]:
+        if phrase in query:
+            residue = re.findall(r"[a-z0-9]+", query.replace(phrase, " "))
+            if all(word in FILLER_WORDS for word in residue):
+                result = _intent(
+                    "get_metric", 0.9,
+                    f"I'll show you {metric.replace('_', ' ')}",
+                    rule="metric_alias"
+                )
+                result["metric_name"] = metric
+                result["domain"] = domain_key
+                return result
+
+    return None
+
+
+def _intent(intent: str, confidence: float, friendly_response: str, rule: str) -> dict:
+    return {
+        "intent": intent,
+        "metric_name": None,
+        "domain": None,
+        "confidence": confidence,
+        "needs_clarification": False,
+        "clarification_question": None,
+        "friendly_response": friendly_response,
+        "source": "local",
+        "_rule": rule
+    }
@@ -4,12 +4,97 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # wait for a free connection before failing
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # reconnect connections older than this
+    DB_POOL_PRE_PING: bool = True
+
+    # Read replica for metric executors and generated SQL (empty = primary
+    # only); used while its replay lag is within REPLICA_MAX_LAG_SECONDS
+    REPLICA_DATABASE_URL: str = ""
+    REPLICA_POOL_SIZE: int = 10
+    REPLICA_MAX_OVERFLOW: int = 10
+    REPLICA_MAX_LAG_SECONDS: float = 30.0
+    REPLICA_LAG_CHECK_SECONDS: float = 5.0
     
     # OpenAI Configuration
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-4o"  # or gpt-4-turbo
     OPENAI_MAX_TOKENS: int = 2048
     OPENAI_TEMPERATURE: float = 0.3
+    OPENAI_TIMEOUT_SECONDS: float = 60.0
+    OPENAI_MAX_RETRIES: int = 2
+
+    # Shared OpenAI HTTP connection pool
+    OPENAI_POOL_MAX_CONNECTIONS: int = 100
+    OPENAI_POOL_MAX_KEEPALIVE: int = 50
+    OPENAI_POOL_KEEPALIVE_EXPIRY: float = 60.0
+
+    # Schema catalog (seconds between schema fingerprint checks)
+    SCHEMA_CATALOG_CHECK_SECONDS: int = 30
+
+    # Sample values (pg_stats, with optional bounded TABLESAMPLE fallback)
+    SAMPLE_VALUES_REFRESH_SECONDS: int = 600
+    SAMPLE_VALUES_MAX_DISTINCT: int = 50
+    SAMPLE_VALUES_TABLESAMPLE: bool = True
+    SAMPLE_VALUES_TABLESAMPLE_PERCENT: float = 1.0
+    SAMPLE_VALUES_TABLESAMPLE_ROWS: int = 10000
+    SAMPLE_VALUES_FULL_SCAN_PAGES: int = 8
+
+    # Semantic question -> SQL cache (per DataContext)
+    SQL_CACHE_ENABLED: bool = True
+    SQL_CACHE_SIMILARITY: float = 0.9
+    SQL_CACHE_MAX_ENTRIES: int = 500
+
+    # Generated SQL validation results kept per (context whitelist, SQL)
+    SQL_VALIDATOR_CACHE_SIZE: int = 1024
+
+    # Local dialect/GROUP BY rewrites tried before the LLM fixes failed SQL
+    SQL_REWRITE_ENABLED: bool = True
+    SQL_REWRITE_MAX_PASSES: int = 3
+
+    # Generated SQL admission: READ ONLY transaction, statement timeout,
+    # outer LIMIT and EXPLAIN cost budget (0 = no limit / no budget)
+    SQL_STATEMENT_TIMEOUT_MS: int = 10000
+    SQL_MAX_ROWS: int = 1000
+    SQL_MAX_COST: float = 1000000.0
+
+    # Opt-in LLM response cache (LLM_CACHE_DISK_PATH enables the SQLite tier)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1000
+    LLM_CACHE_TTL_SECONDS: int = 3600
+    LLM_CACHE_DISK_PATH: str = ""
+
+    # Parallel dashboard metric execution (1 worker = sequential)
+    METRIC_EXECUTOR_WORKERS: int = 8
+    METRIC_TIMEOUT_SECONDS: float = 10.0
+
+    # Run registry metrics as server-side prepared statements (PREPARE/EXECUTE)
+    METRIC_PREPARED_STATEMENTS: bool = True
+
+    # Metric result cache, invalidated through table_data_version
+    METRIC_CACHE_ENABLED: bool = True
+    METRIC_CACHE_MAX_ENTRIES: int = 1000
+
+    # Status KPIs read from trigger-maintained status_counter rows; the
+    # reconcile worker checks them against the base tables
+    STATUS_COUNTERS_ENABLED: bool = True
+    STATUS_COUNTER_RECONCILE_SECONDS: int = 3600
+
+    # Chart metrics read materialized rollups within their staleness
+    # tolerance; the rollup worker refreshes views whose sources changed
+    ROLLUPS_ENABLED: bool = True
+    ROLLUP_REFRESH_SECONDS: int = 60
+
+    # Bounded row metrics: keyset pages on /analytics/*, top-N charts and
+    # first-page tables on the dashboard (0 = unbounded)
+    ANALYTICS_MAX_PAGE_SIZE: int = 500
+    DASHBOARD_CHART_TOP_N: int = 10
+    DASHBOARD_TABLE_PAGE_SIZE: int = 50
+
+    # Streaming exports: rows fetched from the server-side cursor per batch
+    EXPORT_BATCH_SIZE: int = 1000
     
     class Config:
         env_file = ".env"
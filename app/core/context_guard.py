@@ -2,21 +2,13 @@ from fastapi import Depends, HTTPException
 from sqlalchemy.orm import Session
 from uuid import UUID
 
-from app.core.database import SessionLocal
+from app.core.database import get_db
 from app.models import ContextSession
 
 # TEMP until auth is wired
 DUMMY_USER_ID = UUID("22222222-2222-2222-2222-222222222222")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 def require_context_session(
     context_session_id: UUID,
     db: Session = Depends(get_db)
@@ -36,4 +28,8 @@ def require_context_session(
             detail="Invalid or unauthorized context session"
         )
 
+    # Don't keep a connection checked out for the rest of the request
+    db.expunge(session)
+    db.rollback()
+
     return session
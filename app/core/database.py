@@ -1,10 +1,92 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.core.config import get_settings
+from typing import Dict, Any
+import threading
+import time
 
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URL, echo=False)
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._stats = {"checkouts": 0, "timeouts": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+
+    def _do_get(self):
+        # Includes connecting when the pool has to open a new connection
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self._stats["timeouts"] += 1
+            raise
+        finally:
+            waited = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._stats["checkouts"] += 1
+                self._stats["total_wait_ms"] += waited
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], waited)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        stats["size"] = self.size()
+        stats["checked_out"] = self.checkedout()
+        stats["overflow"] = self.overflow()
+        return stats
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int):
+    return create_engine(
+        url,
+        echo=False,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING
+    )
+
+
+# Primary: every write, plus reads that are not routed to the replica
+engine = _create_engine(settings.DATABASE_URL, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
 SessionLocal = sessionmaker(bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+# Separate pool for the parallel metric executor, one connection per worker
+metric_engine = _create_engine(settings.DATABASE_URL, settings.METRIC_EXECUTOR_WORKERS, 0)
+MetricSessionLocal = sessionmaker(bind=metric_engine)
+
+# Optional read replica for metric executors and generated SQL, used through
+# ReplicaRouter while it is reachable and fresh enough
+replica_engine = _create_engine(
+    settings.REPLICA_DATABASE_URL, settings.REPLICA_POOL_SIZE, settings.REPLICA_MAX_OVERFLOW
+) if settings.REPLICA_DATABASE_URL else None
+ReplicaSessionLocal = sessionmaker(bind=replica_engine) if replica_engine is not None else None
+
+Base = declarative_base()
+
+
+def get_db():
+    """
+    Request-scoped session. FastAPI resolves a dependency once per request,
+    so require_context_session and the route share this one session.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    pools = {"primary": engine, "metric": metric_engine, "replica": replica_engine}
+    return {name: e.pool.get_stats() for name, e in pools.items() if e is not None}
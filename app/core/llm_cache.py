@@ -0,0 +1,177 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.core.config import get_settings
+
+
+class LLMResponseCache:
+    """
+    Opt-in, content-addressed cache for deterministic LLM prompts.
+
+    Entries are keyed by a hash of model, messages (system prompt included)
+    and json_mode. The in-memory tier is an LRU with a TTL; when
+    LLM_CACHE_DISK_PATH is set, entries are also written to a SQLite file so
+    they survive restarts. Hits and misses are counted per call site.
+    """
+
+    _entries: "OrderedDict[str, tuple]" = OrderedDict()
+    _lock = threading.Lock()
+    _disk = None
+    _disk_path = None
+    _stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(request_params: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            {
+                "model": request_params["model"],
+                "messages": request_params["messages"],
+                "json_mode": "response_format" in request_params
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def uses_disk() -> bool:
+        """Whether get/set may block on SQLite (async callers should use a thread)"""
+        return bool(get_settings().LLM_CACHE_DISK_PATH)
+
+    @staticmethod
+    def get(site: str, key: str) -> Optional[str]:
+        settings = get_settings()
+        now = time.time()
+
+        with LLMResponseCache._lock:
+            entry = LLMResponseCache._entries.get(key)
+
+            if entry and now - entry[1] > settings.LLM_CACHE_TTL_SECONDS:
+                del LLMResponseCache._entries[key]
+                entry = None
+
+            if entry is None:
+                entry = LLMResponseCache._disk_get(key, now - settings.LLM_CACHE_TTL_SECONDS)
+                if entry:
+                    LLMResponseCache._put_memory(key, entry)
+
+            if entry:
+                LLMResponseCache._entries.move_to_end(key)
+
+            LLMResponseCache._count(site, "hits" if entry else "misses")
+            return entry[0] if entry else None
+
+    @staticmethod
+    def set(site: str, key: str, value: str):
+        if value is None:
+            return
+
+        entry = (value, time.time())
+
+        with LLMResponseCache._lock:
+            LLMResponseCache._put_memory(key, entry)
+            LLMResponseCache._disk_set(key, site, entry)
+            LLMResponseCache._count(site, "stores")
+
+    @staticmethod
+    def clear():
+        with LLMResponseCache._lock:
+            LLMResponseCache._entries.clear()
+            disk = LLMResponseCache._get_disk()
+            if disk is not None:
+                disk.execute("DELETE FROM llm_cache")
+                disk.commit()
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        settings = get_settings()
+
+        with LLMResponseCache._lock:
+            sites = {site: dict(counts) for site, counts in LLMResponseCache._stats.items()}
+            size = len(LLMResponseCache._entries)
+
+        for counts in sites.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / lookups, 4) if lookups else 0.0
+
+        return {
+            "enabled": settings.LLM_CACHE_ENABLED,
+            "memory_entries": size,
+            "max_entries": settings.LLM_CACHE_MAX_ENTRIES,
+            "ttl_seconds": settings.LLM_CACHE_TTL_SECONDS,
+            "disk_path": settings.LLM_CACHE_DISK_PATH or None,
+            "sites": sites
+        }
+
+    @staticmethod
+    def _put_memory(key: str, entry: tuple):
+        entries = LLMResponseCache._entries
+        entries[key] = entry
+        entries.move_to_end(key)
+
+        while len(entries) > get_settings().LLM_CACHE_MAX_ENTRIES:
+            entries.popitem(last=False)
+
+    @staticmethod
+    def _count(site: str, field: str):
+        counts = LLMResponseCache._stats.setdefault(
+            site, {"hits": 0, "misses": 0, "stores": 0}
+        )
+        counts[field] += 1
+
+    @staticmethod
+    def _get_disk():
+        path = get_settings().LLM_CACHE_DISK_PATH
+        if not path:
+            return None
+
+        if LLMResponseCache._disk is None or LLMResponseCache._disk_path != path:
+            disk = sqlite3.connect(path, check_same_thread=False)
+            disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, site TEXT, value TEXT, created_at REAL)"
+            )
+            disk.commit()
+            LLMResponseCache._disk = disk
+            LLMResponseCache._disk_path = path
+
+        return LLMResponseCache._disk
+
+    @staticmethod
+    def _disk_get(key: str, oldest: float) -> Optional[tuple]:
+        try:
+            disk = LLMResponseCache._get_disk()
+            if disk is None:
+                return None
+
+            row = disk.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, oldest)
+            ).fetchone()
+            return tuple(row) if row else None
+        except sqlite3.Error as e:
+            print(f"⚠️  LLM cache read failed: {e}")
+            return None
+
+    @staticmethod
+    def _disk_set(key: str, site: str, entry: tuple):
+        try:
+            disk = LLMResponseCache._get_disk()
+            if disk is None:
+                return
+
+            disk.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?",
+                (entry[1] - get_settings().LLM_CACHE_TTL_SECONDS,)
+            )
+            disk.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, site, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, site, entry[0], entry[1])
+            )
+            disk.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  LLM cache write failed: {e}")
@@ -0,0 +1,201 @@
+import threading
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from app.core.config import get_settings
+
+
+class _PoolInstrumentation:
+    """Request and connection counters shared by the sync and async transports"""
+
+    def _init_instrumentation(self, stats: dict, lock: threading.Lock):
+        self._stats = stats
+        self._lock = lock
+        self._seen = weakref.WeakSet()
+
+    def _request_started(self):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["max_in_flight"] = max(
+                self._stats["max_in_flight"], self._stats["in_flight"]
+            )
+
+    def _request_failed(self):
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def _request_finished(self):
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            for conn in self._pool.connections:
+                if conn not in self._seen:
+                    self._seen.add(conn)
+                    self._stats["connections_opened"] += 1
+
+    def pool_snapshot(self) -> dict:
+        connections = list(self._pool.connections)
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle
+        }
+
+
+class _InstrumentedTransport(_PoolInstrumentation, httpx.HTTPTransport):
+
+    def __init__(self, stats: dict, lock: threading.Lock, **kwargs):
+        super().__init__(**kwargs)
+        self._init_instrumentation(stats, lock)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._request_started()
+        try:
+            return super().handle_request(request)
+        except Exception:
+            self._request_failed()
+            raise
+        finally:
+            self._request_finished()
+
+
+class _InstrumentedAsyncTransport(_PoolInstrumentation, httpx.AsyncHTTPTransport):
+
+    def __init__(self, stats: dict, lock: threading.Lock, **kwargs):
+        super().__init__(**kwargs)
+        self._init_instrumentation(stats, lock)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._request_started()
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            self._request_failed()
+            raise
+        finally:
+            self._request_finished()
+
+
+class OpenAIClientManager:
+    """
+    One OpenAI client (and one AsyncOpenAI client) per process, each backed
+    by a tuned keep-alive connection pool. Every AI call site goes through
+    get_openai_client() / get_async_openai_client().
+    """
+
+    _client = None
+    _transport = None
+    _async_client = None
+    _async_transport = None
+    _lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _stats = {
+        "requests": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "errors": 0,
+        "connections_opened": 0
+    }
+
+    @staticmethod
+    def get_client() -> OpenAI:
+        if OpenAIClientManager._client is not None:
+            return OpenAIClientManager._client
+
+        with OpenAIClientManager._lock:
+            if OpenAIClientManager._client is None:
+                settings = get_settings()
+
+                transport = _InstrumentedTransport(
+                    OpenAIClientManager._stats,
+                    OpenAIClientManager._stats_lock,
+                    limits=OpenAIClientManager._limits()
+                )
+
+                OpenAIClientManager._transport = transport
+                OpenAIClientManager._client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+                    max_retries=settings.OPENAI_MAX_RETRIES,
+                    http_client=DefaultHttpxClient(transport=transport)
+                )
+
+        return OpenAIClientManager._client
+
+    @staticmethod
+    def get_async_client() -> AsyncOpenAI:
+        if OpenAIClientManager._async_client is not None:
+            return OpenAIClientManager._async_client
+
+        with OpenAIClientManager._lock:
+            if OpenAIClientManager._async_client is None:
+                settings = get_settings()
+
+                transport = _InstrumentedAsyncTransport(
+                    OpenAIClientManager._stats,
+                    OpenAIClientManager._stats_lock,
+                    limits=OpenAIClientManager._limits()
+                )
+
+                OpenAIClientManager._async_transport = transport
+                OpenAIClientManager._async_client = AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+                    max_retries=settings.OPENAI_MAX_RETRIES,
+                    http_client=DefaultAsyncHttpxClient(transport=transport)
+                )
+
+        return OpenAIClientManager._async_client
+
+    @staticmethod
+    def get_pool_stats() -> dict:
+        """Request counters plus a snapshot of the HTTP connection pool"""
+        settings = get_settings()
+
+        with OpenAIClientManager._stats_lock:
+            stats = dict(OpenAIClientManager._stats)
+
+        stats["connections_reused"] = max(stats["requests"] - stats["connections_opened"], 0)
+        stats["max_connections"] = settings.OPENAI_POOL_MAX_CONNECTIONS
+        stats["max_keepalive_connections"] = settings.OPENAI_POOL_MAX_KEEPALIVE
+
+        if OpenAIClientManager._transport is not None:
+            stats["sync_pool"] = OpenAIClientManager._transport.pool_snapshot()
+
+        if OpenAIClientManager._async_transport is not None:
+            stats["async_pool"] = OpenAIClientManager._async_transport.pool_snapshot()
+
+        return stats
+
+    @staticmethod
+    async def aclose():
+        with OpenAIClientManager._lock:
+            client = OpenAIClientManager._async_client
+            OpenAIClientManager._async_client = None
+            OpenAIClientManager._async_transport = None
+
+            if OpenAIClientManager._client is not None:
+                OpenAIClientManager._client.close()
+            OpenAIClientManager._client = None
+            OpenAIClientManager._transport = None
+
+        if client is not None:
+            await client.close()
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        settings = get_settings()
+        return httpx.Limits(
+            max_connections=settings.OPENAI_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OPENAI_POOL_KEEPALIVE_EXPIRY
+        )
+
+
+def get_openai_client() -> OpenAI:
+    return OpenAIClientManager.get_client()
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    return OpenAIClientManager.get_async_client()
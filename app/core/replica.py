@@ -0,0 +1,144 @@
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.core.config import get_settings
+from app.core.database import engine, replica_engine, SessionLocal, ReplicaSessionLocal
+from typing import Dict, Any, Iterator
+import threading
+import time
+
+
+class ReplicaRouter:
+    """
+    Routes read-only work (metric executors, generated SQL, exports) to
+    REPLICA_DATABASE_URL. Writes never come here and stay on the primary.
+
+    The replica is used while it answers and its replay lag is within
+    REPLICA_MAX_LAG_SECONDS, otherwise reads fall back to the primary.
+    Lag is rechecked at most every REPLICA_LAG_CHECK_SECONDS. A replica
+    that has replayed up to the primary's current WAL position has no lag,
+    however long ago its last replayed transaction was.
+    """
+
+    _fresh = False
+    _checked_at = None
+    _check_lock = threading.Lock()
+    _lock = threading.Lock()
+    _stats = {"replica_reads": 0, "primary_reads": 0, "lag_seconds": None, "last_error": None}
+
+    @staticmethod
+    def enabled() -> bool:
+        return replica_engine is not None
+
+    @staticmethod
+    def use_replica() -> bool:
+        """Whether read-only work should go to the replica right now"""
+        if not ReplicaRouter.enabled():
+            return False
+
+        now = time.monotonic()
+        checked_at = ReplicaRouter._checked_at
+        if checked_at is not None and now - checked_at < get_settings().REPLICA_LAG_CHECK_SECONDS:
+            return ReplicaRouter._fresh
+
+        # One caller rechecks; the others keep the last answer meanwhile
+        if not ReplicaRouter._check_lock.acquire(blocking=checked_at is None):
+            return ReplicaRouter._fresh
+        try:
+            ReplicaRouter._check()
+        finally:
+            ReplicaRouter._check_lock.release()
+
+        return ReplicaRouter._fresh
+
+    @staticmethod
+    def session(primary=SessionLocal) -> Session:
+        """A new session for read-only work: the replica's, or one from primary"""
+        if ReplicaRouter.use_replica():
+            ReplicaRouter._count("replica_reads")
+            return ReplicaSessionLocal()
+
+        ReplicaRouter._count("primary_reads")
+        return primary()
+
+    @staticmethod
+    @contextmanager
+    def reading(db: Session) -> Iterator[Session]:
+        """
+        A replica session for a block of read-only work, or the caller's
+        own session when the replica is not used
+        """
+        if not ReplicaRouter.use_replica():
+            ReplicaRouter._count("primary_reads")
+            yield db
+            return
+
+        ReplicaRouter._count("replica_reads")
+        read_db = ReplicaSessionLocal()
+        try:
+            yield read_db
+        finally:
+            read_db.rollback()
+            read_db.close()
+
+    @staticmethod
+    def lag_seconds() -> float:
+        """Replay lag of the replica behind the primary (0 when caught up)"""
+        with engine.connect() as primary:
+            primary_lsn = primary.execute(text(
+                "SELECT CASE WHEN pg_is_in_recovery() THEN NULL ELSE pg_current_wal_lsn()::text END"
+            )).scalar()
+
+        with replica_engine.connect() as replica:
+            row = replica.execute(text("""
+                SELECT
+                    pg_is_in_recovery() AS standby,
+                    coalesce(pg_wal_lsn_diff(CAST(:primary_lsn AS pg_lsn), pg_last_wal_replay_lsn()), 0) AS behind,
+                    extract(epoch FROM now() - pg_last_xact_replay_timestamp()) AS replay_age
+            """), {"primary_lsn": primary_lsn}).mappings().one()
+
+        if not row["standby"] or row["behind"] <= 0:
+            return 0.0
+
+        return float(row["replay_age"]) if row["replay_age"] is not None else float("inf")
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        with ReplicaRouter._lock:
+            stats = dict(ReplicaRouter._stats)
+        if stats["lag_seconds"] == float("inf"):
+            # Never replayed anything; not representable in JSON
+            stats["lag_seconds"] = None
+        stats["enabled"] = ReplicaRouter.enabled()
+        stats["using_replica"] = ReplicaRouter.use_replica()
+        if replica_engine is not None:
+            stats["replica_pool"] = replica_engine.pool.status()
+        return stats
+
+    @staticmethod
+    def _check():
+        try:
+            lag = ReplicaRouter.lag_seconds()
+            error = None
+        except Exception as e:
+            lag, error = None, str(e).split("\n")[0]
+
+        fresh = lag is not None and lag <= get_settings().REPLICA_MAX_LAG_SECONDS
+
+        if fresh != ReplicaRouter._fresh or ReplicaRouter._checked_at is None:
+            if fresh:
+                print("✅ Read replica in use")
+            else:
+                print(f"⚠️  Read replica not used ({error or f'lag {lag:.1f}s'}), reading from primary")
+
+        with ReplicaRouter._lock:
+            ReplicaRouter._stats["lag_seconds"] = lag
+            ReplicaRouter._stats["last_error"] = error
+
+        ReplicaRouter._fresh = fresh
+        ReplicaRouter._checked_at = time.monotonic()
+
+    @staticmethod
+    def _count(name: str):
+        with ReplicaRouter._lock:
+            ReplicaRouter._stats[name] += 1
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing. Concurrent callers with the same key wait on one
+    in-flight computation and share its result (or its exception); nothing
+    is cached once the call returns.
+
+    Keys are tuples starting with the operation name, e.g.
+    ("dashboard", data_context_id), which is also how calls are counted.
+    """
+
+    _calls: Dict[Hashable, _Call] = {}
+    _tasks: Dict[Hashable, asyncio.Task] = {}
+    _lock = threading.Lock()
+    _stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def do(key: tuple, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) once for all concurrent callers with this key"""
+        with SingleFlight._lock:
+            call = SingleFlight._calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = _Call()
+                SingleFlight._calls[key] = call
+
+            SingleFlight._count(key, "executions" if leader else "shared")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with SingleFlight._lock:
+                SingleFlight._calls.pop(key, None)
+            call.done.set()
+
+    @staticmethod
+    async def ado(key: tuple, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Async variant of do(): await fn(*args, **kwargs) once for all
+        concurrent callers. The shared task is shielded, so one caller
+        disconnecting does not cancel it for the others.
+        """
+        with SingleFlight._lock:
+            task = SingleFlight._tasks.get(key)
+            leader = task is None
+
+            if leader:
+                task = asyncio.ensure_future(fn(*args, **kwargs))
+                SingleFlight._tasks[key] = task
+                task.add_done_callback(lambda _: SingleFlight._forget(key, task))
+
+            SingleFlight._count(key, "executions" if leader else "shared")
+
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        with SingleFlight._lock:
+            operations = {op: dict(counts) for op, counts in SingleFlight._stats.items()}
+            in_flight = len(SingleFlight._calls) + len(SingleFlight._tasks)
+
+        return {
+            "in_flight": in_flight,
+            "operations": operations
+        }
+
+    @staticmethod
+    def _forget(key: tuple, task: asyncio.Task):
+        with SingleFlight._lock:
+            if SingleFlight._tasks.get(key) is task:
+                del SingleFlight._tasks[key]
+
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    def _count(key: tuple, field: str):
+        counts = SingleFlight._stats.setdefault(key[0], {"executions": 0, "shared": 0})
+        counts[field] += 1
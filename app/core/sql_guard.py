@@ -0,0 +1,89 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.core.config import get_settings
+from typing import Dict, Any, List
+import threading
+
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+
+class SqlCostGuard:
+    """
+    Admission control for generated SQL.
+
+    The statement runs in a READ ONLY transaction under SET LOCAL
+    statement_timeout. It is wrapped in an outer LIMIT of
+    SQL_MAX_ROWS (+1, to tell when rows were cut), which is the rewrite
+    for queries over the row budget. It is refused before execution when
+    EXPLAIN puts the limited plan above SQL_MAX_COST, e.g. a cartesian
+    join that has to be sorted in full.
+    """
+
+    _lock = threading.Lock()
+    _stats = {"admitted": 0, "rejected": 0, "limited": 0, "truncated": 0, "timeouts": 0, "max_cost_seen": 0.0}
+
+    @staticmethod
+    def execute(db: Session, sql: str) -> List[Dict[str, Any]]:
+        """Admit and run generated SQL, returning at most SQL_MAX_ROWS rows"""
+        limit = get_settings().SQL_MAX_ROWS
+        sql = SqlCostGuard.admit(db, sql, limit)
+
+        try:
+            rows = db.execute(text(sql)).mappings().all()
+        except Exception as e:
+            if getattr(getattr(e, "orig", None), "pgcode", None) == QUERY_CANCELED:
+                SqlCostGuard._count("timeouts")
+            raise
+
+        if limit and len(rows) > limit:
+            SqlCostGuard._count("truncated")
+            print(f"⚠️  Generated SQL returned more than {limit} rows, truncated")
+            rows = rows[:limit]
+
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def admit(db: Session, sql: str, limit: int = None) -> str:
+        """
+        Make the current transaction read-only and time-limited, then check
+        the plan. Returns the SQL to run (with the outer LIMIT when given);
+        raises ValueError when the estimated cost is over budget.
+        """
+        settings = get_settings()
+        sql = sql.strip().rstrip(";").rstrip()
+
+        db.execute(text("SET TRANSACTION READ ONLY"))
+        db.execute(text(f"SET LOCAL statement_timeout = {int(settings.SQL_STATEMENT_TIMEOUT_MS)}"))
+
+        if limit:
+            sql = f"SELECT * FROM (\n{sql}\n) AS generated LIMIT {int(limit) + 1}"
+
+        plan = db.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()[0]["Plan"]
+        cost = float(plan["Total Cost"])
+
+        with SqlCostGuard._lock:
+            SqlCostGuard._stats["max_cost_seen"] = max(SqlCostGuard._stats["max_cost_seen"], cost)
+            # The LIMIT node's input is the query as generated
+            if limit and plan.get("Plans") and plan["Plans"][0]["Plan Rows"] > limit:
+                SqlCostGuard._stats["limited"] += 1
+
+        if settings.SQL_MAX_COST and cost > settings.SQL_MAX_COST:
+            SqlCostGuard._count("rejected")
+            raise ValueError(
+                f"Query too expensive: estimated cost {cost:.0f} exceeds the budget of "
+                f"{settings.SQL_MAX_COST:.0f}; add filters or aggregate further"
+            )
+
+        SqlCostGuard._count("admitted")
+        return sql
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        with SqlCostGuard._lock:
+            return dict(SqlCostGuard._stats)
+
+    @staticmethod
+    def _count(name: str):
+        with SqlCostGuard._lock:
+            SqlCostGuard._stats[name] += 1
@@ -0,0 +1,420 @@
+from app.core.config import get_settings
+from app.core.sql_validator import SqlValidator
+from typing import Dict, Any, List, Optional, Tuple
+import re
+import threading
+
+# SQLSTATEs the rules respond to
+SYNTAX_ERROR = "42601"
+UNDEFINED_FUNCTION = "42883"
+GROUPING_ERROR = "42803"
+
+# MySQL / T-SQL functions -> PostgreSQL; a value ending in "()" replaces
+# the whole zero-argument call, otherwise only the name
+FUNCTIONS = {
+    "curdate": "CURRENT_DATE",
+    "curtime": "CURRENT_TIME",
+    "getdate": "now()",
+    "sysdate": "now()",
+    "ifnull": "coalesce",
+    "isnull": "coalesce",
+    "nvl": "coalesce",
+    "len": "length",
+    "ucase": "upper",
+    "lcase": "lower",
+}
+
+INTERVAL_UNITS = {
+    "microsecond", "millisecond", "second", "minute", "hour",
+    "day", "week", "month", "year",
+}
+
+# Dialect mistakes surface as syntax errors or unknown functions
+DIALECT_ERRORS = {SYNTAX_ERROR, UNDEFINED_FUNCTION}
+
+# Words ending a GROUP BY list
+AFTER_GROUP_BY = {
+    ("word", w) for w in (
+        "having", "order", "limit", "offset", "window", "fetch", "for",
+        "union", "intersect", "except",
+    )
+}
+
+# Words ending a SELECT list
+SELECT_LIST_END = {
+    ("word", w) for w in ("from", "where", "group", "into", "window")
+} | AFTER_GROUP_BY
+
+MISSING_GROUP_BY = re.compile(r'column "([^"]+)" must appear in the GROUP BY clause')
+
+Token = Tuple[str, str, int, int]
+Edit = Tuple[int, int, str]
+
+
+class SqlRewriter:
+    """
+    Deterministic repairs for generated SQL that failed to execute, tried
+    before asking the LLM to fix it.
+
+    Each rule in RULES answers one or more SQLSTATEs and returns text edits
+    for the failed statement: MySQL/T-SQL spellings the prompt already
+    warns about (CURDATE(), INTERVAL 7 DAY, TOP n, LIMIT a, b, backtick
+    identifiers, IFNULL, GROUP_CONCAT, ...) and, for grouping errors, the
+    column PostgreSQL reports missing from GROUP BY. Tokens come from
+    SqlValidator.scan, so literals and comments are never touched.
+    """
+
+    _lock = threading.Lock()
+    _stats = {"rewrites": 0, "llm_calls_saved": 0, "unrepaired": 0, "rules": {}}
+
+    @staticmethod
+    def rewrite(sql: str, error: Exception) -> Optional[Dict[str, Any]]:
+        """{"sql", "rules"} with every rule for the error's SQLSTATE applied, or None"""
+        if not get_settings().SQL_REWRITE_ENABLED or not sql:
+            return None
+
+        code = SqlRewriter.sqlstate(error)
+        sql = sql.strip().rstrip(";").rstrip()
+
+        try:
+            tokens = SqlValidator.scan(sql)
+        except ValueError:
+            return None
+
+        edits, fired = [], []
+        for name, rule in RULES.items():
+            if code not in rule["codes"]:
+                continue
+            rule_edits = rule["edits"](sql, tokens, error)
+            if rule_edits:
+                edits += rule_edits
+                fired.append(name)
+
+        if not edits:
+            return None
+
+        # Overlapping edits (e.g. IFNULL inside GROUP_CONCAT) keep the outer
+        # one; the next pass picks up the rest
+        kept = []
+        for edit in sorted(edits, key=lambda e: (e[0], -e[1])):
+            if kept and edit[0] < kept[-1][1]:
+                continue
+            kept.append(edit)
+
+        # Applied back to front so earlier offsets stay valid
+        for start, end, replacement in reversed(kept):
+            sql = sql[:start] + replacement + sql[end:]
+
+        with SqlRewriter._lock:
+            SqlRewriter._stats["rewrites"] += 1
+            for name in fired:
+                SqlRewriter._stats["rules"][name] = SqlRewriter._stats["rules"].get(name, 0) + 1
+
+        return {"sql": sql, "rules": fired}
+
+    @staticmethod
+    def record_repair(repaired: bool = True):
+        """Count a failed query the rewrites did (or did not) get running"""
+        with SqlRewriter._lock:
+            if repaired:
+                SqlRewriter._stats["llm_calls_saved"] += 1
+            else:
+                SqlRewriter._stats["unrepaired"] += 1
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        with SqlRewriter._lock:
+            stats = dict(SqlRewriter._stats)
+            stats["rules"] = dict(stats["rules"])
+        return stats
+
+    @staticmethod
+    def sqlstate(error: Exception) -> Optional[str]:
+        """The psycopg2 SQLSTATE behind a (SQLAlchemy-wrapped) database error"""
+        return getattr(getattr(error, "orig", error), "pgcode", None)
+
+
+def _at(tokens: List[Token], i: int) -> Tuple[Optional[str], Optional[str]]:
+    return tokens[i][:2] if 0 <= i < len(tokens) else (None, None)
+
+
+def _close_paren(tokens: List[Token], i: int) -> Optional[int]:
+    """Index of the parenthesis closing the one at i"""
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j][:2] == ("punct", "("):
+            depth += 1
+        elif tokens[j][:2] == ("punct", ")"):
+            depth -= 1
+            if depth == 0:
+                return j
+    return None
+
+
+def _depths(tokens: List[Token]) -> List[int]:
+    """Parenthesis depth of every token"""
+    depths, depth = [], 0
+    for kind, value, _, _ in tokens:
+        if (kind, value) == ("punct", ")"):
+            depth -= 1
+        depths.append(depth)
+        if (kind, value) == ("punct", "("):
+            depth += 1
+    return depths
+
+
+def _functions(sql: str, tokens: List[Token], error) -> List[Edit]:
+    edits = []
+    for i, (kind, value, start, end) in enumerate(tokens):
+        if kind != "word" or value not in FUNCTIONS or _at(tokens, i + 1) != ("punct", "("):
+            continue
+        if _at(tokens, i - 1) == ("punct", "."):
+            continue
+
+        replacement = FUNCTIONS[value]
+        if replacement.isupper() or replacement.endswith("()"):
+            if _at(tokens, i + 2) != ("punct", ")"):
+                continue
+            edits.append((start, tokens[i + 2][3], replacement))
+        else:
+            edits.append((start, end, replacement))
+    return edits
+
+
+def _group_concat(sql: str, tokens: List[Token], error) -> List[Edit]:
+    """GROUP_CONCAT([DISTINCT] x [ORDER BY ...] [SEPARATOR s]) -> string_agg"""
+    edits = []
+    for i, (kind, value, start, _) in enumerate(tokens):
+        if (kind, value) != ("word", "group_concat") or _at(tokens, i + 1) != ("punct", "("):
+            continue
+
+        close = _close_paren(tokens, i + 1)
+        if close is None or close == i + 2:
+            continue
+
+        first = i + 2
+        distinct = _at(tokens, first) == ("word", "distinct")
+        if distinct:
+            first += 1
+
+        depths = _depths(tokens)
+        order = separator = None
+        for j in range(first, close):
+            if depths[j] != depths[i + 2]:
+                continue
+            if tokens[j][:2] == ("word", "order") and order is None:
+                order = j
+            elif tokens[j][:2] == ("word", "separator"):
+                separator = j
+
+        expr_end = min(j for j in (order, separator, close) if j is not None)
+        if expr_end == first:
+            continue
+
+        expr = sql[tokens[first][2]:tokens[expr_end - 1][3]]
+        order_by = sql[tokens[order][2]:tokens[(separator or close) - 1][3]] if order else ""
+        delimiter = "','"
+        if separator is not None:
+            if separator + 1 >= close or tokens[separator + 1][0] != "string":
+                continue
+            delimiter = sql[tokens[separator + 1][2]:tokens[separator + 1][3]]
+
+        edits.append((
+            start, tokens[close][3],
+            f"string_agg({'DISTINCT ' if distinct else ''}({expr})::text, {delimiter}"
+            f"{' ' + order_by if order_by else ''})"
+        ))
+    return edits
+
+
+def _intervals(sql: str, tokens: List[Token], error) -> List[Edit]:
+    """INTERVAL 7 DAY -> INTERVAL '7 days'"""
+    edits = []
+    for i, (kind, value, _, _) in enumerate(tokens):
+        if (kind, value) != ("word", "interval"):
+            continue
+        amount, unit = _at(tokens, i + 1), _at(tokens, i + 2)
+        if amount[0] != "number" or unit[0] != "word":
+            continue
+        singular = unit[1][:-1] if unit[1].endswith("s") else unit[1]
+        if singular not in INTERVAL_UNITS:
+            continue
+        edits.append((tokens[i + 1][2], tokens[i + 2][3], f"'{amount[1]} {singular}s'"))
+    return edits
+
+
+def _top(sql: str, tokens: List[Token], error) -> List[Edit]:
+    """SELECT TOP n ... -> SELECT ... LIMIT n, for the outermost query"""
+    depths = _depths(tokens)
+    if any(d == 0 and t[:2] in (("word", "limit"), ("word", "fetch")) for d, t in zip(depths, tokens)):
+        return []
+
+    for i, (kind, value, _, _) in enumerate(tokens):
+        if depths[i] != 0 or (kind, value) != ("word", "select"):
+            continue
+
+        j = i + 1
+        if _at(tokens, j) in (("word", "distinct"), ("word", "all")):
+            j += 1
+        if _at(tokens, j) != ("word", "top"):
+            return []
+
+        if _at(tokens, j + 1)[0] == "number":
+            n, last = tokens[j + 1][1], j + 1
+        elif _at(tokens, j + 1) == ("punct", "(") and _at(tokens, j + 2)[0] == "number" \
+                and _at(tokens, j + 3) == ("punct", ")"):
+            n, last = tokens[j + 2][1], j + 3
+        else:
+            return []
+
+        if _at(tokens, last + 1) in (("word", "percent"), ("word", "with")):
+            return []
+
+        return [
+            (tokens[j][2], tokens[last + 1][2] if last + 1 < len(tokens) else tokens[last][3], ""),
+            (len(sql), len(sql), f" LIMIT {n}"),
+        ]
+    return []
+
+
+def _limit_offset(sql: str, tokens: List[Token], error) -> List[Edit]:
+    """LIMIT a, b -> LIMIT b OFFSET a"""
+    edits = []
+    for i, (kind, value, start, _) in enumerate(tokens):
+        if (
+            (kind, value) == ("word", "limit")
+            and _at(tokens, i + 1)[0] == "number"
+            and _at(tokens, i + 2) == ("punct", ",")
+            and _at(tokens, i + 3)[0] == "number"
+        ):
+            edits.append((start, tokens[i + 3][3], f"LIMIT {tokens[i + 3][1]} OFFSET {tokens[i + 1][1]}"))
+    return edits
+
+
+def _backticks(sql: str, tokens: List[Token], error) -> List[Edit]:
+    """`name` -> "name" (the lexer reads backticks as operator characters)"""
+    return [
+        (start, end, value.replace("`", '"'))
+        for kind, value, start, end in tokens
+        if kind == "op" and "`" in value
+    ]
+
+
+def _selects_bare(tokens: List[Token], depths: List[int], depth: int, anchor: int, parts: List[str]) -> bool:
+    """
+    Whether the SELECT list before tokens[anchor] at this depth has the
+    column as a plain item (optionally aliased), not inside an expression
+    """
+    selects = [i for i in range(anchor) if depths[i] == depth and tokens[i][:2] == ("word", "select")]
+    if not selects:
+        return False
+
+    i = selects[-1] + 1
+    if _at(tokens, i) in (("word", "distinct"), ("word", "all")):
+        if _at(tokens, i) == ("word", "distinct") and _at(tokens, i + 1) == ("word", "on"):
+            return False
+        i += 1
+
+    items, item = [], []
+    while i < len(tokens) and depths[i] >= depth:
+        if depths[i] == depth and tokens[i][:2] in SELECT_LIST_END:
+            break
+        if depths[i] == depth and tokens[i][:2] == ("punct", ","):
+            items.append(item)
+            item = []
+        else:
+            item.append(tokens[i][:2])
+        i += 1
+    items.append(item)
+
+    for item in items:
+        if len(item) > 2 and item[-2] == ("word", "as"):
+            item = item[:-2]
+        elif len(item) > 1 and item[-1][0] in ("word", "ident") and item[-2][0] in ("word", "ident"):
+            item = item[:-1]
+
+        names = item[0::2]
+        if (
+            not names
+            or any(kind not in ("word", "ident") for kind, _ in names)
+            or any(sep != ("punct", ".") for sep in item[1::2])
+            or len(item) % 2 == 0
+        ):
+            continue
+
+        shared = min(len(names), len(parts))
+        if [value for _, value in names][-shared:] == parts[-shared:]:
+            return True
+
+    return False
+
+
+def _missing_group_by(sql: str, tokens: List[Token], error) -> List[Edit]:
+    """
+    Add the column PostgreSQL reports missing to the (only) GROUP BY, when
+    the SELECT list has it as a plain column. A column used inside an
+    expression (date_trunc('month', order_date)) means the query meant to
+    group by that expression, which is left to the LLM.
+    """
+    match = MISSING_GROUP_BY.search(str(getattr(error, "orig", error)))
+    if not match:
+        return []
+
+    column = ".".join(
+        part if re.fullmatch(r"[a-z_][a-z0-9_$]*", part) else '"' + part.replace('"', '""') + '"'
+        for part in match.group(1).split(".")
+    )
+
+    depths = _depths(tokens)
+    group_by = [
+        i for i in range(len(tokens) - 1)
+        if tokens[i][:2] == ("word", "group") and tokens[i + 1][:2] == ("word", "by")
+    ]
+
+    if len(group_by) > 1:
+        return []
+
+    parts = match.group(1).split(".")
+
+    if not group_by:
+        if sum(1 for i, t in enumerate(tokens) if depths[i] == 0 and t[:2] == ("word", "select")) != 1:
+            return []
+        if not _selects_bare(tokens, depths, 0, len(tokens), parts):
+            return []
+
+        # Aggregating query without GROUP BY: add one before the next clause
+        for i, token in enumerate(tokens):
+            if depths[i] == 0 and token[:2] in AFTER_GROUP_BY:
+                return [(tokens[i - 1][3], tokens[i - 1][3], f" GROUP BY {column}")]
+        return [(len(sql), len(sql), f" GROUP BY {column}")]
+
+    start = group_by[0] + 2
+    depth = depths[group_by[0]]
+
+    if not _selects_bare(tokens, depths, depth, group_by[0], parts):
+        return []
+
+    end = start
+    while end < len(tokens) and not (
+        depths[end] < depth
+        or (depths[end] == depth and tokens[end][:2] in AFTER_GROUP_BY)
+    ):
+        end += 1
+
+    listed = sql[tokens[start][2]:tokens[end - 1][3]] if end > start else ""
+    if re.search(rf"(?<![\w.]){re.escape(column)}(?![\w])", listed):
+        return []
+
+    return [(tokens[end - 1][3], tokens[end - 1][3], f", {column}")]
+
+
+# Rule name -> SQLSTATEs it answers and the edits it proposes
+RULES = {
+    "mysql_functions": {"codes": DIALECT_ERRORS, "edits": _functions},
+    "group_concat": {"codes": DIALECT_ERRORS, "edits": _group_concat},
+    "interval_units": {"codes": DIALECT_ERRORS, "edits": _intervals},
+    "top_n": {"codes": DIALECT_ERRORS, "edits": _top},
+    "limit_offset": {"codes": DIALECT_ERRORS, "edits": _limit_offset},
+    "backtick_identifiers": {"codes": DIALECT_ERRORS, "edits": _backticks},
+    "missing_group_by": {"codes": {GROUPING_ERROR}, "edits": _missing_group_by},
+}
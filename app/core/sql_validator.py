@@ -0,0 +1,555 @@
+from collections import OrderedDict
+from app.core.config import get_settings
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import re
+import threading
+
+# One alternation per token class, tried in order at each position. Comments
+# and dollar-quoted strings need a scan for their end and are handled in
+# _tokenize.
+TOKEN_PATTERN = re.compile(r"""
+      (?P<space>\s+)
+    | (?P<comment>--[^\n]*)
+    | (?P<string>[Ee]'(?:[^'\\]|''|\\.)*'|(?:[BbXxNn]|[Uu]&)?'(?:[^']|'')*')
+    | (?P<ident>(?:[Uu]&)?"(?:[^"]|"")*")
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[Ee][+-]?\d+)?)
+    | (?P<param>\$\d+)
+    | (?P<word>[A-Za-z_\u0080-\uffff][A-Za-z0-9_$\u0080-\uffff]*)
+    | (?P<punct>::|[(),;.\[\]])
+    | (?P<op>[-+*/<>=~!@#%^&|`?:]+)
+""", re.VERBOSE | re.DOTALL)
+
+DOLLAR_QUOTE = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$")
+
+# Words that make a statement write, lock, or leave the read-only SELECT
+FORBIDDEN_KEYWORDS = {
+    "insert", "update", "delete", "merge", "upsert", "into",
+    "create", "alter", "drop", "truncate", "rename",
+    "grant", "revoke", "copy", "execute", "call", "do",
+    "prepare", "deallocate", "discard", "reset", "load", "import",
+    "vacuum", "analyze", "cluster", "reindex", "refresh", "lock",
+    "listen", "unlisten", "notify", "checkpoint",
+    "begin", "commit", "rollback", "savepoint", "release",
+}
+
+# Functions with side effects or that read outside the allowed tables
+FORBIDDEN_FUNCTIONS = {
+    "pg_sleep", "pg_sleep_for", "pg_sleep_until",
+    "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "pg_stat_file",
+    "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf", "pg_rotate_logfile",
+    "pg_notify", "set_config", "nextval", "setval",
+    "query_to_xml", "query_to_xml_and_xmlschema", "cursor_to_xml",
+    "table_to_xml", "table_to_xml_and_xmlschema", "schema_to_xml", "database_to_xml",
+}
+FORBIDDEN_FUNCTION_PREFIXES = ("lo_", "dblink", "pg_advisory", "pg_try_advisory", "pg_file_")
+
+# Words ending a FROM list, and words that cannot be a table alias
+CLAUSE_END = {
+    "where", "group", "having", "order", "limit", "offset", "fetch",
+    "union", "intersect", "except", "window", "for",
+}
+NOT_ALIAS = CLAUSE_END | {
+    "on", "using", "join", "inner", "left", "right", "full", "outer",
+    "cross", "natural", "lateral", "tablesample", "as", "with",
+}
+QUERY_START = {"select", "with", "values"}
+
+# Tables' own keys stay joinable even when allowed_columns omits them
+JOIN_KEYS = {"id"}
+
+
+class SqlValidator:
+    """
+    Token-level validation of generated SQL.
+
+    A query passes when it is a single SELECT (or WITH ... SELECT)
+    statement with no writing, locking or side-effecting words outside of
+    literals, quoted identifiers and comments, reading only the context's
+    allowed_tables and, for tables listed in allowed_columns, only those
+    columns (plus join keys). Unqualified columns are checked against the
+    schema catalog when one is given.
+
+    Results are kept in a bounded LRU per (whitelist, SQL), since the same
+    candidate is validated when generated, executed and exported.
+    """
+
+    _results: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+    _whitelists: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    _lock = threading.Lock()
+    _stats = {
+        "validations": 0,
+        "cache_hits": 0,
+        "rejected": 0,
+        "rejections": {},
+        "llm_retries_avoided": 0,
+    }
+
+    @staticmethod
+    def validate(
+        sql: str,
+        context=None,
+        catalog: Dict[str, Any] = None,
+        candidate: bool = False
+    ) -> Dict[str, Any]:
+        """
+        {"is_safe", "reason", "tables"} for one query. Without a context
+        only the read-only rules apply. Pass candidate=True for fresh LLM
+        output, so accepted queries the old keyword check would have
+        refused are counted as avoided retries.
+        """
+        whitelist = SqlValidator._whitelist(context, catalog)
+        key = (whitelist["key"], sql or "")
+
+        with SqlValidator._lock:
+            SqlValidator._stats["validations"] += 1
+            result = SqlValidator._results.get(key)
+            if result is not None:
+                SqlValidator._results.move_to_end(key)
+                SqlValidator._stats["cache_hits"] += 1
+
+        if result is None:
+            result = SqlValidator._check(sql or "", whitelist)
+
+            with SqlValidator._lock:
+                SqlValidator._results[key] = result
+                while len(SqlValidator._results) > get_settings().SQL_VALIDATOR_CACHE_SIZE:
+                    SqlValidator._results.popitem(last=False)
+
+        with SqlValidator._lock:
+            if not result["is_safe"]:
+                SqlValidator._stats["rejected"] += 1
+                rule = result["rule"]
+                SqlValidator._stats["rejections"][rule] = SqlValidator._stats["rejections"].get(rule, 0) + 1
+            elif candidate and SqlValidator._keyword_check_rejects(sql):
+                SqlValidator._stats["llm_retries_avoided"] += 1
+
+        return {"is_safe": result["is_safe"], "reason": result["reason"], "tables": result["tables"]}
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        with SqlValidator._lock:
+            stats = dict(SqlValidator._stats)
+            stats["rejections"] = dict(stats["rejections"])
+            stats["cached_results"] = len(SqlValidator._results)
+        return stats
+
+    @staticmethod
+    def _whitelist(context, catalog: Dict[str, Any] = None) -> Dict[str, Any]:
+        """A context's allowed tables/columns as sets, rebuilt only when they change"""
+        if context is None:
+            return {"key": "", "tables": None, "columns": {}, "schema": {}}
+
+        source = json.dumps(
+            [context.allowed_tables, context.allowed_columns, catalog and catalog.get("fingerprint")],
+            sort_keys=True, default=str
+        )
+        cached = SqlValidator._whitelists.get(str(context.id))
+        if cached and cached[0] == source:
+            return cached[1]
+
+        schema = {}
+        keys = {}
+        for table_name, table in ((catalog or {}).get("tables") or {}).items():
+            schema[table_name] = {col["name"] for col in table["columns"]}
+            for fk in table["foreign_keys"]:
+                keys.setdefault(table_name, set()).update(fk["constrained_columns"])
+                keys.setdefault(fk["referred_table"], set()).update(fk["referred_columns"])
+
+        whitelist = {
+            "key": source,
+            "tables": set(context.allowed_tables),
+            "columns": {
+                table_name: set(columns) | JOIN_KEYS | keys.get(table_name, set())
+                for table_name, columns in (context.allowed_columns or {}).items()
+            },
+            "schema": schema,
+        }
+
+        with SqlValidator._lock:
+            SqlValidator._whitelists[str(context.id)] = (source, whitelist)
+
+        return whitelist
+
+    @staticmethod
+    def _check(sql: str, whitelist: Dict[str, Any]) -> Dict[str, Any]:
+        def reject(rule: str, reason: str):
+            return {"is_safe": False, "rule": rule, "reason": reason, "tables": []}
+
+        try:
+            tokens = SqlValidator._tokenize(sql)
+        except ValueError as e:
+            return reject("syntax", str(e))
+
+        while tokens and tokens[-1] == ("punct", ";"):
+            tokens.pop()
+
+        if not tokens:
+            return reject("statement", "Empty query")
+        if ("punct", ";") in tokens:
+            return reject("statement", "Only a single statement is allowed")
+
+        first = next((t for t in tokens if t != ("punct", "(")), None)
+        if first not in (("word", "select"), ("word", "with")):
+            return reject("statement", "Only SELECT or WITH queries are allowed")
+
+        for i, (kind, value) in enumerate(tokens):
+            if kind != "word":
+                continue
+            if value in FORBIDDEN_KEYWORDS:
+                return reject("keyword", f"{value.upper()} is not allowed")
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if following == ("punct", "(") and (
+                value in FORBIDDEN_FUNCTIONS or value.startswith(FORBIDDEN_FUNCTION_PREFIXES)
+            ):
+                return reject("function", f"Function {value}() is not allowed")
+            if value == "for" and following in (("word", "share"), ("word", "no"), ("word", "key")):
+                return reject("locking", "Row locking clauses are not allowed")
+
+        try:
+            refs = SqlValidator._references(tokens)
+        except ValueError as e:
+            return reject("syntax", str(e))
+
+        tables = []
+        for schema_name, table_name in refs["tables"]:
+            if schema_name is None and table_name in refs["ctes"]:
+                continue
+            if schema_name not in (None, "public"):
+                return reject("schema", f"Schema {schema_name} is not allowed")
+            if whitelist["tables"] is not None and table_name not in whitelist["tables"]:
+                return reject("table", f"Table {table_name} is not allowed")
+            if table_name not in tables:
+                tables.append(table_name)
+
+        error = SqlValidator._check_columns(refs, tables, whitelist)
+        if error:
+            return reject("column", error)
+
+        return {"is_safe": True, "rule": None, "reason": None, "tables": tables}
+
+    @staticmethod
+    def _check_columns(refs: Dict[str, Any], tables: List[str], whitelist: Dict[str, Any]) -> Optional[str]:
+        restricted = {t: whitelist["columns"][t] for t in tables if t in whitelist["columns"]}
+        if not restricted:
+            return None
+
+        for frame_tables in refs["stars"]:
+            for table_name in frame_tables:
+                if table_name in restricted:
+                    return f"SELECT * is not allowed on {table_name}"
+
+        for table_name in refs["renamed"]:
+            if table_name in restricted:
+                return f"Column aliases are not allowed on {table_name}"
+
+        # A bare table name or alias is the whole row (to_json(c), SELECT c),
+        # unless some table in the query has a column of that name
+        schema = whitelist["schema"]
+        for name in refs["bare"] & set(refs["aliases"]):
+            owners = refs["aliases"][name] & set(restricted)
+            if not owners:
+                continue
+            if schema and any(name in schema.get(t, ()) for t in tables):
+                continue
+            return f"Whole-row reference to {', '.join(sorted(owners))} is not allowed"
+
+        for qualifier, column in refs["qualified"]:
+            owners = refs["aliases"].get(qualifier, set()) & set(tables)
+            if not owners or any(t not in restricted for t in owners):
+                continue
+            if column == "*":
+                return f"{qualifier}.* is not allowed on {', '.join(sorted(owners))}"
+            if not any(column in restricted[t] for t in owners):
+                return f"Column {sorted(owners)[0]}.{column} is not allowed"
+
+        # Unqualified names need the catalog to know which table owns them
+        if schema:
+            defined = refs["defined"] | set(refs["aliases"]) | refs["ctes"]
+            for name in refs["bare"] - defined:
+                owners = [t for t in tables if name in schema.get(t, ())]
+                if owners and all(t in restricted and name not in restricted[t] for t in owners):
+                    return f"Column {owners[0]}.{name} is not allowed"
+
+        return None
+
+    @staticmethod
+    def _tokenize(sql: str) -> List[Tuple[str, str]]:
+        """(kind, value) tokens; words are lowercased, quoted identifiers unquoted"""
+        return [(kind, value) for kind, value, _, _ in SqlValidator.scan(sql)]
+
+    @staticmethod
+    def scan(sql: str) -> List[Tuple[str, str, int, int]]:
+        """(kind, value, start, end) tokens, skipping whitespace and comments"""
+        tokens = []
+        pos = 0
+        length = len(sql)
+
+        while pos < length:
+            if sql.startswith("/*", pos):
+                # Block comments nest in PostgreSQL
+                depth = 0
+                while pos < length:
+                    if sql.startswith("/*", pos):
+                        depth += 1
+                        pos += 2
+                    elif sql.startswith("*/", pos):
+                        depth -= 1
+                        pos += 2
+                        if depth == 0:
+                            break
+                    else:
+                        pos += 1
+                if depth:
+                    raise ValueError("Unterminated comment")
+                continue
+
+            dollar = DOLLAR_QUOTE.match(sql, pos)
+            if dollar:
+                end = sql.find(dollar.group(0), dollar.end())
+                if end < 0:
+                    raise ValueError("Unterminated dollar-quoted string")
+                tokens.append(("string", sql[dollar.end():end], pos, end + len(dollar.group(0))))
+                pos = end + len(dollar.group(0))
+                continue
+
+            match = TOKEN_PATTERN.match(sql, pos)
+            if not match:
+                if sql[pos] in "'\"":
+                    raise ValueError("Unterminated quoted string")
+                raise ValueError(f"Unexpected character {sql[pos]!r}")
+
+            kind = match.lastgroup
+            value = match.group(0)
+            start, pos = pos, match.end()
+
+            if kind in ("space", "comment"):
+                continue
+            if kind == "word":
+                value = value.lower()
+            elif kind == "ident":
+                value = value[value.index('"') + 1:-1].replace('""', '"')
+
+            tokens.append((kind, value, start, pos))
+
+        return tokens
+
+    @staticmethod
+    def _references(tokens: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Tables, aliases and column references of a tokenized query.
+
+        Each parenthesis opens a frame. FROM starts a table list only in
+        query frames (not in EXTRACT(... FROM ...) and the like); names
+        right after FROM, JOIN or a comma in that list are tables. A
+        parenthesis right after FROM or JOIN is a table list of its own
+        (a parenthesized join) unless it turns out to be a subquery.
+        """
+        count = len(tokens)
+
+        def at(i):
+            return tokens[i] if 0 <= i < count else (None, None)
+
+        def is_name(token):
+            return token[0] == "ident" or (token[0] == "word" and token[1] not in NOT_ALIAS)
+
+        def new_frame(i, from_paren=False):
+            return {
+                "query": at(i) in (("word", "select"), ("word", "with"), ("word", "values")),
+                "in_from": from_paren,
+                "expect": from_paren,
+                "from_paren": from_paren,
+                "tables": [],
+                "stars": 0,
+            }
+
+        refs = {
+            "tables": [], "ctes": SqlValidator._cte_names(tokens),
+            "aliases": {}, "qualified": [], "bare": set(), "defined": set(), "stars": [],
+            "renamed": set(),
+        }
+        frames = [new_frame(0)]
+        frames[0]["query"] = True
+
+        def close(frame):
+            if frame["stars"]:
+                refs["stars"].append(list(frame["tables"]))
+
+        i = 0
+        while i < count:
+            kind, value = tokens[i]
+            frame = frames[-1]
+
+            if kind == "punct" and value in ("(", "["):
+                opens_table = value == "(" and frame["expect"]
+                frame["expect"] = False
+                frames.append(new_frame(i + 1, from_paren=opens_table))
+                i += 1
+                continue
+
+            if kind == "punct" and value in (")", "]"):
+                if len(frames) == 1:
+                    raise ValueError("Unbalanced parentheses")
+                closed = frames.pop()
+                close(closed)
+                i += 1
+                # A parenthesized join's tables belong to the enclosing FROM,
+                # and an alias of the join stands for all of them
+                if closed["from_paren"] and not closed["query"]:
+                    frames[-1]["tables"].extend(closed["tables"])
+
+                    if at(i) == ("word", "as"):
+                        i += 1
+                    if is_name(at(i)):
+                        for name in closed["tables"]:
+                            refs["aliases"].setdefault(at(i)[1], set()).add(name)
+                            if at(i + 1) == ("punct", "("):
+                                refs["renamed"].add(name)
+                        i += 1
+                continue
+
+            if frame["expect"]:
+                frame["expect"] = False
+
+                if kind == "word" and value in ("lateral", "only"):
+                    frame["expect"] = True
+                    i += 1
+                    continue
+
+                if kind == "word" and value in QUERY_START:
+                    frame["query"] = True
+                    frame["in_from"] = False
+                elif is_name((kind, value)):
+                    schema_name, name, j = None, value, i
+                    if at(j + 1) == ("punct", ".") and is_name(at(j + 2)):
+                        schema_name, name, j = value, at(j + 2)[1], j + 2
+
+                    if at(j + 1) != ("punct", "("):
+                        refs["tables"].append((schema_name, name))
+                        frame["tables"].append(name)
+                        refs["aliases"].setdefault(name, set()).add(name)
+
+                        k = j + 1
+                        if at(k) == ("word", "as"):
+                            k += 1
+                        if is_name(at(k)):
+                            refs["aliases"].setdefault(at(k)[1], set()).add(name)
+                            k += 1
+                            # t(a, b, c) renames the table's columns
+                            if at(k) == ("punct", "("):
+                                refs["renamed"].add(name)
+                        i = k
+                        continue
+
+            if kind == "word":
+                if value == "from" and frame["query"]:
+                    before = at(i - 1)[1], at(i - 2)[1], at(i - 3)[1]
+                    # IS [NOT] DISTINCT FROM is a comparison
+                    if not (before[0] == "distinct" and "is" in before[1:]):
+                        frame["in_from"] = True
+                        frame["expect"] = True
+                elif value == "join" and (frame["query"] or frame["from_paren"]):
+                    frame["in_from"] = True
+                    frame["expect"] = True
+                elif value in CLAUSE_END and frame["query"]:
+                    frame["in_from"] = False
+                elif value == "as" and at(i + 1)[0] in ("word", "ident"):
+                    refs["defined"].add(at(i + 1)[1])
+                    i += 2
+                    continue
+
+            if kind == "punct" and value == "," and frame["in_from"]:
+                frame["expect"] = True
+                i += 1
+                continue
+
+            if kind == "op" and value == "*" and at(i - 1) in (
+                ("word", "select"), ("word", "distinct"), ("word", "all"), ("punct", ",")
+            ):
+                frame["stars"] += 1
+
+            if kind in ("word", "ident"):
+                following = at(i + 1)
+
+                if following == ("punct", ".") and (
+                    at(i + 2)[0] in ("word", "ident") or at(i + 2) == ("op", "*")
+                ):
+                    qualifier, column, j = value, at(i + 2)[1], i + 2
+                    # schema.table.column
+                    if at(j + 1) == ("punct", ".") and at(j + 2)[0] in ("word", "ident"):
+                        qualifier, column, j = column, at(j + 2)[1], j + 2
+                    if at(j + 1) != ("punct", "("):
+                        refs["qualified"].append((qualifier, column))
+                    i = j + 1
+                    continue
+
+                if (
+                    following != ("punct", "(")
+                    and following[0] != "string"
+                    and at(i - 1) != ("punct", "::")
+                ):
+                    refs["bare"].add(value)
+
+            i += 1
+
+        if len(frames) != 1:
+            raise ValueError("Unbalanced parentheses")
+        close(frames[0])
+
+        return refs
+
+    @staticmethod
+    def _cte_names(tokens: List[Tuple[str, str]]) -> set:
+        """Names defined by WITH name [(columns)] AS [NOT] [MATERIALIZED] (...)"""
+        names = set()
+        count = len(tokens)
+
+        def skip_parens(i):
+            depth = 0
+            while i < count:
+                if tokens[i] == ("punct", "("):
+                    depth += 1
+                elif tokens[i] == ("punct", ")"):
+                    depth -= 1
+                    if depth == 0:
+                        return i + 1
+                i += 1
+            return i
+
+        for i, token in enumerate(tokens):
+            if token != ("word", "with"):
+                continue
+
+            j = i + 1
+            if j < count and tokens[j] == ("word", "recursive"):
+                j += 1
+
+            while j < count and tokens[j][0] in ("word", "ident"):
+                name = tokens[j][1]
+                j += 1
+                if j < count and tokens[j] == ("punct", "("):
+                    j = skip_parens(j)
+                if j >= count or tokens[j] != ("word", "as"):
+                    break
+                j += 1
+                while j < count and tokens[j] in (("word", "not"), ("word", "materialized")):
+                    j += 1
+                if j >= count or tokens[j] != ("punct", "("):
+                    break
+
+                names.add(name)
+                j = skip_parens(j)
+                if j < count and tokens[j] == ("punct", ","):
+                    j += 1
+                else:
+                    break
+
+        return names
+
+    @staticmethod
+    def _keyword_check_rejects(sql: str) -> bool:
+        """The substring test this validator replaced, kept to count the retries it cost"""
+        sql_upper = (sql or "").upper().strip()
+        dangerous = ["UPDATE", "DELETE", "INSERT", "DROP", "ALTER", "TRUNCATE",
+                     "CREATE", "GRANT", "REVOKE", "EXEC", "EXECUTE"]
+        return not sql_upper.startswith("SELECT") or any(word in sql_upper for word in dangerous)
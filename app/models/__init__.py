@@ -21,3 +21,5 @@ from .data_context import DataContext
 from .context_session import ContextSession
 from .automation_rule import AutomationRule
 from app.models.metric_metadata import MetricMetadata
+from app.models.table_data_version import TableDataVersion
+from app.models.status_counter import StatusCounter
@@ -4,13 +4,17 @@ from app.core.database import Base
 import uuid
 from sqlalchemy.sql import func
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, Index
 
 class InventoryBalance(Base):
     __tablename__ = "inventory_balance"
 
     __table_args__ = (
         UniqueConstraint('item_id', 'warehouse_id'),
+        Index(
+            "ix_inventory_balance_warehouse_id", "warehouse_id",
+            postgresql_include=["quantity_on_hand"]
+        ),
     )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
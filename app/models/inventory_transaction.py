@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Text, Numeric, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Text, Numeric, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.core.database import Base
 import uuid
@@ -7,6 +7,13 @@ from sqlalchemy.sql import func
 class InventoryTransaction(Base):
     __tablename__ = "inventory_transaction"
 
+    __table_args__ = (
+        Index(
+            "ix_inventory_transaction_item_warehouse_created",
+            "item_id", "warehouse_id", "created_at"
+        ),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     item_id = Column(UUID(as_uuid=True), ForeignKey("item.id"), nullable=False)
     warehouse_id = Column(UUID(as_uuid=True), ForeignKey("warehouse.id"), nullable=False)
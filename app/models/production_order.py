@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Numeric, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Numeric, Text, TIMESTAMP, ForeignKey, Index
+from sqlalchemy.orm import validates
 from sqlalchemy.dialects.postgresql import UUID
 from app.core.database import Base
 import uuid
@@ -6,6 +7,11 @@ import uuid
 class ProductionOrder(Base):
     __tablename__ = "production_order"
 
+    __table_args__ = (
+        Index("ix_production_order_status_start_date", "status", "start_date"),
+        Index("ix_production_order_machine_id", "machine_id"),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     item_id = Column(UUID(as_uuid=True), ForeignKey("item.id"), nullable=False)
     machine_id = Column(UUID(as_uuid=True), ForeignKey("machine.id"))
@@ -14,3 +20,8 @@ class ProductionOrder(Base):
     start_date = Column(TIMESTAMP(timezone=True))
     end_date = Column(TIMESTAMP(timezone=True))
     status = Column(Text)
+
+    @validates("status")
+    def normalize_status(self, key, value):
+        # Also enforced by a database trigger
+        return value.strip().upper() if value is not None else None
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, Numeric, ForeignKey
+from sqlalchemy import Column, Date, Numeric, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.core.database import Base
 import uuid
@@ -6,6 +6,13 @@ import uuid
 class ProductionPlan(Base):
     __tablename__ = "production_plan"
 
+    __table_args__ = (
+        Index(
+            "ix_production_plan_planned_date", "planned_date",
+            postgresql_include=["planned_qty", "item_id"]
+        ),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     item_id = Column(UUID(as_uuid=True), ForeignKey("item.id"), nullable=False)
     planned_qty = Column(Numeric, nullable=False)
@@ -1,15 +1,26 @@
-from sqlalchemy import Column, Date, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Date, Text, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
+from sqlalchemy.orm import validates
 from app.core.database import Base
 import uuid
 
 class SalesOrder(Base):
     __tablename__ = "sales_order"
 
+    __table_args__ = (
+        Index("ix_sales_order_status_order_date", "status", "order_date"),
+        Index("ix_sales_order_customer_id", "customer_id"),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     customer_id = Column(UUID(as_uuid=True), ForeignKey("customer.id"), nullable=False)
     order_date = Column(Date, nullable=False)
     promised_date = Column(Date)
     status = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+    @validates("status")
+    def normalize_status(self, key, value):
+        # Also enforced by a database trigger
+        return value.strip().upper() if value is not None else None
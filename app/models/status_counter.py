@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Text, BigInteger
+from app.core.database import Base
+
+class StatusCounter(Base):
+    """Row count per (table, status), maintained by statement-level triggers"""
+    __tablename__ = "status_counter"
+
+    table_name = Column(Text, primary_key=True)
+    status = Column(Text, primary_key=True)
+    count = Column(BigInteger, nullable=False, server_default="0")
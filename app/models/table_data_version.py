@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Text, BigInteger, TIMESTAMP
+from app.core.database import Base
+from sqlalchemy.sql import func
+
+class TableDataVersion(Base):
+    """Per-table write counter, bumped by statement-level triggers"""
+    __tablename__ = "table_data_version"
+
+    table_name = Column(Text, primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default="0")
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -0,0 +1,5 @@
+from pydantic import BaseModel
+
+class SqlExportRequest(BaseModel):
+    sql: str
+    format: str = "ndjson"
@@ -2,7 +2,10 @@ from sqlalchemy.orm import Session
 from app.models import ContextSession, DataContext
 from app.services.intent_service import IntentService
 from app.services.universal_query_service import UniversalQueryService
-from typing import Dict, Any
+from app.chat.local_intent_classifier import is_safe_query
+from app.core.singleflight import SingleFlight
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, Optional, Tuple, AsyncIterator
 
 class AdvancedChatService:
     """
@@ -10,7 +13,7 @@ class AdvancedChatService:
     """
     
     @staticmethod
-    def handle_message(
+    async def handle_message(
         db: Session,
         context_session_id,
         message: str
@@ -19,31 +22,104 @@ class AdvancedChatService:
         Universal message handler - works for ANY query
         """
         # Get session and context
-        session = (
-            db.query(ContextSession)
-            .filter(ContextSession.id == context_session_id)
-            .first()
+        context = await run_in_threadpool(
+            AdvancedChatService._load_context, db, context_session_id
         )
 
-        if not session:
-            return {"error": "Invalid session"}
+        if isinstance(context, dict):
+            return context
 
-        context = (
-            db.query(DataContext)
-            .filter(DataContext.id == session.data_context_id)
-            .first()
+        # Identical questions asked in the same context at the same time
+        # share one answer
+        return await SingleFlight.ado(
+            ("chat", str(context.id), " ".join(message.lower().split())),
+            AdvancedChatService._answer,
+            db, context, message
         )
-
-        if not context:
-            return {"error": "Invalid context"}
-
+    
+    @staticmethod
+    async def _answer(
+        db: Session,
+        context: DataContext,
+        message: str
+    ) -> Dict[str, Any]:
         # Initialize services
         intent_service = IntentService()
         universal_service = UniversalQueryService()
         
         # Analyze intent for basic routing
-        intent_result = intent_service.analyze_query(message, context)
+        intent_result = await intent_service.analyze_query_async(message, context)
         
+        # Greetings, help and unsafe requests never reach the query engine
+        response = await AdvancedChatService._answer_without_query(
+            intent_service, intent_result, context, message
+        )
+        if response:
+            return response
+        
+        # Use universal query service for EVERYTHING else
+        result = await universal_service.handle_query(db, context, message)
+        
+        if result["success"]:
+            return AdvancedChatService._success_response(result)
+        else:
+            return AdvancedChatService._error_response(result)
+    
+    @staticmethod
+    async def stream_message(
+        db: Session,
+        context_session_id,
+        message: str
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of handle_message(). Yields (event, payload) pairs
+        in order: "intent", then "table" as soon as the SQL returns, then
+        "summary_token"s from the model, and finally "done" with the same
+        response handle_message() would have returned ("error" on failure).
+        """
+        context = await run_in_threadpool(
+            AdvancedChatService._load_context, db, context_session_id
+        )
+
+        if isinstance(context, dict):
+            yield "error", context
+            return
+
+        intent_service = IntentService()
+        universal_service = UniversalQueryService()
+        
+        intent_result = await intent_service.analyze_query_async(message, context)
+        yield "intent", {
+            "intent": intent_result.get("intent"),
+            "metric_name": intent_result.get("metric_name"),
+            "domain": intent_result.get("domain"),
+            "confidence": intent_result.get("confidence"),
+            "understood": intent_result.get("friendly_response")
+        }
+        
+        response = await AdvancedChatService._answer_without_query(
+            intent_service, intent_result, context, message
+        )
+        if response:
+            yield "done", response
+            return
+        
+        async for event, payload in universal_service.stream_query(db, context, message):
+            if event == "done":
+                yield "done", AdvancedChatService._success_response(payload)
+            elif event == "error":
+                yield "error", AdvancedChatService._error_response(payload)
+            else:
+                yield event, payload
+    
+    @staticmethod
+    async def _answer_without_query(
+        intent_service: IntentService,
+        intent_result: Dict[str, Any],
+        context: DataContext,
+        message: str
+    ) -> Optional[Dict[str, Any]]:
+        """Response for greetings, help and unsafe requests, None otherwise"""
         # Handle greetings
         if intent_result["intent"] == "greeting":
             return {
@@ -57,7 +133,7 @@ class AdvancedChatService:
         
         # Handle help requests
         if intent_result["intent"] == "help":
-            help_message = intent_service.get_help_response(context)
+            help_message = await intent_service.get_help_response_async(context)
             return {
                 "type": "help",
                 "message": help_message,
@@ -75,44 +151,68 @@ class AdvancedChatService:
                 "suggestions": ["Try asking for specific information"]
             }
         
-        # Use universal query service for EVERYTHING else
-        result = universal_service.handle_query(db, context, message)
+        return None
+    
+    @staticmethod
+    def _success_response(result: Dict[str, Any]) -> Dict[str, Any]:
+        # USER-FRIENDLY RESPONSE (hide technical details by default)
+        response = {
+            "type": "success",
+            "summary": result["summary"],
+            "insights": result["insights"],
+            "suggestions": result["suggestions"],
+            "data": result["data"],
+            "formatted_data": result["formatted_data"]
+        }
         
-        if result["success"]:
-            # USER-FRIENDLY RESPONSE (hide technical details by default)
-            response = {
-                "type": "success",
-                "summary": result["summary"],
-                "insights": result["insights"],
-                "suggestions": result["suggestions"],
-                "data": result["data"],
-                "formatted_data": result["formatted_data"]
-            }
-            
-            # ADD TECHNICAL DETAILS ONLY IN DEBUG MODE (optional)
-            # Users can request this via "show me the query" or enable debug mode
-            # For now, we'll include it but you can remove these lines for production
-            response["_debug"] = {
-                "query_type": "universal",
-                "sql_query": result["sql"],
-                "explanation": result["explanation"]
-            }
-            
-            return response
-        else:
-            return {
-                "type": "error",
-                "message": result.get("user_message", result.get("error")),
-                "suggestions": ["Try rephrasing your question", "Ask for help"]
-            }
+        # ADD TECHNICAL DETAILS ONLY IN DEBUG MODE (optional)
+        # Users can request this via "show me the query" or enable debug mode
+        # For now, we'll include it but you can remove these lines for production
+        response["_debug"] = {
+            "query_type": "universal",
+            "sql_query": result["sql"],
+            "explanation": result["explanation"]
+        }
+        
+        return response
+    
+    @staticmethod
+    def _error_response(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "type": "error",
+            "message": result.get("user_message", result.get("error")),
+            "suggestions": ["Try rephrasing your question", "Ask for help"]
+        }
+    
+    @staticmethod
+    def _load_context(db: Session, context_session_id):
+        """Resolve the session's DataContext, or an error payload"""
+        session = (
+            db.query(ContextSession)
+            .filter(ContextSession.id == context_session_id)
+            .first()
+        )
+
+        if not session:
+            return {"error": "Invalid session"}
+
+        context = (
+            db.query(DataContext)
+            .filter(DataContext.id == session.data_context_id)
+            .first()
+        )
+
+        if not context:
+            return {"error": "Invalid context"}
+
+        # Detach the context and hand the connection back to the pool while
+        # the LLM calls are in flight
+        db.expunge(context)
+        db.rollback()
+
+        return context
     
     @staticmethod
     def _is_safe_query(message: str) -> bool:
         """Check if the query is safe"""
-        unsafe_keywords = [
-            "delete", "drop", "truncate", "remove", "clear",
-            "update", "insert", "modify", "change", "alter"
-        ]
-        
-        message_lower = message.lower()
-        return not any(keyword in message_lower for keyword in unsafe_keywords)
\ No newline at end of file
+        return is_safe_query(message)
@@ -1,12 +1,15 @@
-from openai import OpenAI
 from app.core.config import get_settings
-from typing import List, Dict, Any
+from app.core.openai_client import get_openai_client, get_async_openai_client
+from app.core.llm_cache import LLMResponseCache
+from app.core.singleflight import SingleFlight
+from starlette.concurrency import run_in_threadpool
+from typing import List, Dict, Any, AsyncIterator
 import json
 
 class AIService:
     def __init__(self):
         settings = get_settings()
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = get_openai_client()
         self.model = settings.OPENAI_MODEL
         self.max_tokens = settings.OPENAI_MAX_TOKENS
         self.temperature = settings.OPENAI_TEMPERATURE
@@ -15,7 +18,8 @@ class AIService:
         self,
         messages: List[Dict[str, str]],
         system_prompt: str = None,
-        json_mode: bool = False
+        json_mode: bool = False,
+        cache_site: str = None
     ) -> str:
         """
         Send a chat completion request to OpenAI
@@ -24,38 +28,139 @@ class AIService:
             messages: List of message dicts with 'role' and 'content'
             system_prompt: Optional system prompt to prepend
             json_mode: If True, forces JSON output
+            cache_site: Opt into the response cache; names the call site
+                in the hit/miss metrics. Only for deterministic prompts.
             
         Returns:
             Response content as string
         """
         try:
-            # Prepend system message if provided
-            if system_prompt:
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    *messages
-                ]
+            request_params = self._build_request(messages, system_prompt, json_mode)
+            
+            cache_key = self._cache_key(request_params, cache_site)
+            if cache_key:
+                cached = LLMResponseCache.get(cache_site, cache_key)
+                if cached is not None:
+                    return cached
+            
+            # Make API call (identical concurrent requests share one)
+            content = SingleFlight.do(
+                ("llm", LLMResponseCache.make_key(request_params)),
+                self._complete,
+                request_params
+            )
             
-            # Build request params
-            request_params = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature
-            }
+            if cache_key:
+                LLMResponseCache.set(cache_site, cache_key, content)
             
-            # Enable JSON mode if requested
-            if json_mode:
-                request_params["response_format"] = {"type": "json_object"}
+            return content
             
-            # Make API call
-            response = self.client.chat.completions.create(**request_params)
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str = None,
+        json_mode: bool = False,
+        cache_site: str = None
+    ) -> str:
+        """
+        Async variant of chat() backed by the shared AsyncOpenAI client
+        """
+        try:
+            request_params = self._build_request(messages, system_prompt, json_mode)
+            
+            cache_key = self._cache_key(request_params, cache_site)
+            if cache_key:
+                cached = await self._acache(LLMResponseCache.get, cache_site, cache_key)
+                if cached is not None:
+                    return cached
+            
+            content = await SingleFlight.ado(
+                ("llm", LLMResponseCache.make_key(request_params)),
+                self._acomplete,
+                request_params
+            )
+            
+            if cache_key:
+                await self._acache(LLMResponseCache.set, cache_site, cache_key, content)
+            
+            return content
+            
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    @staticmethod
+    async def _acache(fn, *args):
+        # The disk tier reads and commits SQLite under the cache's lock;
+        # keep that off the event loop
+        if LLMResponseCache.uses_disk():
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+    
+    async def astream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding content tokens as they arrive
+        """
+        try:
+            request_params = self._build_request(messages, system_prompt)
+            request_params["stream"] = True
             
-            return response.choices[0].message.content
+            stream = await get_async_openai_client().chat.completions.create(**request_params)
             
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                    
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
     
+    def _build_request(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str = None,
+        json_mode: bool = False
+    ) -> Dict[str, Any]:
+        # Prepend system message if provided
+        if system_prompt:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                *messages
+            ]
+        
+        # Build request params
+        request_params = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature
+        }
+        
+        # Enable JSON mode if requested
+        if json_mode:
+            request_params["response_format"] = {"type": "json_object"}
+        
+        return request_params
+    
+    def _complete(self, request_params: Dict[str, Any]) -> str:
+        response = self.client.chat.completions.create(**request_params)
+        return response.choices[0].message.content
+    
+    async def _acomplete(self, request_params: Dict[str, Any]) -> str:
+        response = await get_async_openai_client().chat.completions.create(**request_params)
+        return response.choices[0].message.content
+    
+    def _cache_key(self, request_params: Dict[str, Any], cache_site: str = None) -> str:
+        """Response cache key, or None when the call did not opt in"""
+        if not cache_site or not get_settings().LLM_CACHE_ENABLED:
+            return None
+        return LLMResponseCache.make_key(request_params)
+    
     def parse_json_response(self, response: str) -> Dict[str, Any]:
         """
         Safely parse JSON response from AI
@@ -1,22 +1,175 @@
-from openai import OpenAI
-import os
+from app.core.openai_client import get_openai_client
+from app.core.singleflight import SingleFlight
+from datetime import datetime, timezone
+from typing import Dict, Any
+import hashlib
 import json
+import threading
+import time
 from app.utils.json_safe import make_json_safe
 
 
-def get_openai_client():
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set")
-    return OpenAI(api_key=api_key)
+class DashboardAIService:
+    """
+    Dashboard insights, generated off the request path.
 
+    The latest insights are kept per context together with a hash of the
+    dashboard data they describe. A dashboard whose hash differs from the
+    stored one triggers a background regeneration; until it lands, the
+    previous insights are served and marked stale.
+    """
 
-class DashboardAIService:
+    # context id -> {"hash", "insights", "generated_at", "error"}
+    _latest: Dict[str, Dict[str, Any]] = {}
+    _pending: set = set()
+    _lock = threading.Lock()
 
     @staticmethod
     def generate_insights(context_name: str, dashboard: dict):
+        """Generate insights now (identical concurrent requests share one call)"""
+        dashboard_json = DashboardAIService._dashboard_json(dashboard)
+
+        return DashboardAIService._generate_shared(
+            context_name,
+            dashboard_json,
+            DashboardAIService._hash(dashboard_json)
+        )
+
+    @staticmethod
+    def latest_insights(context_id, context_name: str, dashboard: dict) -> Dict[str, Any]:
+        """
+        Stored insights for the context, without waiting on the LLM.
+
+        Schedules a background regeneration when the dashboard data changed
+        since the insights were generated.
+        """
+        dashboard_json = DashboardAIService._dashboard_json(dashboard)
+        data_hash = DashboardAIService._hash(dashboard_json)
+        stored = DashboardAIService._latest.get(str(context_id))
+
+        if not stored or stored["hash"] != data_hash:
+            DashboardAIService._schedule(context_id, context_name, dashboard_json, data_hash)
+
+        return DashboardAIService._describe(context_id, stored, data_hash)
+
+    @staticmethod
+    def get_or_generate(context_id, context_name: str, dashboard: dict) -> Dict[str, Any]:
+        """
+        Insights for exactly this dashboard data: the stored result when it
+        matches, otherwise generated once (joining any background run)
+        """
+        dashboard_json = DashboardAIService._dashboard_json(dashboard)
+        data_hash = DashboardAIService._hash(dashboard_json)
+        stored = DashboardAIService._latest.get(str(context_id))
+
+        if stored and stored["hash"] == data_hash and stored["insights"] is not None:
+            return stored["insights"]
+
+        # The entry this call built: _latest may already hold another
+        # refresh's (e.g. a background run for the previous dashboard)
+        entry = DashboardAIService._refresh(context_id, context_name, dashboard_json, data_hash)
+
+        if entry["error"]:
+            raise RuntimeError(entry["error"])
+        return entry["insights"]
+
+    @staticmethod
+    def _describe(context_id, stored: Dict[str, Any], data_hash: str) -> Dict[str, Any]:
+        pending = str(context_id) in DashboardAIService._pending
+
+        if not stored or stored["insights"] is None:
+            status = "pending" if pending or not stored else "failed"
+            return {
+                "ai_insights": None,
+                "ai_insights_status": {
+                    "status": status,
+                    "generated_at": None,
+                    "age_seconds": None,
+                    "error": stored["error"] if stored else None
+                }
+            }
+
+        return {
+            "ai_insights": stored["insights"],
+            "ai_insights_status": {
+                "status": "ready" if stored["hash"] == data_hash else "stale",
+                "generated_at": stored["generated_at"].isoformat(),
+                "age_seconds": round(time.time() - stored["generated_at"].timestamp(), 1),
+                "error": stored["error"]
+            }
+        }
 
-        safe_dashboard = make_json_safe(dashboard)
+    @staticmethod
+    def _schedule(context_id, context_name: str, dashboard_json: str, data_hash: str):
+        key = str(context_id)
+
+        with DashboardAIService._lock:
+            if key in DashboardAIService._pending:
+                return
+            DashboardAIService._pending.add(key)
+
+        def run():
+            try:
+                DashboardAIService._refresh(context_id, context_name, dashboard_json, data_hash)
+            finally:
+                with DashboardAIService._lock:
+                    DashboardAIService._pending.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def _refresh(context_id, context_name: str, dashboard_json: str, data_hash: str) -> Dict[str, Any]:
+        """Generate, store and return the context's entry for this data"""
+        key = str(context_id)
+
+        try:
+            insights = DashboardAIService._generate_shared(context_name, dashboard_json, data_hash)
+            entry = {
+                "hash": data_hash,
+                "insights": insights,
+                "generated_at": datetime.now(timezone.utc),
+                "error": None
+            }
+        except Exception as e:
+            print(f"⚠️  Dashboard insights failed for {context_name}: {e}")
+            previous = DashboardAIService._latest.get(key)
+            # Keep serving the previous insights (as stale) after a failure
+            entry = dict(previous) if previous else {
+                "hash": None,
+                "insights": None,
+                "generated_at": None
+            }
+            entry["error"] = str(e)
+
+        with DashboardAIService._lock:
+            DashboardAIService._latest[key] = entry
+
+        return entry
+
+    @staticmethod
+    def _generate_shared(context_name: str, dashboard_json: str, data_hash: str):
+        return SingleFlight.do(
+            ("dashboard_insights", context_name, data_hash),
+            DashboardAIService._generate,
+            context_name,
+            dashboard_json
+        )
+
+    @staticmethod
+    def _dashboard_json(dashboard: dict) -> str:
+        # Insights and their status are not part of the data they describe
+        numbers = {
+            k: v for k, v in dashboard.items()
+            if k not in ("ai_insights", "ai_insights_status")
+        }
+        return json.dumps(make_json_safe(numbers), indent=2, default=str)
+
+    @staticmethod
+    def _hash(dashboard_json: str) -> str:
+        return hashlib.sha256(dashboard_json.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _generate(context_name: str, dashboard_json: str):
 
         prompt = f"""
 You are an ERP business analyst.
@@ -24,7 +177,7 @@ You are an ERP business analyst.
 Context: {context_name}
 
 Dashboard Data:
-{json.dumps(safe_dashboard, indent=2, default=str)}
+{dashboard_json}
 
 Rules:
 - Do not invent numbers
@@ -1,19 +1,57 @@
 from sqlalchemy.orm import Session
 from app.models import ContextSession, MetricMetadata
-from app.analytics.metric_registry import METRIC_EXECUTORS
+from app.analytics.metric_registry import MetricRegistry
+from app.analytics.batch_executor import BatchMetricExecutor
+from app.analytics.pagination import MetricPaginator
+from app.core.replica import ReplicaRouter
+from app.core.config import get_settings
 from app.services.dashboard_ai_service import DashboardAIService
+from app.core.singleflight import SingleFlight
 from fastapi.encoders import jsonable_encoder
 
 class DashboardService:
 
     @staticmethod
     def load_dashboard(db: Session, context_session_id):
+        """
+        Dashboard numbers plus the latest stored AI insights and their age.
+        Insights are regenerated in the background, never on this path.
+        """
+        context, dashboard = DashboardService._load_numbers(db, context_session_id)
+
+        response = dict(dashboard)
+        response.update(
+            DashboardAIService.latest_insights(context.id, context.name, dashboard)
+        )
+
+        return response
+
+    @staticmethod
+    def load_insights(db: Session, context_session_id):
+        """AI insights for the current dashboard, reusing the stored result"""
+        context, dashboard = DashboardService._load_numbers(db, context_session_id)
+
+        return DashboardAIService.get_or_generate(context.id, context.name, dashboard)
+
+    @staticmethod
+    def _load_numbers(db: Session, context_session_id):
         session = db.query(ContextSession).filter(
             ContextSession.id == context_session_id
         ).first()
 
         context = session.data_context
 
+        # Everyone opening this context's dashboard at once shares one build
+        dashboard = SingleFlight.do(
+            ("dashboard", str(context.id)),
+            DashboardService._build_dashboard,
+            db, context
+        )
+
+        return context, dashboard
+
+    @staticmethod
+    def _build_dashboard(db: Session, context):
         metadata_map = {
             m.metric_name: m
             for m in db.query(MetricMetadata)
@@ -28,23 +66,43 @@ class DashboardService:
             "tables": []
         }
 
-        # 🔹 BUILD DASHBOARD FIRST
-        for metric in context.allowed_metrics:
-            executor = METRIC_EXECUTORS.get(metric)
-            meta = metadata_map.get(metric)
+        widgets = [
+            (metric, metadata_map[metric])
+            for metric in context.allowed_metrics
+            if MetricRegistry.exists(metric) and metric in metadata_map
+        ]
+
+        # 🔹 Bar/pie charts cut to their top N plus "Others"; tables to a first page
+        settings = get_settings()
+        shapes = {}
 
-            if not executor or not meta:
-                continue
+        for metric, meta in widgets:
+            if meta.widget_type in ("BAR", "PIE") and settings.DASHBOARD_CHART_TOP_N \
+                    and MetricPaginator.supports_top(metric):
+                shapes[metric] = ("top", {"top_n": settings.DASHBOARD_CHART_TOP_N})
+            elif meta.widget_type == "TABLE" and settings.DASHBOARD_TABLE_PAGE_SIZE \
+                    and MetricPaginator.supports_paging(metric):
+                shapes[metric] = ("page", {"page_limit": settings.DASHBOARD_TABLE_PAGE_SIZE + 1})
+
+        # 🔹 KPIs bundled into one statement; charts/tables alongside it
+        results, errors = BatchMetricExecutor.run(
+            db,
+            context,
+            kpi_metrics=[m for m, meta in widgets if meta.widget_type == "KPI"],
+            row_metrics=[m for m, meta in widgets if meta.widget_type in ("BAR", "PIE", "LINE", "TABLE")],
+            shapes=shapes
+        )
 
-            data = executor.run_metric(
-                db=db,
-                context_session_id=context_session_id,
-                metric_name=metric
-            )
+        # 🔹 BUILD DASHBOARD
+        for metric, meta in widgets:
+            data = results.get(metric)
 
             # KPI
             if meta.widget_type == "KPI":
-                value = list(data[0].values())[0] if data else 0
+                if data:
+                    value = list(data[0].values())[0]
+                else:
+                    value = None if metric in errors else 0
                 response["kpis"].append({
                     "metric": metric,
                     "title": meta.title,
@@ -64,17 +122,28 @@ class DashboardService:
 
             # Table
             elif meta.widget_type == "TABLE":
-                response["tables"].append({
+                table = {
                     "metric": metric,
                     "title": meta.title,
                     "data": data
-                })
+                }
 
-        # 🔥 NOW call AI with full dashboard
-        response["ai_insights"] = DashboardAIService.generate_insights(
-            context_name=response["context"],
-            dashboard=response
-        )
+                # Further pages come from /analytics/* with the cursor
+                if metric in shapes and data is not None:
+                    with ReplicaRouter.reading(db) as read_db:
+                        page = MetricPaginator.finish_page(
+                            read_db, metric, data, settings.DASHBOARD_TABLE_PAGE_SIZE
+                        )
+                    table["data"] = page["rows"]
+                    table["next_cursor"] = page["next_cursor"]
+                    table["estimated_total"] = page["estimated_total"]
+
+                response["tables"].append(table)
+
+        # Widgets that timed out or failed; the rest of the dashboard is served
+        if errors:
+            response["partial"] = True
+            response["errors"] = errors
 
         return jsonable_encoder(response)
 
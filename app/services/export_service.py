@@ -0,0 +1,189 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.core.config import get_settings
+from app.models import ContextSession, DataContext
+from app.analytics.metric_registry import MetricRegistry
+from app.services.schema_catalog_service import SchemaCatalogService
+from app.core.sql_validator import SqlValidator
+from app.core.sql_guard import SqlCostGuard
+from app.core.replica import ReplicaRouter
+from app.utils.json_safe import make_json_safe
+from typing import Dict, Any, List, Iterator, Tuple
+from decimal import Decimal
+import csv
+import io
+import json
+import threading
+
+# Export format -> media type
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class ExportService:
+    """
+    Metric and generated SQL results streamed as NDJSON or CSV.
+
+    Rows are read through a server-side cursor, EXPORT_BATCH_SIZE at a time,
+    and each batch is encoded and handed to the response before the next
+    one is fetched, so memory stays flat whatever the row count.
+    """
+
+    @staticmethod
+    def metric_statement(
+        db: Session,
+        context_session_id,
+        metric_name: str,
+        params: Dict[str, Any] = None
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """Statement and parameters for exporting an allowed metric"""
+        context = ExportService._context(db, context_session_id)
+
+        if metric_name not in context.allowed_metrics:
+            raise PermissionError("Metric not allowed in this context")
+
+        if not MetricRegistry.exists(metric_name):
+            raise ValueError("Metric not implemented")
+
+        params = MetricRegistry.parse_params(metric_name, params)
+        stmt = MetricRegistry.resolve(db, metric_name, params.keys())
+
+        return stmt, params
+
+    @staticmethod
+    def sql_statement(db: Session, context_session_id, sql: str) -> Tuple[Any, Dict[str, Any]]:
+        """Statement for exporting generated SQL, after the same validation it ran under"""
+        context = ExportService._context(db, context_session_id)
+
+        sql = (sql or "").strip().rstrip(";")
+        check = SqlValidator.validate(sql, context, SchemaCatalogService.get_catalog(db, context))
+        if not check["is_safe"]:
+            raise ValueError(f"Unsafe SQL detected: {check['reason']}")
+
+        return text(sql), {}
+
+    @staticmethod
+    def stream(stmt, params: Dict[str, Any], fmt: str, guarded: bool = False) -> "ExportStream":
+        """
+        Execute the statement and return an ExportStream of encoded chunks,
+        one per fetched batch. Execution errors raise here, before a
+        response has started. guarded runs generated SQL through the cost
+        guard's read-only, time-limited transaction and cost budget (not its
+        row limit: an export wants every row).
+
+        Runs on its own session (on the read replica when it is fresh
+        enough), released when the stream is exhausted or closed: the
+        response is sent after the request's dependencies have been torn
+        down.
+        """
+        batch_size = get_settings().EXPORT_BATCH_SIZE
+
+        db = ReplicaRouter.session()
+        try:
+            if guarded:
+                SqlCostGuard.admit(db, stmt.text)
+
+            result = db.execute(
+                stmt, params,
+                execution_options={"stream_results": True, "max_row_buffer": batch_size}
+            )
+        except Exception:
+            db.rollback()
+            db.close()
+            raise
+
+        return ExportStream(db, result, fmt, batch_size)
+
+    @staticmethod
+    def _context(db: Session, context_session_id) -> DataContext:
+        session = (
+            db.query(ContextSession)
+            .filter(ContextSession.id == context_session_id)
+            .first()
+        )
+
+        if not session:
+            raise ValueError("Invalid context session")
+
+        context = (
+            db.query(DataContext)
+            .filter(DataContext.id == session.data_context_id)
+            .first()
+        )
+
+        if not context:
+            raise ValueError("Invalid data context")
+
+        return context
+
+    @staticmethod
+    def _ndjson(columns: List[str], rows) -> str:
+        return "".join(
+            json.dumps(make_json_safe(dict(zip(columns, row))), default=ExportService._json_default) + "\n"
+            for row in rows
+        )
+
+    @staticmethod
+    def _csv(columns: List[str], rows) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _json_default(value):
+        # Numbers stay numbers, as in the JSON API responses
+        if isinstance(value, Decimal):
+            return float(value)
+        return str(value)
+
+
+class ExportStream:
+    """
+    Encoded chunks of an executed export. Owns its session and server-side
+    cursor: close() releases them whether or not iteration ever started
+    (a generator's finally only runs once it has been started).
+    """
+
+    def __init__(self, db: Session, result, fmt: str, batch_size: int):
+        self._db = db
+        self._result = result
+        self._fmt = fmt
+        self._batch_size = batch_size
+        self._closed = False
+        # close() comes from the event loop while a batch may still be
+        # fetched in a worker thread
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[str]:
+        encode = ExportService._csv if self._fmt == "csv" else ExportService._ndjson
+
+        try:
+            columns = list(self._result.keys())
+
+            if self._fmt == "csv":
+                yield encode(columns, [columns])
+
+            while True:
+                with self._lock:
+                    if self._closed:
+                        break
+                    rows = self._result.fetchmany(self._batch_size)
+                if not rows:
+                    break
+                yield encode(columns, rows)
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+            try:
+                self._result.close()
+                self._db.rollback()
+            finally:
+                self._db.close()
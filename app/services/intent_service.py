@@ -1,6 +1,7 @@
 from app.services.ai_service import AIService
 from typing import Dict, Any, List
 from app.models import DataContext
+from app.chat.local_intent_classifier import classify_locally
 
 class IntentService:
     def __init__(self):
@@ -26,6 +27,59 @@ class IntentService:
             }
         """
         
+        # Greetings, help and exact metric aliases are answered locally
+        local_result = classify_locally(user_message, context)
+        if local_result:
+            return local_result
+        
+        system_prompt = self._analysis_prompt(context)
+        messages = [
+            {"role": "user", "content": user_message}
+        ]
+        
+        try:
+            response = self.ai.chat(
+                messages=messages,
+                system_prompt=system_prompt,
+                json_mode=True
+            )
+            
+            return self.ai.parse_json_response(response)
+            
+        except Exception as e:
+            return self._fallback_intent(e)
+    
+    async def analyze_query_async(
+        self,
+        user_message: str,
+        context: DataContext
+    ) -> Dict[str, Any]:
+        """
+        Async variant of analyze_query()
+        """
+        # Greetings, help and exact metric aliases are answered locally
+        local_result = classify_locally(user_message, context)
+        if local_result:
+            return local_result
+        
+        system_prompt = self._analysis_prompt(context)
+        messages = [
+            {"role": "user", "content": user_message}
+        ]
+        
+        try:
+            response = await self.ai.achat(
+                messages=messages,
+                system_prompt=system_prompt,
+                json_mode=True
+            )
+            
+            return self.ai.parse_json_response(response)
+            
+        except Exception as e:
+            return self._fallback_intent(e)
+    
+    def _analysis_prompt(self, context: DataContext) -> str:
         system_prompt = f"""You are an intelligent ERP analytics assistant.
 
 Available Context: {context.name}
@@ -68,36 +122,42 @@ User: "What can you do?"
 User: "Show me something"
 → {{"intent": "unknown", "metric_name": null, "domain": null, "confidence": 0.2, "needs_clarification": true, "clarification_question": "What specific information would you like to see? I can show you stock levels, sales orders, or warehouse data.", "friendly_response": "I'm not sure what you'd like to see"}}
 """
-
-        messages = [
-            {"role": "user", "content": user_message}
-        ]
         
-        try:
-            response = self.ai.chat(
-                messages=messages,
-                system_prompt=system_prompt,
-                json_mode=True
-            )
-            
-            return self.ai.parse_json_response(response)
-            
-        except Exception as e:
-            # Fallback response on error
-            return {
-                "intent": "unknown",
-                "metric_name": None,
-                "domain": None,
-                "confidence": 0.0,
-                "needs_clarification": True,
-                "clarification_question": "I'm having trouble understanding. Could you rephrase your question?",
-                "friendly_response": f"Error: {str(e)}"
-            }
+        return system_prompt
+    
+    def _fallback_intent(self, error: Exception) -> Dict[str, Any]:
+        # Fallback response on error
+        return {
+            "intent": "unknown",
+            "metric_name": None,
+            "domain": None,
+            "confidence": 0.0,
+            "needs_clarification": True,
+            "clarification_question": "I'm having trouble understanding. Could you rephrase your question?",
+            "friendly_response": f"Error: {str(error)}"
+        }
     
     def get_help_response(self, context: DataContext) -> str:
         """
         Generate helpful response about available capabilities
         """
+        messages = [
+            {"role": "user", "content": "What can you help me with?"}
+        ]
+        
+        return self.ai.chat(messages, system_prompt=self._help_prompt(context), cache_site="help")
+    
+    async def get_help_response_async(self, context: DataContext) -> str:
+        """
+        Async variant of get_help_response()
+        """
+        messages = [
+            {"role": "user", "content": "What can you help me with?"}
+        ]
+        
+        return await self.ai.achat(messages, system_prompt=self._help_prompt(context), cache_site="help")
+    
+    def _help_prompt(self, context: DataContext) -> str:
         system_prompt = f"""You are a friendly ERP assistant.
         
 The user is in the "{context.name}" context.
@@ -107,9 +167,5 @@ Generate a brief, friendly message explaining what you can help with.
 Be conversational and welcoming. Mention 2-3 example questions they could ask.
 
 Keep it under 100 words."""
-
-        messages = [
-            {"role": "user", "content": "What can you help me with?"}
-        ]
         
-        return self.ai.chat(messages, system_prompt=system_prompt)
\ No newline at end of file
+        return system_prompt
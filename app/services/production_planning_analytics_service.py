@@ -1,25 +1,108 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.analytics.production_planning_metrics import PRODUCTION_PLANNING_METRICS
+from sqlalchemy import select, func, tuple_, and_, or_, bindparam
+from app.analytics.metric_registry import MetricRegistry, PARAMETERS, date_window, pp, item
+from app.analytics.metric_cache import MetricResultCache
+from app.analytics.prepared_statements import PreparedStatementExecutor
+from app.core.replica import ReplicaRouter
+from typing import Dict, Any, Tuple
+import threading
+
+# GROUPING(planned_date, sku, item_type) of each grouping set
+TOTALS, BY_DATE, BY_ITEM, BY_TYPE = 7, 3, 5, 6
+
 
 class ProductionPlanningAnalyticsService:
+    """
+    The planning dashboard as one statement: production_plan joined once to
+    item and aggregated over GROUPING SETS ((), planned_date, sku, item_type).
+    KPIs come from the grand-total row, charts from the other sets.
+    """
+
+    _statements: Dict[Tuple[str, ...], Any] = {}
+    _lock = threading.Lock()
 
     @staticmethod
-    def get_dashboard_data(db: Session):
+    def get_dashboard_data(db: Session, params: Dict[str, Any] = None):
+        # Same parameters as the individual planning metrics
+        params = MetricRegistry.parse_params("total_production_plans", params)
+        stmt = ProductionPlanningAnalyticsService._statement(tuple(sorted(params)))
+
+        with ReplicaRouter.reading(db) as read_db:
+            rows = MetricResultCache.get_or_run(
+                read_db, "production_planning_dashboard",
+                PreparedStatementExecutor.sql(stmt),
+                lambda db: PreparedStatementExecutor.execute(db, stmt, params),
+                params=params
+            )
+
         kpis = {}
-        charts = {}
+        charts = {"trend": [], "by_item": [], "by_type": []}
+
+        for row in rows:
+            if row["grp"] == TOTALS:
+                totals = row
+            elif row["plans"]:
+                # Groups holding only today's rows outside the date window
+                if row["grp"] == BY_DATE:
+                    charts["trend"].append({"date": row["planned_date"], "qty": row["qty"]})
+                elif row["grp"] == BY_ITEM:
+                    charts["by_item"].append({"sku": row["sku"], "qty": row["qty"]})
+                elif row["grp"] == BY_TYPE:
+                    charts["by_type"].append({"item_type": row["item_type"], "qty": row["qty"]})
 
-        # KPI execution
-        for key, sql in PRODUCTION_PLANNING_METRICS["kpis"].items():
-            result = db.execute(text(sql)).scalar()
-            kpis[key] = float(result) if result is not None else 0
+        charts["trend"].sort(key=lambda r: r["date"])
+        charts["by_item"].sort(key=lambda r: r["qty"], reverse=True)
 
-        # Chart execution
-        for key, sql in PRODUCTION_PLANNING_METRICS["charts"].items():
-            result = db.execute(text(sql)).mappings().all()
-            charts[key] = result
+        total_qty = totals["qty"] or 0
+        days = len(charts["trend"])
+
+        kpis["total_plans"] = float(totals["plans"])
+        kpis["today_planned_qty"] = float(totals["today_qty"] or 0)
+        kpis["total_planned_qty"] = float(total_qty)
+        # Average of the daily totals
+        kpis["avg_daily_qty"] = float(total_qty / days) if days else 0
 
         return {
             "kpis": kpis,
             "charts": charts
         }
+
+    @staticmethod
+    def _statement(param_names: Tuple[str, ...]):
+        stmt = ProductionPlanningAnalyticsService._statements.get(param_names)
+
+        if stmt is None:
+            filters = date_window(pp.c.planned_date)
+            window = [
+                filters[name](bindparam(name, type_=PARAMETERS[name][0]))
+                for name in param_names
+            ]
+            today = pp.c.planned_date == func.current_date()
+
+            def in_window(aggregate):
+                return aggregate.filter(and_(*window)) if window else aggregate
+
+            stmt = (
+                select(
+                    func.grouping(pp.c.planned_date, item.c.sku, item.c.item_type).label("grp"),
+                    pp.c.planned_date,
+                    item.c.sku,
+                    item.c.item_type,
+                    in_window(func.count()).label("plans"),
+                    in_window(func.sum(pp.c.planned_qty)).label("qty"),
+                    # today_planned_qty ignores the date window
+                    func.sum(pp.c.planned_qty).filter(today).label("today_qty"),
+                )
+                .select_from(pp.join(item, item.c.id == pp.c.item_id))
+                .group_by(func.grouping_sets(
+                    tuple_(), pp.c.planned_date, item.c.sku, item.c.item_type
+                ))
+            )
+
+            if window:
+                stmt = stmt.where(or_(and_(*window), today))
+
+            with ProductionPlanningAnalyticsService._lock:
+                stmt = ProductionPlanningAnalyticsService._statements.setdefault(param_names, stmt)
+
+        return stmt
@@ -194,7 +194,7 @@ Respond with ONLY the friendly message text, no JSON."""
         ]
         
         try:
-            friendly_message = self.ai.chat(messages, system_prompt=system_prompt)
+            friendly_message = self.ai.chat(messages, system_prompt=system_prompt, cache_site="error_response")
             return {
                 "summary": friendly_message,
                 "data": [],
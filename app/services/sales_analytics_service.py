@@ -1,7 +1,11 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from app.models import ContextSession, DataContext
-from app.analytics.sales_metrics import SALES_METRICS
+from app.analytics.metric_registry import MetricRegistry
+from app.analytics.metric_cache import MetricResultCache
+from app.analytics.prepared_statements import PreparedStatementExecutor
+from app.analytics.pagination import MetricPaginator
+from app.core.replica import ReplicaRouter
+from typing import Dict, Any
 
 
 class SalesAnalyticsService:
@@ -10,8 +14,17 @@ class SalesAnalyticsService:
     def run_metric(
         db: Session,
         context_session_id,
-        metric_name: str
+        metric_name: str,
+        params: Dict[str, Any] = None,
+        limit: int = None,
+        cursor: str = None,
+        top: int = None
     ):
+        """
+        Rows of a metric, or with limit/cursor one page of them
+        ({"rows", "next_cursor", "estimated_total"}), or with top the
+        largest rows plus "Others".
+        """
         session = (
             db.query(ContextSession)
             .filter(ContextSession.id == context_session_id)
@@ -33,8 +46,31 @@ class SalesAnalyticsService:
         if metric_name not in context.allowed_metrics:
             raise PermissionError("Metric not allowed in this context")
 
-        if metric_name not in SALES_METRICS:
+        if not MetricRegistry.exists(metric_name) or MetricRegistry.domain(metric_name) != "sales":
             raise ValueError("Metric not implemented")
 
-        sql = SALES_METRICS[metric_name]["sql"]
-        return db.execute(text(sql)).mappings().all()
+        params = MetricRegistry.parse_params(metric_name, params)
+
+        # Resolved, version-probed and run on the same server: the read
+        # replica while it is fresh enough, else this session
+        with ReplicaRouter.reading(db) as read_db:
+            # Cache against the tables actually read; rollup and counter reads
+            # have no data version and are not cached
+            stmt = MetricRegistry.resolve(read_db, metric_name, params.keys())
+            cache_key = dict(params)
+
+            if limit is not None or cursor:
+                run = lambda db: MetricPaginator.page(db, metric_name, params, limit, cursor)
+                cache_key.update({"limit": limit, "cursor": cursor})
+            elif top is not None:
+                run = lambda db: MetricPaginator.top(db, metric_name, params, top)
+                cache_key["top"] = top
+            else:
+                run = lambda db: PreparedStatementExecutor.execute(db, stmt, params)
+
+            return MetricResultCache.get_or_run(
+                read_db, metric_name,
+                PreparedStatementExecutor.sql(stmt),
+                run,
+                params=cache_key
+            )
@@ -0,0 +1,216 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from typing import Dict, List, Set, Tuple
+import threading
+import time
+
+# Planner statistics: no table is touched, only the pg_statistic catalog
+PG_STATS_SQL = """
+    SELECT
+        s.tablename,
+        s.attname,
+        s.most_common_vals::text::text[] AS values,
+        CASE
+            WHEN s.n_distinct < 0 THEN -s.n_distinct * GREATEST(c.reltuples, 0)
+            ELSE s.n_distinct
+        END AS n_distinct
+    FROM pg_stats s
+    JOIN pg_class c
+      ON c.relname = s.tablename
+     AND c.relnamespace = to_regnamespace(s.schemaname)
+    WHERE s.schemaname = current_schema()
+      AND s.tablename = ANY(:tables)
+      AND s.attname = ANY(:columns)
+"""
+
+RELPAGES_SQL = """
+    SELECT relpages
+    FROM pg_class
+    WHERE relname = :table
+      AND relnamespace = to_regnamespace(current_schema())
+"""
+
+MAX_VALUES = 10
+
+
+class SampleValueService:
+    """
+    Sample values for enum-like columns (status, type, region, ...).
+
+    Values come from pg_stats.most_common_vals, so the request path never
+    scans a table. Columns without statistics are filled in by a bounded
+    TABLESAMPLE query, and stale entries are refreshed, on a background thread.
+    """
+
+    # table -> {"values": {column: [...]}, "refreshed_at": monotonic}
+    _cache: Dict[str, Dict] = {}
+    _pending: set = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def sample_columns(columns: list) -> List[str]:
+        """Pick the enum-like columns of a table (at most 3)"""
+        return [col['name'] for col in columns
+                if 'status' in col['name'].lower()
+                or 'type' in col['name'].lower()
+                or 'region' in col['name'].lower()][:3]
+
+    @staticmethod
+    def get_sample_values(db: Session, tables: Dict[str, List[str]]) -> Dict[str, Dict[str, list]]:
+        """
+        Sample values for {table: [columns]}, served from memory.
+
+        Tables seen for the first time are read from pg_stats in one query;
+        anything missing or stale is queued for a background refresh.
+        """
+        refresh_seconds = get_settings().SAMPLE_VALUES_REFRESH_SECONDS
+        now = time.monotonic()
+
+        missing = {t: cols for t, cols in tables.items()
+                   if cols and t not in SampleValueService._cache}
+        stale = {}
+
+        if missing:
+            try:
+                stats, analyzed = SampleValueService._read_pg_stats(db, missing)
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️  pg_stats lookup failed: {e}")
+                stats, analyzed = {}, {}
+
+            with SampleValueService._lock:
+                for table in missing:
+                    SampleValueService._cache[table] = {
+                        "values": stats.get(table, {}),
+                        "refreshed_at": now
+                    }
+
+            # Columns without statistics get the TABLESAMPLE fallback; ones
+            # skipped as not enum-like stay without sample values
+            stale.update({t: cols for t, cols in missing.items()
+                          if any(c not in analyzed.get(t, ()) for c in cols)})
+
+        result = {}
+
+        for table, cols in tables.items():
+            if not cols:
+                continue
+
+            entry = SampleValueService._cache.get(table)
+            values = {c: entry["values"][c] for c in cols if c in entry["values"]}
+            if values:
+                result[table] = values
+
+            if now - entry["refreshed_at"] > refresh_seconds:
+                stale[table] = cols
+
+        if stale:
+            SampleValueService._schedule_refresh(stale)
+
+        return result
+
+    @staticmethod
+    def _read_pg_stats(
+        db: Session,
+        tables: Dict[str, List[str]]
+    ) -> Tuple[Dict[str, Dict[str, list]], Dict[str, Set[str]]]:
+        """
+        ({table: {column: values}}, {table: columns that have statistics}).
+        Columns with statistics but too many distinct values are in the
+        second and not the first.
+        """
+        columns = sorted({c for cols in tables.values() for c in cols})
+
+        rows = db.execute(
+            text(PG_STATS_SQL),
+            {"tables": list(tables.keys()), "columns": columns}
+        ).mappings().all()
+
+        max_distinct = get_settings().SAMPLE_VALUES_MAX_DISTINCT
+        stats = {}
+        analyzed = {}
+
+        for row in rows:
+            if row["attname"] not in tables.get(row["tablename"], []):
+                continue
+
+            analyzed.setdefault(row["tablename"], set()).add(row["attname"])
+
+            if not row["values"] or row["n_distinct"] > max_distinct:
+                continue
+
+            stats.setdefault(row["tablename"], {})[row["attname"]] = row["values"][:MAX_VALUES]
+
+        return stats, analyzed
+
+    @staticmethod
+    def _read_table_sample(db: Session, table: str, column: str) -> list:
+        """
+        Bounded fallback for columns without statistics: small tables are read
+        directly, larger ones through TABLESAMPLE with a row cap
+        """
+        settings = get_settings()
+        relpages = db.execute(text(RELPAGES_SQL), {"table": table}).scalar() or 0
+
+        if relpages <= settings.SAMPLE_VALUES_FULL_SCAN_PAGES:
+            source = table
+        else:
+            source = (
+                f"(SELECT {column} FROM {table} "
+                f"TABLESAMPLE SYSTEM ({float(settings.SAMPLE_VALUES_TABLESAMPLE_PERCENT)}) "
+                f"LIMIT {int(settings.SAMPLE_VALUES_TABLESAMPLE_ROWS)}) s"
+            )
+
+        query = f"SELECT DISTINCT {column} FROM {source} WHERE {column} IS NOT NULL LIMIT {MAX_VALUES}"
+        return [row[0] for row in db.execute(text(query)).fetchall()]
+
+    @staticmethod
+    def _schedule_refresh(tables: Dict[str, List[str]]):
+        with SampleValueService._lock:
+            tables = {t: cols for t, cols in tables.items()
+                      if t not in SampleValueService._pending}
+            if not tables:
+                return
+            SampleValueService._pending.update(tables)
+
+        threading.Thread(
+            target=SampleValueService._refresh,
+            args=(tables,),
+            daemon=True
+        ).start()
+
+    @staticmethod
+    def _refresh(tables: Dict[str, List[str]]):
+        db = SessionLocal()
+        try:
+            stats, analyzed = SampleValueService._read_pg_stats(db, tables)
+            use_tablesample = get_settings().SAMPLE_VALUES_TABLESAMPLE
+
+            for table, cols in tables.items():
+                values = stats.get(table, {})
+
+                if use_tablesample:
+                    for col in cols:
+                        if col in values or col in analyzed.get(table, ()):
+                            continue
+                        try:
+                            sample = SampleValueService._read_table_sample(db, table, col)
+                            if sample:
+                                values[col] = sample
+                        except Exception as e:
+                            db.rollback()
+                            print(f"⚠️  Sampling {table}.{col} failed: {e}")
+
+                with SampleValueService._lock:
+                    SampleValueService._cache[table] = {
+                        "values": values,
+                        "refreshed_at": time.monotonic()
+                    }
+        except Exception as e:
+            print(f"⚠️  Sample value refresh failed: {e}")
+        finally:
+            with SampleValueService._lock:
+                SampleValueService._pending.difference_update(tables)
+            db.close()
@@ -0,0 +1,185 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text, inspect
+from app.core.config import get_settings
+from app.models import DataContext
+from app.services.sample_value_service import SampleValueService
+from typing import Dict, Any, List, Optional
+import threading
+import time
+
+# One cheap catalog query that changes whenever a column, type, nullability
+# or foreign key of the allowed tables changes (i.e. after any migration)
+FINGERPRINT_SQL = """
+    SELECT md5(
+        COALESCE(string_agg(
+            c.relname || '.' || a.attname || ':' ||
+            format_type(a.atttypid, a.atttypmod) || ':' || a.attnotnull::text,
+            ',' ORDER BY c.relname, a.attnum
+        ), '')
+        || '|' ||
+        COALESCE((
+            SELECT string_agg(k.conname, ',' ORDER BY k.conname)
+            FROM pg_constraint k
+            JOIN pg_class kc ON kc.oid = k.conrelid
+            WHERE k.contype = 'f'
+              AND kc.relname = ANY(:tables)
+              AND kc.relnamespace = to_regnamespace(current_schema())
+        ), '')
+    )
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    WHERE c.relname = ANY(:tables)
+      AND c.relnamespace = to_regnamespace(current_schema())
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+"""
+
+
+class SchemaCatalogService:
+    """
+    In-process schema catalog, one entry per DataContext.
+
+    Reflection runs once per context. Afterwards a request costs at most one
+    fingerprint query, and nothing at all within SCHEMA_CATALOG_CHECK_SECONDS
+    of the last check.
+    """
+
+    _catalogs: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_catalog(db: Session, context: DataContext) -> Dict[str, Any]:
+        """
+        Return the catalog for a context, rebuilding it only when the
+        schema fingerprint has changed
+        """
+        key = str(context.id)
+        tables = list(context.allowed_tables)
+        check_seconds = get_settings().SCHEMA_CATALOG_CHECK_SECONDS
+
+        catalog = SchemaCatalogService._catalogs.get(key)
+        now = time.monotonic()
+
+        if (
+            catalog
+            and catalog["allowed_tables"] == tables
+            and now - catalog["checked_at"] < check_seconds
+        ):
+            return catalog
+
+        fingerprint = SchemaCatalogService._fingerprint(db, tables)
+
+        with SchemaCatalogService._lock:
+            catalog = SchemaCatalogService._catalogs.get(key)
+
+            if (
+                catalog
+                and catalog["allowed_tables"] == tables
+                and catalog["fingerprint"] == fingerprint
+            ):
+                catalog["checked_at"] = now
+                return catalog
+
+            catalog = SchemaCatalogService._build(db, tables, fingerprint)
+            SchemaCatalogService._catalogs[key] = catalog
+            return catalog
+
+    @staticmethod
+    def get_schema_info(db: Session, context: DataContext) -> str:
+        """
+        Render the catalog as the schema description sent to the LLM
+        """
+        catalog = SchemaCatalogService.get_catalog(db, context)
+        sample_values = SampleValueService.get_sample_values(db, catalog["sample_columns"])
+
+        schema_info = []
+        schema_info.append("DATABASE: PostgreSQL")
+        schema_info.append("\nAVAILABLE TABLES AND COLUMNS:\n")
+
+        for table_name, table in catalog["tables"].items():
+            schema_info.append(f"\nTable: {table_name}")
+            schema_info.append("Columns:")
+            for col in table["columns"]:
+                nullable = "NULL" if col["nullable"] else "NOT NULL"
+                schema_info.append(f"  - {col['name']} ({col['type']}) {nullable}")
+
+            if table["foreign_keys"]:
+                schema_info.append("Foreign Keys:")
+                for fk in table["foreign_keys"]:
+                    schema_info.append(f"  - {fk['constrained_columns']} → {fk['referred_table']}.{fk['referred_columns']}")
+
+            table_samples = sample_values.get(table_name)
+            if table_samples:
+                schema_info.append("Sample Values:")
+                for col_name, values in table_samples.items():
+                    schema_info.append(f"  - {col_name}: {', '.join(map(str, values))}")
+
+        return "\n".join(schema_info)
+
+    @staticmethod
+    def peek(context: DataContext) -> Optional[Dict[str, Any]]:
+        """The context's catalog if it is already built, without touching the database"""
+        catalog = SchemaCatalogService._catalogs.get(str(context.id))
+        if catalog and catalog["allowed_tables"] == list(context.allowed_tables):
+            return catalog
+        return None
+
+    @staticmethod
+    def get_version(db: Session, context: DataContext) -> str:
+        """Schema fingerprint of the context's catalog"""
+        return SchemaCatalogService.get_catalog(db, context)["fingerprint"]
+
+    @staticmethod
+    def invalidate(context_id=None):
+        """Drop one context's catalog, or all of them"""
+        with SchemaCatalogService._lock:
+            if context_id is None:
+                SchemaCatalogService._catalogs.clear()
+            else:
+                SchemaCatalogService._catalogs.pop(str(context_id), None)
+
+    @staticmethod
+    def _fingerprint(db: Session, tables: List[str]) -> str:
+        return db.execute(text(FINGERPRINT_SQL), {"tables": tables}).scalar()
+
+    @staticmethod
+    def _build(db: Session, tables: List[str], fingerprint: str) -> Dict[str, Any]:
+        inspector = inspect(db.bind)
+        existing = set(inspector.get_table_names())
+
+        catalog_tables = {}
+        sample_columns = {}
+
+        for table_name in tables:
+            if table_name not in existing:
+                continue
+
+            columns = inspector.get_columns(table_name)
+            catalog_tables[table_name] = {
+                "columns": [
+                    {
+                        "name": col["name"],
+                        "type": str(col["type"]),
+                        "nullable": col["nullable"]
+                    }
+                    for col in columns
+                ],
+                "foreign_keys": [
+                    {
+                        "constrained_columns": fk["constrained_columns"],
+                        "referred_table": fk["referred_table"],
+                        "referred_columns": fk["referred_columns"]
+                    }
+                    for fk in inspector.get_foreign_keys(table_name)
+                ]
+            }
+
+            sample_columns[table_name] = SampleValueService.sample_columns(columns)
+
+        return {
+            "fingerprint": fingerprint,
+            "allowed_tables": tables,
+            "tables": catalog_tables,
+            "sample_columns": sample_columns,
+            "checked_at": time.monotonic()
+        }
@@ -0,0 +1,289 @@
+from app.core.config import get_settings
+from typing import Dict, Any, List, Optional, Tuple
+from collections import Counter
+import math
+import re
+import threading
+import time
+
+# Words that do not change which rows a question asks for. Negations and
+# grouping words ("not", "by", "without", "per") are deliberately kept.
+STOPWORDS = {
+    "a", "an", "the", "me", "us", "show", "give", "get", "list", "display",
+    "tell", "please", "what", "whats", "which", "is", "are", "was", "were",
+    "do", "does", "did", "we", "i", "our", "my", "can", "could", "you",
+    "would", "of", "for", "to", "in", "on", "at", "all", "about", "there",
+    "have", "has", "see", "find", "how", "many", "much"
+}
+
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+WORD_PATTERN = re.compile(r"[a-z0-9<>_]+")
+
+NGRAM_SIZE = 3
+
+# Words at least this long may differ from a cached question's by one edit
+# (a typo), unless the cached SQL uses either of them
+TYPO_MIN_LENGTH = 5
+
+
+class SqlCacheService:
+    """
+    Semantic cache of validated question -> SQL pairs, one index per
+    DataContext.
+
+    Questions are normalized (lowercase, stopwords dropped, numbers moved
+    into slots) and compared with TF-IDF weighted character n-grams. A hit
+    also needs the same content words, up to one-letter typos that the
+    cached SQL does not depend on: "this month" never reuses "last month",
+    nor "south" "north". Only
+    SQL that passed the safety check and executed is stored, and a context's
+    entries are dropped as soon as its schema fingerprint changes.
+    """
+
+    # context id -> {"fingerprint", "entries": [...], "df": Counter}
+    _indexes: Dict[str, Dict[str, Any]] = {}
+    _lock = threading.Lock()
+    _stats = {
+        "lookups": 0,
+        "hits": 0,
+        "misses": 0,
+        "stores": 0,
+        "evictions": 0,
+        "invalidations": 0
+    }
+
+    @staticmethod
+    def normalize(question: str) -> Tuple[str, List[str]]:
+        """Normalized question text and the numbers taken out of it"""
+        text = question.lower()
+        slots = NUMBER_PATTERN.findall(text)
+        text = NUMBER_PATTERN.sub(" <num> ", text)
+
+        words = [w for w in WORD_PATTERN.findall(text) if w not in STOPWORDS]
+        return " ".join(words), slots
+
+    @staticmethod
+    def lookup(context_id, fingerprint: str, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached SQL result for a question similar enough to one already
+        answered in this context, or None
+        """
+        settings = get_settings()
+        if not settings.SQL_CACHE_ENABLED:
+            return None
+
+        normalized, slots = SqlCacheService.normalize(question)
+        grams = SqlCacheService._ngrams(normalized)
+
+        with SqlCacheService._lock:
+            SqlCacheService._stats["lookups"] += 1
+            index = SqlCacheService._get_index(str(context_id), fingerprint)
+
+            best, best_score = None, 0.0
+            if grams and index["entries"]:
+                vector = SqlCacheService._weigh(grams, index)
+
+                for entry in index["entries"]:
+                    # Same numbers or nothing: "top 5" must not reuse "top 10"
+                    if entry["slots"] != slots:
+                        continue
+
+                    if not SqlCacheService._same_words(normalized, entry):
+                        continue
+
+                    if entry["normalized"] == normalized:
+                        best, best_score = entry, 1.0
+                        break
+
+                    score = SqlCacheService._cosine(
+                        vector, SqlCacheService._weigh(entry["grams"], index)
+                    )
+                    if score > best_score:
+                        best, best_score = entry, score
+
+            if best is None or best_score < settings.SQL_CACHE_SIMILARITY:
+                SqlCacheService._stats["misses"] += 1
+                return None
+
+            SqlCacheService._stats["hits"] += 1
+            best["hits"] += 1
+            best["last_used"] = time.monotonic()
+
+            result = dict(best["sql_result"])
+
+        result["cache"] = {
+            "question": best["question"],
+            "similarity": round(best_score, 4)
+        }
+        return result
+
+    @staticmethod
+    def store(context_id, fingerprint: str, question: str, sql_result: Dict[str, Any]):
+        """Remember SQL that was validated and executed for a question"""
+        settings = get_settings()
+        if not settings.SQL_CACHE_ENABLED or not sql_result.get("sql"):
+            return
+
+        normalized, slots = SqlCacheService.normalize(question)
+        if not normalized:
+            return
+
+        with SqlCacheService._lock:
+            index = SqlCacheService._get_index(str(context_id), fingerprint)
+
+            for entry in index["entries"]:
+                if entry["normalized"] == normalized and entry["slots"] == slots:
+                    entry["sql_result"] = SqlCacheService._cacheable(sql_result)
+                    return
+
+            if len(index["entries"]) >= settings.SQL_CACHE_MAX_ENTRIES:
+                oldest = min(index["entries"], key=lambda e: e["last_used"])
+                SqlCacheService._remove(index, oldest)
+
+            grams = SqlCacheService._ngrams(normalized)
+            index["entries"].append({
+                "question": question,
+                "normalized": normalized,
+                "slots": slots,
+                "grams": grams,
+                "sql_result": SqlCacheService._cacheable(sql_result),
+                "hits": 0,
+                "last_used": time.monotonic()
+            })
+            index["df"].update(grams.keys())
+            SqlCacheService._stats["stores"] += 1
+
+    @staticmethod
+    def evict(context_id, sql: str):
+        """Drop entries whose SQL no longer executes"""
+        with SqlCacheService._lock:
+            index = SqlCacheService._indexes.get(str(context_id))
+            if not index:
+                return
+
+            for entry in [e for e in index["entries"] if e["sql_result"]["sql"] == sql]:
+                SqlCacheService._remove(index, entry)
+
+    @staticmethod
+    def invalidate(context_id=None):
+        """Drop one context's entries, or all of them"""
+        with SqlCacheService._lock:
+            if context_id is None:
+                SqlCacheService._indexes.clear()
+            else:
+                SqlCacheService._indexes.pop(str(context_id), None)
+            SqlCacheService._stats["invalidations"] += 1
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        with SqlCacheService._lock:
+            stats = dict(SqlCacheService._stats)
+            stats["contexts"] = len(SqlCacheService._indexes)
+            stats["entries"] = sum(
+                len(index["entries"]) for index in SqlCacheService._indexes.values()
+            )
+
+        stats["llm_calls_saved"] = stats["hits"]
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        return stats
+
+    @staticmethod
+    def _get_index(key: str, fingerprint: str) -> Dict[str, Any]:
+        """The context's index, emptied if the schema changed (lock held)"""
+        index = SqlCacheService._indexes.get(key)
+
+        if index is None or index["fingerprint"] != fingerprint:
+            if index is not None:
+                print(f"🔄 Schema changed, dropping {len(index['entries'])} cached queries")
+                SqlCacheService._stats["invalidations"] += 1
+
+            index = {"fingerprint": fingerprint, "entries": [], "df": Counter()}
+            SqlCacheService._indexes[key] = index
+
+        return index
+
+    @staticmethod
+    def _remove(index: Dict[str, Any], entry: Dict[str, Any]):
+        index["entries"].remove(entry)
+        index["df"].subtract(entry["grams"].keys())
+        index["df"] += Counter()  # drop zero counts
+        SqlCacheService._stats["evictions"] += 1
+
+    @staticmethod
+    def _cacheable(sql_result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "sql": sql_result["sql"],
+            "explanation": sql_result.get("explanation"),
+            "is_safe": True
+        }
+
+    @staticmethod
+    def _same_words(normalized: str, entry: Dict[str, Any]) -> bool:
+        """Whether a question asks with the cached entry's words, typos aside"""
+        words = set(normalized.split())
+        cached = set(entry["normalized"].split())
+        missing, extra = cached - words, words - cached
+
+        if len(missing) != len(extra):
+            return False
+
+        # A differing word the SQL mentions (a column, a literal) is never a typo
+        sql_words = set(WORD_PATTERN.findall(entry["sql_result"]["sql"].lower()))
+
+        for word in extra:
+            typo_of = next((
+                m for m in missing
+                if min(len(m), len(word)) >= TYPO_MIN_LENGTH
+                and m not in sql_words and word not in sql_words
+                and SqlCacheService._one_edit(m, word)
+            ), None)
+            if typo_of is None:
+                return False
+            missing.discard(typo_of)
+
+        return True
+
+    @staticmethod
+    def _one_edit(a: str, b: str) -> bool:
+        """Whether b is a with at most one letter inserted, removed or changed"""
+        if abs(len(a) - len(b)) > 1:
+            return False
+        if len(a) > len(b):
+            a, b = b, a
+
+        i = 0
+        while i < len(a) and a[i] == b[i]:
+            i += 1
+
+        if len(a) == len(b):
+            return a[i + 1:] == b[i + 1:]
+        return a[i:] == b[i + 1:]
+
+    @staticmethod
+    def _ngrams(normalized: str) -> Counter:
+        padded = f" {normalized} "
+        return Counter(
+            padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)
+        )
+
+    @staticmethod
+    def _weigh(grams: Counter, index: Dict[str, Any]) -> Dict[str, float]:
+        total = len(index["entries"])
+        df = index["df"]
+        return {
+            gram: count * (math.log((1 + total) / (1 + df.get(gram, 0))) + 1)
+            for gram, count in grams.items()
+        }
+
+    @staticmethod
+    def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+
+        dot = sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+        if not dot:
+            return 0.0
+
+        norm_a = math.sqrt(sum(w * w for w in a.values()))
+        norm_b = math.sqrt(sum(w * w for w in b.values()))
+        return dot / (norm_a * norm_b)
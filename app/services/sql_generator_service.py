@@ -1,5 +1,6 @@
 from app.services.ai_service import AIService
 from app.models import DataContext
+from app.core.sql_validator import SqlValidator
 from typing import Dict, Any
 import sqlalchemy
 from sqlalchemy import text
@@ -129,7 +130,7 @@ If unsafe or not possible, set is_safe to false.
             result = self.ai.parse_json_response(response)
             
             # Additional safety check
-            if not self._validate_sql_safety(result.get("sql", "")):
+            if not self._validate_sql_safety(result.get("sql", ""), context):
                 result["is_safe"] = False
                 result["explanation"] = "Query contains potentially unsafe operations"
             
@@ -144,31 +145,11 @@ If unsafe or not possible, set is_safe to false.
                 "tables_used": []
             }
     
-    def _validate_sql_safety(self, sql: str) -> bool:
+    def _validate_sql_safety(self, sql: str, context: DataContext = None) -> bool:
         """
-        Validate that SQL is safe to execute (read-only)
+        Validate that SQL is safe to execute (read-only, allowed tables and columns)
         """
-        if not sql:
-            return False
-        
-        sql_upper = sql.upper()
-        
-        # Forbidden keywords
-        forbidden = [
-            "UPDATE", "DELETE", "INSERT", "DROP", "ALTER",
-            "TRUNCATE", "EXEC", "EXECUTE", "CREATE", "GRANT",
-            "REVOKE", "COMMIT", "ROLLBACK", "SAVEPOINT"
-        ]
-        
-        for keyword in forbidden:
-            if keyword in sql_upper:
-                return False
-        
-        # Must start with SELECT
-        if not sql_upper.strip().startswith("SELECT"):
-            return False
-        
-        return True
+        return SqlValidator.validate(sql, context)["is_safe"]
     
     def execute_generated_sql(
         self,
@@ -180,7 +161,7 @@ If unsafe or not possible, set is_safe to false.
         Execute the generated SQL safely
         """
         # Final safety check
-        if not self._validate_sql_safety(sql):
+        if not self._validate_sql_safety(sql, context):
             raise ValueError("SQL query failed safety validation")
         
         try:
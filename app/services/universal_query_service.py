@@ -1,8 +1,15 @@
 from app.services.ai_service import AIService
+from app.services.schema_catalog_service import SchemaCatalogService
+from app.services.sql_cache_service import SqlCacheService
+from app.core.sql_validator import SqlValidator
+from app.core.sql_rewriter import SqlRewriter
+from app.core.sql_guard import SqlCostGuard
+from app.core.replica import ReplicaRouter
+from app.core.config import get_settings
 from app.models import DataContext
 from sqlalchemy.orm import Session
-from sqlalchemy import text, inspect
-from typing import Dict, Any, List
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, List, Tuple, AsyncIterator
 
 class UniversalQueryService:
     """
@@ -18,64 +25,107 @@ class UniversalQueryService:
     
     def get_schema_info(self, db: Session, context: DataContext) -> str:
         """
-        Dynamically extract schema information from the database INCLUDING actual values
+        Schema information for the context INCLUDING actual values, served
+        from the in-process schema catalog
         """
-        inspector = inspect(db.bind)
+        return SchemaCatalogService.get_schema_info(db, context)
+    
+    async def handle_query(
+        self,
+        db: Session,
+        context: DataContext,
+        user_query: str,
+        max_retries: int = 2
+    ) -> Dict[str, Any]:
+        """
+        Universal query handler with self-healing capabilities.
         
-        schema_info = []
-        schema_info.append("DATABASE: PostgreSQL")
-        schema_info.append("\nAVAILABLE TABLES AND COLUMNS:\n")
+        LLM calls are awaited on the shared AsyncOpenAI client; the blocking
+        database steps run in the threadpool only for as long as they take.
+        """
+        result = await self._run_query(db, context, user_query, max_retries)
         
-        for table_name in context.allowed_tables:
-            if table_name in inspector.get_table_names():
-                columns = inspector.get_columns(table_name)
-                foreign_keys = inspector.get_foreign_keys(table_name)
-                
-                schema_info.append(f"\nTable: {table_name}")
-                schema_info.append("Columns:")
-                for col in columns:
-                    col_type = str(col['type'])
-                    nullable = "NULL" if col['nullable'] else "NOT NULL"
-                    schema_info.append(f"  - {col['name']} ({col_type}) {nullable}")
-                
-                if foreign_keys:
-                    schema_info.append("Foreign Keys:")
-                    for fk in foreign_keys:
-                        schema_info.append(f"  - {fk['constrained_columns']} → {fk['referred_table']}.{fk['referred_columns']}")
-                
-                # Get sample values for important columns
-                sample_values = self._get_sample_values(db, table_name, columns)
-                if sample_values:
-                    schema_info.append("Sample Values:")
-                    for col_name, values in sample_values.items():
-                        schema_info.append(f"  - {col_name}: {', '.join(map(str, values))}")
-        
-        return "\n".join(schema_info)
-
-    def _get_sample_values(self, db: Session, table_name: str, columns: list) -> dict:
+        if not result["success"]:
+            return result
+        
+        sql_result = result["sql_result"]
+        data = result["data"]
+        
+        # Format response
+        formatted = await self._format_response(data, user_query, sql_result)
+        
+        return {
+            "success": True,
+            "sql": sql_result["sql"],
+            "explanation": sql_result["explanation"],
+            "data": data,
+            "formatted_data": formatted["formatted_data"],
+            "summary": formatted["summary"],
+            "insights": formatted["insights"],
+            "suggestions": formatted["suggestions"]
+        }
+    
+    async def stream_query(
+        self,
+        db: Session,
+        context: DataContext,
+        user_query: str,
+        max_retries: int = 2
+    ) -> AsyncIterator[Tuple[str, Any]]:
         """
-        Get sample/distinct values for enum-like columns
+        Streaming variant of handle_query(). Yields (event, payload) pairs:
+        the result table as soon as the SQL returns, then the summary as it
+        streams from the model, then the complete response.
         """
-        sample_values = {}
+        result = await self._run_query(db, context, user_query, max_retries)
         
-        # Columns to check for distinct values (status, type, region, etc.)
-        text_columns = [col['name'] for col in columns 
-                        if 'status' in col['name'].lower() 
-                        or 'type' in col['name'].lower()
-                        or 'region' in col['name'].lower()]
+        if not result["success"]:
+            yield "error", result
+            return
         
-        for col_name in text_columns[:3]:  # Limit to 3 columns
-            try:
-                query = f"SELECT DISTINCT {col_name} FROM {table_name} WHERE {col_name} IS NOT NULL LIMIT 10"
-                result = db.execute(text(query)).fetchall()
-                if result:
-                    sample_values[col_name] = [row[0] for row in result]
-            except:
-                pass
-        
-        return sample_values
+        sql_result = result["sql_result"]
+        data = result["data"]
+        
+        response = {
+            "success": True,
+            "sql": sql_result["sql"],
+            "explanation": sql_result["explanation"],
+            "data": data,
+            "formatted_data": None,
+            "summary": "",
+            "insights": [],
+            "suggestions": []
+        }
+        
+        if not data:
+            response.update(await self._create_no_data_message(user_query, sql_result))
+            yield "summary", response["summary"]
+            yield "done", response
+            return
+        
+        response["formatted_data"] = self._create_table_format(data)
+        yield "table", {
+            "formatted_data": response["formatted_data"],
+            "row_count": len(data)
+        }
+        
+        system_prompt, messages = self._summary_prompt(data, user_query, sql_result, json_mode=False)
+        
+        summary = []
+        try:
+            async for token in self.ai.astream_chat(messages, system_prompt=system_prompt):
+                summary.append(token)
+                yield "summary_token", token
+        except Exception:
+            if not summary:
+                fallback = f"Found {len(data)} records."
+                summary.append(fallback)
+                yield "summary_token", fallback
+        
+        response["summary"] = "".join(summary)
+        yield "done", response
     
-    def handle_query(
+    async def _run_query(
         self,
         db: Session,
         context: DataContext,
@@ -83,70 +133,113 @@ class UniversalQueryService:
         max_retries: int = 2
     ) -> Dict[str, Any]:
         """
-        Universal query handler with self-healing capabilities
+        Generate and execute SQL, self-correcting on failure.
+        
+        A similar question already answered in this context reuses its SQL
+        and skips generation entirely.
+        
+        Returns {"success": True, "sql_result", "data"} or an error payload.
         """
         
-        # Get dynamic schema info
-        schema_info = self.get_schema_info(db, context)
+        schema_version = await self._run_db_step(db, SchemaCatalogService.get_version, context)
         
-        # Try to generate and execute query
-        for attempt in range(max_retries + 1):
+        cached = SqlCacheService.lookup(context.id, schema_version, user_query)
+        if cached:
+            print(f"⚡ SQL cache hit ({cached['cache']['similarity']}): {cached['cache']['question']}")
             try:
-                # Generate SQL
-                sql_result = self._generate_sql(user_query, schema_info, context)
-                
-                if not sql_result["is_safe"]:
-                    return {
-                        "success": False,
-                        "error": "Query is not safe to execute",
-                        "explanation": sql_result["explanation"]
-                    }
-                
-                # Execute SQL
-                data = self._execute_sql(db, sql_result["sql"])
-                
-                # Format response
-                formatted = self._format_response(data, user_query, sql_result)
-                
+                data = await self._run_db_step(db, self._execute_sql, cached["sql"], context)
                 return {
                     "success": True,
-                    "sql": sql_result["sql"],
-                    "explanation": sql_result["explanation"],
-                    "data": data,
-                    "formatted_data": formatted["formatted_data"],
-                    "summary": formatted["summary"],
-                    "insights": formatted["insights"],
-                    "suggestions": formatted["suggestions"]
+                    "sql_result": cached,
+                    "data": data
+                }
+            except Exception as e:
+                print(f"⚠️  Cached SQL failed, regenerating: {e}")
+                SqlCacheService.evict(context.id, cached["sql"])
+        
+        # Get dynamic schema info
+        schema_info = await self._run_db_step(db, self.get_schema_info, context)
+        
+        # Generate SQL
+        sql_result = await self._generate_sql(user_query, schema_info, context)
+        
+        # Try to execute, self-correcting the SQL on failure
+        for attempt in range(max_retries + 1):
+            if not sql_result.get("is_safe"):
+                return {
+                    "success": False,
+                    "error": "Query is not safe to execute",
+                    "explanation": sql_result.get("explanation")
                 }
+            
+            try:
+                # Execute SQL
+                data = await self._run_db_step(db, self._execute_sql, sql_result["sql"], context)
                 
             except Exception as e:
-                error_message = str(e)
+                # Mechanical dialect and GROUP BY mistakes are rewritten and
+                # re-run locally before spending an LLM round trip on them
+                repaired = await self._run_db_step(
+                    db, self._execute_rewritten, sql_result["sql"], e, context
+                )
+                
+                if "data" in repaired:
+                    print(f"🔧 Rewrote SQL locally: {', '.join(repaired['rules'])}")
+                    sql_result = {**sql_result, "sql": repaired["sql"]}
+                    data = repaired["data"]
                 
-                if attempt < max_retries:
-                    # Try to fix the SQL based on error
-                    print(f"⚠️  Attempt {attempt + 1} failed: {error_message}")
-                    print(f"🔧 Attempting to self-correct...")
-                    
-                    sql_result = self._fix_sql_error(
-                        user_query,
-                        sql_result.get("sql", ""),
-                        error_message,
-                        schema_info
-                    )
                 else:
+                    error_message = str(repaired["error"])
+                    
+                    if attempt < max_retries:
+                        # Try to fix the SQL based on error
+                        print(f"⚠️  Attempt {attempt + 1} failed: {error_message}")
+                        print(f"🔧 Attempting to self-correct...")
+                        
+                        sql_result = await self._fix_sql_error(
+                            user_query,
+                            repaired["sql"],
+                            error_message,
+                            schema_info,
+                            context
+                        )
+                        continue
+                    
                     # Final attempt failed
                     return {
                         "success": False,
                         "error": error_message,
-                        "user_message": self._create_friendly_error(user_query, error_message)
+                        "user_message": await self._create_friendly_error(user_query, error_message)
                     }
+            
+            # Only SQL that passed validation and executed is cached
+            SqlCacheService.store(context.id, schema_version, user_query, sql_result)
+            
+            return {
+                "success": True,
+                "sql_result": sql_result,
+                "data": data
+            }
         
         return {
             "success": False,
             "error": "Could not generate valid query after retries"
         }
     
-    def _generate_sql(
+    async def _run_db_step(self, db: Session, step, *args):
+        """
+        Run a blocking database step in the threadpool and end its transaction
+        afterwards, so no connection is held while waiting on the LLM
+        """
+        def run():
+            try:
+                return step(db, *args)
+            finally:
+                db.rollback()
+        
+        return await run_in_threadpool(run)
+    
+    async def _generate_sql(
         self,
         user_query: str,
         schema_info: str,
@@ -237,7 +330,7 @@ Respond ONLY with valid JSON:
         ]
         
         try:
-            response = self.ai.chat(
+            response = await self.ai.achat(
                 messages=messages,
                 system_prompt=system_prompt,
                 json_mode=True
@@ -245,11 +338,7 @@ Respond ONLY with valid JSON:
             
             result = self.ai.parse_json_response(response)
             
-            # Validate safety
-            if not self._is_safe_sql(result.get("sql", "")):
-                result["is_safe"] = False
-            
-            return result
+            return self._validate_candidate(result, context)
             
         except Exception as e:
             return {
@@ -258,12 +347,13 @@ Respond ONLY with valid JSON:
                 "is_safe": False
             }
     
-    def _fix_sql_error(
+    async def _fix_sql_error(
         self,
         user_query: str,
         failed_sql: str,
         error_message: str,
-        schema_info: str
+        schema_info: str,
+        context: DataContext
     ) -> Dict[str, Any]:
         """
         Self-healing: Fix SQL based on error message
@@ -304,13 +394,15 @@ Respond ONLY with valid JSON:
         ]
         
         try:
-            response = self.ai.chat(
+            response = await self.ai.achat(
                 messages=messages,
                 system_prompt=system_prompt,
                 json_mode=True
             )
             
-            return self.ai.parse_json_response(response)
+            result = self.ai.parse_json_response(response)
+            
+            return self._validate_candidate(result, context)
             
         except Exception as e:
             return {
@@ -319,32 +411,75 @@ Respond ONLY with valid JSON:
                 "is_safe": False
             }
     
-    def _execute_sql(self, db: Session, sql: str) -> List[Dict]:
+    def _execute_sql(self, db: Session, sql: str, context: DataContext) -> List[Dict]:
         """Execute SQL and return results"""
-        if not self._is_safe_sql(sql):
-            raise ValueError("Unsafe SQL detected")
+        check = self._validate_sql(sql, context, SchemaCatalogService.get_catalog(db, context))
+        if not check["is_safe"]:
+            raise ValueError(f"Unsafe SQL detected: {check['reason']}")
         
-        result = db.execute(text(sql)).mappings().all()
-        return [dict(row) for row in result]
+        # Read-only, time-limited, LIMITed and refused above the cost budget,
+        # on the read replica while it is fresh enough
+        with ReplicaRouter.reading(db) as read_db:
+            return SqlCostGuard.execute(read_db, sql)
     
-    def _is_safe_sql(self, sql: str) -> bool:
-        """Validate SQL is read-only"""
-        if not sql:
-            return False
+    def _execute_rewritten(
+        self,
+        db: Session,
+        sql: str,
+        error: Exception,
+        context: DataContext
+    ) -> Dict[str, Any]:
+        """
+        Re-execute deterministic rewrites of failed SQL, a pass per new
+        error. {"sql", "data", "rules"} once one runs, otherwise
+        {"sql", "error"} of the last attempt.
+        """
+        rules = []
         
-        sql_upper = sql.upper().strip()
+        for _ in range(get_settings().SQL_REWRITE_MAX_PASSES):
+            rewritten = SqlRewriter.rewrite(sql, error)
+            if not rewritten:
+                break
+            
+            rules += rewritten["rules"]
+            try:
+                data = self._execute_sql(db, rewritten["sql"], context)
+            except Exception as e:
+                db.rollback()
+                sql, error = rewritten["sql"], e
+                continue
+            
+            SqlRewriter.record_repair()
+            return {"sql": rewritten["sql"], "data": data, "rules": rules}
+        
+        if rules:
+            SqlRewriter.record_repair(repaired=False)
         
-        # Must start with SELECT
-        if not sql_upper.startswith("SELECT"):
-            return False
+        return {"sql": sql, "error": error}
+    
+    def _validate_candidate(self, result: Dict[str, Any], context: DataContext) -> Dict[str, Any]:
+        """Mark freshly generated SQL unsafe, with the reason, when it fails validation"""
+        check = self._validate_sql(
+            result.get("sql", ""), context, SchemaCatalogService.peek(context), candidate=True
+        )
         
-        # Block dangerous keywords
-        dangerous = ["UPDATE", "DELETE", "INSERT", "DROP", "ALTER", "TRUNCATE", 
-                     "CREATE", "GRANT", "REVOKE", "EXEC", "EXECUTE"]
+        if not check["is_safe"]:
+            result["is_safe"] = False
+            result["explanation"] = f"Query rejected: {check['reason']}"
         
-        return not any(word in sql_upper for word in dangerous)
+        return result
     
-    def _format_response(
+    def _validate_sql(
+        self,
+        sql: str,
+        context: DataContext,
+        catalog: Dict[str, Any] = None,
+        candidate: bool = False
+    ) -> Dict[str, Any]:
+        """Single read-only SELECT/WITH over the context's allowed tables and columns"""
+        return SqlValidator.validate(sql, context, catalog, candidate=candidate)
+    
+    async def _format_response(
         self,
         data: List[Dict],
         user_query: str,
@@ -354,7 +489,7 @@ Respond ONLY with valid JSON:
         
         if not data:
             # Create intelligent "no data" message
-            no_data_message = self._create_no_data_message(user_query, sql_result)
+            no_data_message = await self._create_no_data_message(user_query, sql_result)
             
             return {
                 "formatted_data": None,
@@ -367,12 +502,51 @@ Respond ONLY with valid JSON:
         formatted_data = self._create_table_format(data)
         
         # Generate AI summary
+        system_prompt, messages = self._summary_prompt(data, user_query, sql_result)
+        
+        try:
+            response = await self.ai.achat(messages, system_prompt=system_prompt, json_mode=True)
+            ai_response = self.ai.parse_json_response(response)
+            
+            return {
+                "formatted_data": formatted_data,
+                "summary": ai_response["summary"],
+                "insights": ai_response["insights"],
+                "suggestions": ai_response["suggestions"]
+            }
+        except:
+            # Fallback
+            return {
+                "formatted_data": formatted_data,
+                "summary": f"Found {len(data)} records.",
+                "insights": ["See data below for details"],
+                "suggestions": []
+            }
+    
+    def _summary_prompt(
+        self,
+        data: List[Dict],
+        user_query: str,
+        sql_result: Dict,
+        json_mode: bool = True
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """System prompt and messages for the data summary"""
         data_sample = data[:20]  # First 20 rows for AI
         data_str = "\n".join([
             f"Row {i+1}: {', '.join([f'{k}={v}' for k, v in row.items()])}"
             for i, row in enumerate(data_sample)
         ])
         
+        if json_mode:
+            output_format = """Respond with JSON:
+{
+    "summary": "2-3 sentences with specific numbers and names from data",
+    "insights": ["specific insight 1", "specific insight 2"],
+    "suggestions": ["actionable suggestion"]
+}"""
+        else:
+            output_format = "Respond with 2-3 plain sentences with specific numbers and names from data. No JSON."
+        
         system_prompt = f"""You are a helpful data analyst.
 
 User asked: "{user_query}"
@@ -382,38 +556,16 @@ Rows returned: {len(data)}
 IMPORTANT: Mention SPECIFIC values from the data in your summary.
 Be concrete, not vague.
 
-Respond with JSON:
-{{
-    "summary": "2-3 sentences with specific numbers and names from data",
-    "insights": ["specific insight 1", "specific insight 2"],
-    "suggestions": ["actionable suggestion"]
-}}
+{output_format}
 """
 
         messages = [
             {"role": "user", "content": f"Data:\n{data_str}\n\nSummarize with specific details."}
         ]
         
-        try:
-            response = self.ai.chat(messages, system_prompt=system_prompt, json_mode=True)
-            ai_response = self.ai.parse_json_response(response)
-            
-            return {
-                "formatted_data": formatted_data,
-                "summary": ai_response["summary"],
-                "insights": ai_response["insights"],
-                "suggestions": ai_response["suggestions"]
-            }
-        except:
-            # Fallback
-            return {
-                "formatted_data": formatted_data,
-                "summary": f"Found {len(data)} records.",
-                "insights": ["See data below for details"],
-                "suggestions": []
-            }
+        return system_prompt, messages
     
-    def _create_no_data_message(self, user_query: str, sql_result: Dict) -> Dict[str, Any]:
+    async def _create_no_data_message(self, user_query: str, sql_result: Dict) -> Dict[str, Any]:
         """
         Create intelligent message when no data is found
         """
@@ -443,7 +595,12 @@ Respond with JSON:
         ]
         
         try:
-            response = self.ai.chat(messages, system_prompt=system_prompt, json_mode=True)
+            response = await self.ai.achat(
+                messages,
+                system_prompt=system_prompt,
+                json_mode=True,
+                cache_site="no_data_message"
+            )
             return self.ai.parse_json_response(response)
         except:
             return {
@@ -481,7 +638,7 @@ Respond with JSON:
             "rows": formatted_rows
         }
     
-    def _create_friendly_error(self, user_query: str, error: str) -> str:
+    async def _create_friendly_error(self, user_query: str, error: str) -> str:
         """Create user-friendly error message"""
         system_prompt = """Convert this technical error into a friendly message.
 Keep it under 50 words. Be helpful and encouraging.
@@ -492,6 +649,6 @@ Respond with just the message, no JSON."""
         ]
         
         try:
-            return self.ai.chat(messages, system_prompt=system_prompt)
+            return await self.ai.achat(messages, system_prompt=system_prompt, cache_site="friendly_error")
         except:
             return "I had trouble understanding your question. Could you rephrase it?"
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Refreshes materialized rollups whose source tables changed.
+
+    python -m app.workers.rollup_worker          # every ROLLUP_REFRESH_SECONDS
+    python -m app.workers.rollup_worker --once [--force]
+"""
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.analytics.rollups import RollupService
+import sys
+import time
+
+
+def refresh_once(force: bool = False):
+    db = SessionLocal()
+    try:
+        return RollupService.refresh(db, force=force)
+    finally:
+        db.close()
+
+
+def run():
+    interval = get_settings().ROLLUP_REFRESH_SECONDS
+    while True:
+        try:
+            refresh_once()
+        except Exception as e:
+            print(f"❌ Rollup refresh failed: {e}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    if "--once" in sys.argv:
+        refresh_once(force="--force" in sys.argv)
+    else:
+        run()
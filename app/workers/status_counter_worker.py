@@ -0,0 +1,40 @@
+"""
+Periodically reconciles status_counter with the tables it counts.
+
+    python -m app.workers.status_counter_worker          # every STATUS_COUNTER_RECONCILE_SECONDS
+    python -m app.workers.status_counter_worker --once
+"""
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.analytics.status_counters import StatusCounterService
+import sys
+import time
+
+
+def reconcile_once():
+    db = SessionLocal()
+    try:
+        if not StatusCounterService.available(db):
+            return []
+        drift = StatusCounterService.reconcile(db)
+        print(f"✅ Status counters reconciled ({len(drift)} correction(s))")
+        return drift
+    finally:
+        db.close()
+
+
+def run():
+    interval = get_settings().STATUS_COUNTER_RECONCILE_SECONDS
+    while True:
+        try:
+            reconcile_once()
+        except Exception as e:
+            print(f"❌ Status counter reconcile failed: {e}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    if "--once" in sys.argv:
+        reconcile_once()
+    else:
+        run()